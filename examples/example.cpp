@@ -21,8 +21,8 @@ class MyCppInteractions : public find_embedding::LocalInteraction {
     void cancel() { _canceled = true; }
 
   private:
-    void displayOutputImpl(const std::string& mess) const override { std::cout << mess << std::endl; }
-    void displayErrorImpl(const std::string& mess) const override { std::cout << mess << std::endl; }
+    void displayOutputImpl(int, const std::string& mess) const override { std::cout << mess << std::endl; }
+    void displayErrorImpl(int, const std::string& mess) const override { std::cout << mess << std::endl; }
     virtual bool cancelledImpl() const { return _canceled; }
 };
 
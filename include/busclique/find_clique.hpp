@@ -46,8 +46,9 @@ bool find_clique_short(const cells_t &cells, const size_t size, vector<vector<si
     for(size_y y = 0; y < cells.topo.dim_y; y++)
         for(size_x x = 0; x < cells.topo.dim_x; x++)
             if (cells.score(y,x) >= size) {
+                //each chain is one vertical and one horizontal qubit
                 emb.clear();
-                max_length = 1;
+                max_length = 2;
                 cells.inflate(y, x, emb);
                 return true;
             }
@@ -72,10 +73,11 @@ bool find_clique_nice(const cell_cache<chimera_spec> &cells,
     size_t shore = cells.topo.shore;
     if(size <= shore && find_clique_short(cells, size, emb, max_length))
         return true;
-    else if (max_length == 1)
+    else if (max_length <= 2)
         return false;
     bundle_cache<chimera_spec> bundles(cells);
-    size_t minw = (size + shore - 1)/shore;
+    //clique_cache requires a width of at least 2
+    size_t minw = max(size_t(2), (size + shore - 1)/shore);
     size_t maxw = coordinate_converter::min(cells.topo.dim_y, cells.topo.dim_x);
     maxw = min(max_length - 1, maxw);
     for(size_t width = minw; width <= maxw; width++) {
@@ -101,10 +103,11 @@ bool find_clique_nice(const cell_cache<zephyr_spec> &cells,
     size_t shore = cells.topo.shore;
     if(size <= shore && find_clique_short(cells, size, emb, max_length))
         return true;
-    else if (max_length == 1)
+    else if (max_length <= 2)
         return false;
     bundle_cache<zephyr_spec> bundles(cells);
-    size_t minw = (size + shore - 1)/shore;
+    //clique_cache requires a width of at least 2
+    size_t minw = max(size_t(2), (size + shore - 1)/shore);
     size_t maxw = coordinate_converter::min(cells.topo.dim_y, cells.topo.dim_x);
     if (max_length < numeric_limits<size_t>::max()) maxw = min(2*max_length+1, maxw);
     for(size_t width = minw; width <= maxw; width++) {
@@ -128,7 +131,8 @@ bool find_clique_nice(const cell_cache<pegasus_spec> &cells,
                       size_t &,
                       size_t &max_length) {
     bundle_cache<pegasus_spec> bundles(cells);
-    size_t minw = (size + 1)/2;
+    //clique_cache requires a width of at least 2
+    size_t minw = max(size_t(2), (size + 1)/2);
     size_t maxw = coordinate_converter::min(cells.topo.dim_y, cells.topo.dim_x);
 
     for(size_t w = minw; w <= maxw; w++) {
@@ -69,6 +69,11 @@ class topo_cache {
         if(mask_num > 0) {
             mask_num = 0;
             rng = fastrng(topo.seed);
+            //next() shuffles and sorts bad_edges in place; restore the order
+            //they had on construction, so that searches don't depend on the
+            //searches that came before them
+            bad_edges.clear();
+            compute_bad_edges();
             next();
         }
     }
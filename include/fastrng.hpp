@@ -81,6 +81,18 @@ class fastrng {
         }
     }
 
+    //! read the internal state, e.g. to serialize it
+    void get_state(uint64_t &s0, uint64_t &s1) const {
+        s0 = S0;
+        s1 = S1;
+    }
+
+    //! restore an internal state previously read by `get_state`
+    void set_state(uint64_t s0, uint64_t s1) {
+        S0 = s0;
+        S1 = s1;
+    }
+
     static constexpr uint64_t min() { return std::numeric_limits<uint64_t>::min(); }
     static constexpr uint64_t max() { return std::numeric_limits<uint64_t>::max(); }
 };
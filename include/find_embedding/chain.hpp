@@ -14,6 +14,7 @@
 
 #pragma once
 #include <iostream>
+#include <stdexcept>
 #include "util.hpp"
 
 namespace find_embedding {
@@ -30,8 +31,8 @@ namespace find_embedding {
 
 //! This class stores chains for embeddings, and performs qubit-use
 //! accounting.  The `label` is the index number for the variable
-//! represented by this chain.  The `links` member of a chain is an
-//! unordered map storing the linking information for this chain.
+//! represented by this chain.  The `links` member of a chain is a
+//! `sorted_map` storing the linking information for this chain.
 //! The `data` member of a chain stores the connectivity information
 //! for the chain.
 //!
@@ -57,9 +58,76 @@ namespace find_embedding {
 //!            both parents and links
 //!     the chain root is its own parent.
 
+//! A small map with integer keys, stored as a vector of (key, value) pairs
+//! sorted by key.  Chains rarely hold more than a few dozen qubits, so a
+//! binary search beats hashing, and copying a chain (which happens for every
+//! chain whenever an embedding is snapshotted) is a single vector copy which
+//! reuses the destination's storage rather than allocating a node per entry.
+//! Note that insertions and erasures invalidate iterators and references.
+template <typename V>
+class sorted_map {
+  public:
+    typedef int key_type;
+    typedef V mapped_type;
+    typedef pair<int, V> value_type;
+    typedef typename vector<value_type>::iterator iterator;
+    typedef typename vector<value_type>::const_iterator const_iterator;
+
+  private:
+    vector<value_type> items;
+
+    static bool key_less(const value_type &a, const int k) { return a.first < k; }
+
+  public:
+    sorted_map() : items() {}
+
+    inline size_t size() const { return items.size(); }
+    inline iterator begin() { return items.begin(); }
+    inline iterator end() { return items.end(); }
+    inline const_iterator begin() const { return items.begin(); }
+    inline const_iterator end() const { return items.end(); }
+
+    //! the first entry whose key is not less than `k`
+    inline iterator lower_bound(const int k) { return std::lower_bound(items.begin(), items.end(), k, key_less); }
+    inline const_iterator lower_bound(const int k) const {
+        return std::lower_bound(items.begin(), items.end(), k, key_less);
+    }
+
+    inline iterator find(const int k) {
+        auto z = lower_bound(k);
+        return (z != items.end() && z->first == k) ? z : items.end();
+    }
+    inline const_iterator find(const int k) const {
+        auto z = lower_bound(k);
+        return (z != items.end() && z->first == k) ? z : items.end();
+    }
+
+    inline size_t count(const int k) const { return find(k) != items.end(); }
+
+    //! insert (`k`, `v`) unless `k` is already present; as std::map::emplace
+    inline pair<iterator, bool> emplace(const int k, const V &v) {
+        auto z = lower_bound(k);
+        if (z != items.end() && z->first == k) return pair<iterator, bool>(z, false);
+        return pair<iterator, bool>(items.emplace(z, k, v), true);
+    }
+    inline pair<iterator, bool> emplace(const value_type &kv) { return emplace(kv.first, kv.second); }
+
+    inline V &operator[](const int k) { return emplace(k, V()).first->second; }
+
+    inline const V &at(const int k) const {
+        auto z = find(k);
+        if (z == items.end()) throw std::out_of_range("sorted_map::at");
+        return z->second;
+    }
+
+    inline void erase(iterator z) { items.erase(z); }
+    inline void clear() { items.clear(); }
+    inline void swap(sorted_map &other) { items.swap(other.items); }
+};
+
 struct frozen_chain {
-    unordered_map<int, pair<int, int>> data;
-    unordered_map<int, int> links;
+    sorted_map<pair<int, int>> data;
+    sorted_map<int> links;
     void clear() {
         data.clear();
         links.clear();
@@ -69,8 +137,8 @@ struct frozen_chain {
 class chain {
   private:
     vector<int> &qubit_weight;
-    unordered_map<int, pair<int, int>> data;
-    unordered_map<int, int> links;
+    sorted_map<pair<int, int>> data;
+    sorted_map<int> links;
 #ifdef CPPDEBUG
     bool belay_diagnostic;
 #endif
@@ -101,14 +169,20 @@ class chain {
 
     //! assign this to another chain
     chain &operator=(const chain &c) {
-        clear();
-        data = c.data;
-        for (auto &q : c) qubit_weight[q]++;
-        links = c.links;
-        DIAGNOSE_CHAIN();
+        if (this != &c) assign(c.data, c.links);
         return *this;
     }
 
+    //! copy the data and links of this chain into `keep`, leaving this chain
+    //! and the qubit weights untouched
+    inline void save(frozen_chain &keep) const {
+        keep.data = data;
+        keep.links = links;
+    }
+
+    //! overwrite this chain with the contents of `keep`, as populated by `save`
+    inline void restore(const frozen_chain &keep) { assign(keep.data, keep.links); }
+
     //! number of qubits in chain
     inline size_t size() const { return data.size(); }
 
@@ -301,8 +375,9 @@ class chain {
             if (z == data.end())
                 add_leaf(p, q);
             else if (p != q) {
-                auto &w = (*z).second;
-                w.second++;
+                // pin p while trimming; trim_branch may shift entries of
+                // data, so we look p up again rather than hold a reference
+                (*z).second.second++;
 #ifdef CPPDEBUG
                 belay_diagnostic = true;
 #endif
@@ -310,7 +385,7 @@ class chain {
 #ifdef CPPDEBUG
                 belay_diagnostic = false;
 #endif
-                w.second--;
+                retrieve(p).second--;
             }
             q = p;
             p = r;
@@ -412,6 +487,28 @@ class chain {
     }
 
   private:
+    //! overwrite our data and links.  both data maps are sorted by qubit, so we
+    //! only touch the weights of qubits which are in one but not the other
+    inline void assign(const sorted_map<pair<int, int>> &c_data, const sorted_map<int> &c_links) {
+        auto x = data.begin(), x_end = data.end();
+        auto y = c_data.begin(), y_end = c_data.end();
+        while (x != x_end && y != y_end) {
+            if (x->first < y->first) {
+                qubit_weight[(x++)->first]--;
+            } else if (y->first < x->first) {
+                qubit_weight[(y++)->first]++;
+            } else {
+                ++x;
+                ++y;
+            }
+        }
+        for (; x != x_end; ++x) qubit_weight[x->first]--;
+        for (; y != y_end; ++y) qubit_weight[y->first]++;
+        data = c_data;
+        links = c_links;
+        DIAGNOSE_CHAIN();
+    }
+
     //! const unsafe data accessor
     inline const pair<int, int> &fetch(int q) const { return (*data.find(q)).second; }
 
@@ -58,6 +58,18 @@ class embedding {
 
     frozen_chain frozen;
 
+    //! the variables whose chains have been modified since the last call to
+    //! `clear_changes`, `push_changes` or `pull_changes` (flagged in `changed`)
+    vector<int> changed_vars;
+    vector<char> changed;
+
+    //! undo log: while `journaling`, the first modification of a chain since the
+    //! last `checkpoint()` saves a copy of that chain into `journal`
+    bool journaling;
+    vector<int> journal_vars;
+    vector<char> journaled;
+    vector<frozen_chain> journal;
+
   public:
     //! constructor for an empty embedding
     embedding(embedding_problem_t &e_p)
@@ -72,7 +84,13 @@ class embedding {
               num_fixed(ep.num_fixed()),
               qub_weight(num_qubits + num_reserved, 0),
               var_embedding(),
-              frozen() {
+              frozen(),
+              changed_vars(),
+              changed(num_vars + num_fixed, 0),
+              journaling(false),
+              journal_vars(),
+              journaled(num_vars + num_fixed, 0),
+              journal() {
         for (int q = 0; q < num_vars + num_fixed; q++) var_embedding.emplace_back(qub_weight, q);
         DIAGNOSE_EMB("post base_construct");
     }
@@ -113,13 +131,70 @@ class embedding {
         DIAGNOSE_EMB("post construct");
     }
 
-    //! copy the data from `other.var_embedding` into `this.var_embedding`
+    //! copy the data from `other.var_embedding` into `this.var_embedding`; this
+    //! forgets our changed chains and ends journaling
     embedding<embedding_problem_t> &operator=(const embedding<embedding_problem_t> &other) {
         if (this != &other) var_embedding = other.var_embedding;
+        clear_changes();
+        end_journal();
         DIAGNOSE_EMB("operator=");
         return *this;
     }
 
+    //! forget which chains have changed; that is, declare `this` to be in sync
+    //! with whatever embedding it will next push changes to or pull changes from
+    inline void clear_changes() {
+        for (auto &v : changed_vars) changed[v] = 0;
+        changed_vars.clear();
+    }
+
+    //! copy the chains which have changed since we were last in sync with `other`
+    //! into `other`, making the two identical again.  this costs time proportional
+    //! to the changed chains rather than the entire embedding
+    void push_changes(embedding<embedding_problem_t> &other) {
+        for (auto &v : changed_vars) other.var_embedding[v] = var_embedding[v];
+        clear_changes();
+        DIAGNOSE_EMB("push_changes");
+    }
+
+    //! revert the chains which have changed since we were last in sync with `other`
+    //! to their values in `other`, making the two identical again
+    void pull_changes(const embedding<embedding_problem_t> &other) {
+        for (auto &v : changed_vars) {
+            save_chain(v);
+            var_embedding[v] = other.var_embedding[v];
+        }
+        clear_changes();
+        DIAGNOSE_EMB("pull_changes");
+    }
+
+    //! start journaling, so that `rollback()` will return to the current state
+    void checkpoint() {
+        end_journal();
+        journaling = true;
+    }
+
+    //! return to the state at the last `checkpoint()`, restoring only the chains which have
+    //! been modified since then.  journaling continues from the restored state
+    void rollback() {
+        minorminer_assert(journaling);
+        for (size_t i = 0; i < journal_vars.size(); i++) {
+            int v = journal_vars[i];
+            note_change(v);
+            var_embedding[v].restore(journal[i]);
+            journaled[v] = 0;
+        }
+        journal_vars.clear();
+        DIAGNOSE_EMB("rollback");
+    }
+
+    //! discard the journal and stop journaling
+    inline void end_journal() {
+        for (auto &v : journal_vars) journaled[v] = 0;
+        journal_vars.clear();
+        journaling = false;
+    }
+
     //! Get the variables in a chain
     inline const chain &get_chain(int v) const { return var_embedding[v]; }
 
@@ -145,6 +220,7 @@ class embedding {
     //! Assign a chain for variable u
     inline void set_chain(const int u, const vector<int> &incoming) {
         // remove the current chain and account for its qubits
+        touch(u);
         var_embedding[u] = incoming;
         DIAGNOSE_EMB("set_chain");
     }
@@ -160,6 +236,7 @@ class embedding {
             minorminer_assert(ep.reserved(q));
         }
 #endif
+        touch(u);
         var_embedding[u] = incoming;
         DIAGNOSE_EMB("fix_chain");
     }
@@ -178,6 +255,7 @@ class embedding {
     //!    `q` -> `parents[v][q]` -> `parents[v][parents[v][q]]` ...
     //! terminates in the chain for `v`
     void construct_chain(const int u, const int q, const vector<vector<int>> &parents) {
+        touch_neighborhood(u);
         var_embedding[u].set_root(q);
 
         // extract the paths from each parents list
@@ -197,6 +275,7 @@ class embedding {
     //! this has an opportunity to make shorter chains than `construct_chain`
     void construct_chain_steiner(const int u, const int q, const vector<vector<int>> &parents,
                                  const vector<vector<distance_t>> &distances, vector<vector<int>> &visited_list) {
+        touch_neighborhood(u);
         var_embedding[u].set_root(q);
         for (auto &v : ep.var_neighbors(u)) {
             if (chainsize(v)) {
@@ -223,6 +302,7 @@ class embedding {
     //!  * if the target chainsize is zero, dump the entire segment into the neighbor
     //!  * if the target chainsize is k, stop when the neighbor's size reaches k
     void flip_back(int u, const int target_chainsize) {
+        touch_neighborhood(u);
         for (auto &v : ep.var_neighbors(u))
             if (chainsize(v) && !(ep.fixed(v))) var_embedding[v].steal(var_embedding[u], ep, target_chainsize);
         DIAGNOSE_EMB("flip_back")
@@ -231,6 +311,7 @@ class embedding {
     //! short tearout procedure
     //! blank out the chain, its linking qubits, and account for the qubits being freed
     void tear_out(int u) {
+        touch_neighborhood(u);
         var_embedding[u].clear();
         for (auto &v : ep.var_neighbors(u)) var_embedding[v].drop_link(u);
         DIAGNOSE_EMB("tear_out")
@@ -243,6 +324,7 @@ class embedding {
     //! `thaw_back(u)`, but `thaw_back(u)` MUST be preceeded by at least one
     //! `freeze_out(u)`.  returns the size of the chain being frozen
     int freeze_out(int u) {
+        touch_neighborhood(u);
         int size = var_embedding[u].freeze(var_embedding, frozen);
         DIAGNOSE_EMB("freeze_out")
         return size;
@@ -254,12 +336,14 @@ class embedding {
     //! for `u` must currently be empty (accomplished either by `tear_out(u)` or
     //! `freeze_out(u)`)
     void thaw_back(int u) {
+        touch_neighborhood(u);
         var_embedding[u].thaw(var_embedding, frozen);
         DIAGNOSE_EMB("thaw_back")
     }
 
     //! grow the chain for `u`, stealing all available qubits from neighboring variables
     void steal_all(int u) {
+        touch_neighborhood(u);
         for (auto &v : ep.var_neighbors(u)) {
             if (ep.fixed(v)) continue;
             if (var_embedding[u].get_link(v) == -1) continue;
@@ -325,6 +409,8 @@ class embedding {
         for (auto &q : var_embedding[v]) {  // hax!  this plays nicely with reserved qubits being sources
             for (auto &p : ep.qubit_neighbors(q)) {
                 if (has_qubit(u, p)) {
+                    touch(u);
+                    touch(v);
                     var_embedding[u].set_link(v, p);
                     var_embedding[v].set_link(u, q);
                     return true;
@@ -333,6 +419,8 @@ class embedding {
         }
         for (auto &q : var_embedding[u]) {
             if (has_qubit(v, q)) {
+                touch(u);
+                touch(v);
                 var_embedding[u].set_link(v, q);
                 var_embedding[v].set_link(u, q);
                 return true;
@@ -341,6 +429,36 @@ class embedding {
         return false;
     }
 
+    //! record that the chain for `v` is about to be modified
+    inline void touch(int v) {
+        note_change(v);
+        save_chain(v);
+    }
+
+    //! record that the chains for `u` and its neighbors are about to be modified
+    inline void touch_neighborhood(int u) {
+        touch(u);
+        for (auto &v : ep.var_neighbors(u)) touch(v);
+    }
+
+    //! add `v` to the changed chains
+    inline void note_change(int v) {
+        if (!changed[v]) {
+            changed[v] = 1;
+            changed_vars.push_back(v);
+        }
+    }
+
+    //! if journaling, and the chain for `v` hasn't been saved since the last checkpoint, save it
+    inline void save_chain(int v) {
+        if (journaling && !journaled[v]) {
+            journaled[v] = 1;
+            if (journal.size() == journal_vars.size()) journal.emplace_back();
+            var_embedding[v].save(journal[journal_vars.size()]);
+            journal_vars.push_back(v);
+        }
+    }
+
   public:
     //! print out this embedding to a level of detail that is useful for debugging purposes
     //! TODO describe the output format.
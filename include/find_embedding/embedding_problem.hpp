@@ -58,6 +58,10 @@ class domain_handler_universe {
         std::fill(std::begin(distance) + start, std::begin(distance) + stop, 0);
     }
 
+    //! the single-qubit counterparts of `prepare_visited` and `prepare_distances`
+    static inline int visited_mask(int /*u*/, int /*v*/, int /*q*/) { return 0; }
+    static inline distance_t distance_mask(int /*u*/, int /*q*/, const distance_t & /*mask_d*/) { return 0; }
+
     static inline bool accepts_qubit(int /*u*/, int /*q*/) { return 1; }
 };
 
@@ -114,6 +118,12 @@ class domain_handler_masked {
         for (; dist < dend; dist++, umask++) *dist = (-(*umask)) * mask_d;
     }
 
+    //! the single-qubit counterparts of `prepare_visited` and `prepare_distances`
+    inline int visited_mask(const int u, const int v, const int q) const { return masks[u][q] & masks[v][q]; }
+    inline distance_t distance_mask(const int u, const int q, const distance_t &mask_d) const {
+        return (-masks[u][q]) * mask_d;
+    }
+
     inline bool accepts_qubit(const int u, const int q) { return !(masks[u][q]); }
 };
 
@@ -209,8 +219,10 @@ class embedding_problem_base {
   protected:
     int num_v, num_f, num_q, num_r;
 
-    //! Mutable references to qubit numbers and variable numbers
-    vector<vector<int>> &qubit_nbrs, &var_nbrs;
+    //! References to the qubit neighborhoods (which are shared, and never modified) and the mutable
+    //! variable neighborhoods
+    const vector<vector<int>> &qubit_nbrs;
+    vector<vector<int>> &var_nbrs;
 
     //! distribution over [0, 0xffffffff]
     uniform_int_distribution<> rand;
@@ -230,7 +242,7 @@ class embedding_problem_base {
     int initialized, embedded, desperate, target_chainsize, improved, weight_bound;
 
     embedding_problem_base(optional_parameters &p_, int n_v, int n_f, int n_q, int n_r, vector<vector<int>> &v_n,
-                           vector<vector<int>> &q_n)
+                           const vector<vector<int>> &q_n)
             : num_v(n_v),
               num_f(n_f),
               num_q(n_q),
@@ -475,7 +487,7 @@ class embedding_problem : public embedding_problem_base,
 
   public:
     embedding_problem(optional_parameters &p, int n_v, int n_f, int n_q, int n_r, vector<vector<int>> &v_n,
-                      vector<vector<int>> &q_n)
+                      const vector<vector<int>> &q_n)
             : embedding_problem_base(p, n_v, n_f, n_q, n_r, v_n, q_n),
               fixed_handler(p, n_v, n_f, n_q, n_r),
               domain_handler(p, n_v, n_f, n_q, n_r),
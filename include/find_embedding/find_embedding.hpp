@@ -15,6 +15,9 @@
 #pragma once
 
 #include <algorithm>
+#include <atomic>
+#include <deque>
+#include <exception>
 #include <random>
 #include <set>
 #include <string>
@@ -26,6 +29,26 @@
 
 namespace find_embedding {
 
+//! The preprocessing of a target graph which depends on nothing else: its connected components, and the
+//! neighborhoods within the largest of them.  Instances are never modified after construction, so a single
+//! one can be shared by any number of embedding problems, including concurrent ones (see `parameter_processor`).
+class target_components {
+  public:
+    unsigned int num_qubits;
+    graph::components components;
+    vector<vector<int>> neighbors;
+
+    target_components(const graph::input_graph &qubit_g)
+            : num_qubits(qubit_g.num_nodes()), components(qubit_g), neighbors(components.component_neighbors(0)) {}
+
+    target_components(const graph::input_graph &qubit_g, const vector<int> &reserved)
+            : num_qubits(qubit_g.num_nodes()),
+              components(qubit_g, reserved),
+              neighbors(components.component_neighbors(0)) {}
+};
+
+typedef shared_ptr<const target_components> TargetComponentsPtr;
+
 class parameter_processor {
   public:
     unsigned int num_vars;
@@ -35,7 +58,8 @@ class parameter_processor {
     vector<int> var_fixed_unscrewed;
     unsigned int num_reserved;
 
-    graph::components qub_components;
+    TargetComponentsPtr target;
+    const graph::components &qub_components;
     unsigned int problem_qubits;
     unsigned int problem_reserved;
 
@@ -45,8 +69,12 @@ class parameter_processor {
 
     optional_parameters params;
     vector<vector<int>> var_nbrs;
-    vector<vector<int>> qubit_nbrs;
-    parameter_processor(graph::input_graph &var_g, graph::input_graph &qubit_g, optional_parameters &params_)
+    const vector<vector<int>> &qubit_nbrs;
+
+    //! if `prepared` is given, it must have been computed from `qubit_g`; it is used in place of computing the
+    //! components of `qubit_g` again, unless the fixed chains reserve some qubits (which changes the components)
+    parameter_processor(graph::input_graph &var_g, graph::input_graph &qubit_g, optional_parameters &params_,
+                        TargetComponentsPtr prepared = TargetComponentsPtr())
             : num_vars(var_g.num_nodes()),
               num_qubits(qubit_g.num_nodes()),
 
@@ -54,7 +82,8 @@ class parameter_processor {
               var_fixed_unscrewed(num_vars, 0),
               num_reserved(_reserved(params_)),
 
-              qub_components(qubit_g, qub_reserved_unscrewed),
+              target(_target(qubit_g, prepared)),
+              qub_components(target->components),
               problem_qubits(qub_components.size(0)),
               problem_reserved(qub_components.num_reserved(0)),
 
@@ -66,9 +95,14 @@ class parameter_processor {
                      input_chains(params_.restrict_chains)),
 
               var_nbrs(var_g.get_neighbors_sinks(var_fixed_unscrewed, screw_vars)),
-              qubit_nbrs(qub_components.component_neighbors(0)) {}
+              qubit_nbrs(target->neighbors) {}
 
   private:
+    TargetComponentsPtr _target(graph::input_graph &qubit_g, TargetComponentsPtr &prepared) {
+        if (prepared && num_reserved == 0 && prepared->num_qubits == num_qubits) return prepared;
+        return std::make_shared<const target_components>(qubit_g, qub_reserved_unscrewed);
+    }
+
     inline unsigned int _reserved(optional_parameters &params_) {
         unsigned int r = 0;
         for (auto &vC : params_.fixed_chains) {
@@ -141,38 +175,277 @@ class pathfinder_type {
                                       pathfinder_serial<embedding_problem_t>>::type pathfinder_t;
 };
 
+//! Shared state of a portfolio run: the searches poll `finished` and wind down
+//! gracefully once any of them has succeeded (or been cancelled), and output from
+//! the worker threads is serialized through `output`.
+struct portfolio_state {
+    std::atomic<bool> finished;
+    mutex output;
+    portfolio_state() : finished(false), output() {}
+};
+
+//! A LocalInteraction shared by the searches of a portfolio run.  Output and
+//! cancellation are forwarded to the user's interaction; in addition, a search
+//! is considered to have timed out as soon as the portfolio is finished, which
+//! makes `pathfinder_base::check_stops` return gracefully.
+class LocalInteractionPortfolio : public LocalInteraction {
+    LocalInteractionPtr base;
+    portfolio_state &state;
+
+  public:
+    LocalInteractionPortfolio(LocalInteractionPtr b, portfolio_state &s) : base(b), state(s) {}
+    virtual ~LocalInteractionPortfolio() {}
+
+  private:
+    virtual void displayOutputImpl(int loglevel, const string &msg) const {
+        std::lock_guard<mutex> lock(state.output);
+        base->displayOutput(loglevel, msg);
+    }
+
+    virtual void displayErrorImpl(int loglevel, const string &msg) const {
+        std::lock_guard<mutex> lock(state.output);
+        base->displayError(loglevel, msg);
+    }
+
+    virtual bool timedOutImpl(const clock::time_point stoptime) const {
+        return state.finished || clock::now() >= stoptime;
+    }
+
+    virtual bool cancelledImpl() const {
+        try {
+            base->cancelled(clock::time_point::max());
+        } catch (const ProblemCancelledException & /*e*/) {
+            state.finished = true;
+            return true;
+        }
+        return false;
+    }
+
+    //! a search asking to stop brings the whole portfolio down with it
+    virtual bool improvedImpl(const embedding_view &emb) const {
+        std::lock_guard<mutex> lock(state.output);
+        if (base->improved(emb)) state.finished = true;
+        return state.finished;
+    }
+};
+
+//! A LocalInteraction which forwards everything to the user's interaction,
+//! translating the embeddings reported by `improved` from the variable and
+//! qubit indices used by the pathfinders back into those of the caller.
+class LocalInteractionRelabel : public LocalInteraction {
+    LocalInteractionPtr base;
+    const parameter_processor &pp;
+
+    class relabeled_view : public embedding_view {
+        const parameter_processor &pp;
+        const embedding_view &emb;
+
+      public:
+        relabeled_view(const parameter_processor &p, const embedding_view &e) : pp(p), emb(e) {}
+        virtual bool embedded() const override { return emb.embedded(); }
+        virtual const vector<int> &statistics() const override { return emb.statistics(); }
+        virtual int num_vars() const override { return pp.num_vars; }
+        virtual void get_chain(int u, vector<int> &output) const override {
+            vector<int> chain;
+            emb.get_chain(pp.screw_vars[u], chain);
+            pp.qub_components.from_component(0, chain, output);
+        }
+    };
+
+  public:
+    LocalInteractionRelabel(LocalInteractionPtr b, const parameter_processor &p) : base(b), pp(p) {}
+    virtual ~LocalInteractionRelabel() {}
+
+  private:
+    virtual void displayOutputImpl(int loglevel, const string &msg) const { base->displayOutput(loglevel, msg); }
+
+    virtual void displayErrorImpl(int loglevel, const string &msg) const { base->displayError(loglevel, msg); }
+
+    virtual bool cancelledImpl() const {
+        try {
+            base->cancelled(clock::time_point::max());
+        } catch (const ProblemCancelledException & /*e*/) {
+            return true;
+        }
+        return false;
+    }
+
+    virtual bool improvedImpl(const embedding_view &emb) const { return base->improved(relabeled_view(pp, emb)); }
+};
+
+//! Owns the preprocessed problem and the pathfinder(s) that embed it.
+//!
+//! When `params.portfolio` is greater than one, the wrapper holds that many
+//! independent pathfinders, each with its own random seed (drawn from the
+//! user's generator) and its own copy of the variable neighborhoods (which
+//! the heuristic shuffles in place).  `heuristicEmbedding` then runs them
+//! concurrently, one on the calling thread and the rest on worker threads.
+//! As soon as one succeeds the others are stopped, and the best embedding
+//! among all of them (successful first, then by `embedding::statistics`) is
+//! the one reported by `get_chain`.  `quickPass` is greedy and runs once, on
+//! the embedding reported by `get_chain`; its result, like the chains given
+//! to `set_best_chains`, is then shared by every search of the portfolio.
 class pathfinder_wrapper {
     parameter_processor pp;
-    std::unique_ptr<pathfinder_public_interface> pf;
+    portfolio_state portfolio;
+    std::deque<optional_parameters> portfolio_params;
+    std::deque<vector<vector<int>>> portfolio_nbrs;
+    vector<std::unique_ptr<pathfinder_public_interface>> pfs;
+    size_t best;
 
   public:
-    pathfinder_wrapper(graph::input_graph &var_g, graph::input_graph &qubit_g, optional_parameters &params_)
-            : pp(var_g, qubit_g, params_),
-              pf(_pf_parse(pp.params, pp.num_vars - pp.num_fixed, pp.num_fixed, pp.problem_qubits - pp.problem_reserved,
-                           pp.problem_reserved, pp.var_nbrs, pp.qubit_nbrs)) {}
+    pathfinder_wrapper(graph::input_graph &var_g, graph::input_graph &qubit_g, optional_parameters &params_,
+                       TargetComponentsPtr prepared = TargetComponentsPtr())
+            : pp(var_g, qubit_g, params_, prepared),
+              portfolio(),
+              portfolio_params(),
+              portfolio_nbrs(),
+              pfs(),
+              best(0) {
+        pp.params.localInteractionPtr.reset(new LocalInteractionRelabel(pp.params.localInteractionPtr, pp));
+        pfs.push_back(_pf_parse(pp.params, pp.num_vars - pp.num_fixed, pp.num_fixed,
+                                pp.problem_qubits - pp.problem_reserved, pp.problem_reserved, pp.var_nbrs,
+                                pp.qubit_nbrs));
+        if (pp.params.portfolio > 1) {
+            pp.params.localInteractionPtr.reset(new LocalInteractionPortfolio(pp.params.localInteractionPtr, portfolio));
+            for (int i = 1; i < pp.params.portfolio; i++) {
+                portfolio_params.emplace_back(pp.params, pp.params.fixed_chains, pp.params.initial_chains,
+                                              pp.params.restrict_chains);
+                portfolio_nbrs.push_back(pp.var_nbrs);
+                pfs.push_back(_pf_parse(portfolio_params.back(), pp.num_vars - pp.num_fixed, pp.num_fixed,
+                                        pp.problem_qubits - pp.problem_reserved, pp.problem_reserved,
+                                        portfolio_nbrs.back(), pp.qubit_nbrs));
+            }
+        }
+    }
 
     ~pathfinder_wrapper() {}
 
     void get_chain(int u, vector<int> &output) const {
-        pp.qub_components.from_component(0, pf->get_chain(pp.screw_vars[u]), output);
+        pp.qub_components.from_component(0, pfs[best]->get_chain(pp.screw_vars[u]), output);
     }
 
-    int heuristicEmbedding() { return pf->heuristicEmbedding(); }
+    int heuristicEmbedding() {
+        best = 0;
+        if (pfs.size() == 1) return pfs[0]->heuristicEmbedding();
+
+        portfolio.finished = false;
+        vector<int> success(pfs.size(), 0);
+        vector<std::exception_ptr> errors(pfs.size());
+        auto search = [this, &success, &errors](size_t i) {
+            try {
+                success[i] = pfs[i]->heuristicEmbedding();
+                if (success[i]) portfolio.finished = true;
+            } catch (...) {
+                errors[i] = std::current_exception();
+                portfolio.finished = true;
+            }
+        };
+        vector<thread> workers;
+        for (size_t i = 1; i < pfs.size(); i++) workers.emplace_back(search, i);
+        search(0);
+        for (auto &w : workers) w.join();
+        for (auto &e : errors)
+            if (e) std::rethrow_exception(e);
+
+        for (size_t i = 1; i < pfs.size(); i++) {
+            if (success[i] != success[best]) {
+                if (success[i]) best = i;
+            } else if (better_statistics(pfs[i]->get_statistics(), pfs[best]->get_statistics())) {
+                best = i;
+            }
+        }
+        return success[best];
+    }
 
     int num_vars() { return pp.num_vars; }
 
-    void set_initial_chains(map<int, vector<int>> &init) { pf->set_initial_chains(pp.input_chains(init)); }
+    void set_initial_chains(map<int, vector<int>> &init) {
+        auto chains = pp.input_chains(init);
+        for (auto &pf : pfs) pf->set_initial_chains(chains);
+    }
+
+    //! replace the embedding reported by `get_chain`, as when restoring a saved state
+    void set_best_chains(map<int, vector<int>> &chains) {
+        best = 0;
+        auto input = pp.input_chains(chains);
+        for (auto &pf : pfs) pf->set_best_chains(input);
+    }
+
+    //! append the states of the random number generators of each search to `state`, two words apiece
+    void get_rng_state(vector<uint64_t> &state) const {
+        uint64_t s0, s1;
+        pp.params.rng.get_state(s0, s1);
+        state.push_back(s0);
+        state.push_back(s1);
+        for (auto &p : portfolio_params) {
+            p.rng.get_state(s0, s1);
+            state.push_back(s0);
+            state.push_back(s1);
+        }
+    }
+
+    //! restore the states read by `get_rng_state`
+    void set_rng_state(const vector<uint64_t> &state) {
+        if (state.size() != 2 * (portfolio_params.size() + 1)) throw CorruptParametersException("bad rng state");
+        pp.params.rng.set_state(state[0], state[1]);
+        size_t i = 2;
+        for (auto &p : portfolio_params) {
+            p.rng.set_state(state[i], state[i + 1]);
+            i += 2;
+        }
+    }
+
+    //! draw a seed from the random number generator of this search, e.g. to seed another one
+    uint64_t draw_seed() { return pp.params.rng(); }
+
+    //! reseed the random number generators of each search
+    void seed(uint64_t randomSeed) {
+        pp.params.seed(randomSeed);
+        for (auto &p : portfolio_params) p.seed(pp.params.rng());
+    }
 
     void quickPass(vector<int> &varorder, int chainlength_bound, int overlap_bound, bool local_search, bool clear_first,
                    double round_beta) {
-        pf->quickPass(pp.input_vars(varorder), chainlength_bound, overlap_bound, local_search, clear_first, round_beta);
+        pfs[best]->quickPass(pp.input_vars(varorder), chainlength_bound, overlap_bound, local_search, clear_first,
+                             round_beta);
+        share_best();
     }
     void quickPass(VARORDER varorder, int chainlength_bound, int overlap_bound, bool local_search, bool clear_first,
                    double round_beta) {
-        pf->quickPass(varorder, chainlength_bound, overlap_bound, local_search, clear_first, round_beta);
+        pfs[best]->quickPass(varorder, chainlength_bound, overlap_bound, local_search, clear_first, round_beta);
+        share_best();
     }
 
   private:
+    //! copy the embedding reported by `get_chain` into every other search of the portfolio, so that they all carry
+    //! on from the same chains
+    void share_best() {
+        if (pfs.size() > 1) {
+            map<int, vector<int>> chains;
+            for (int u = pp.num_vars - pp.num_fixed; u--;) {
+                auto &c = pfs[best]->get_chain(u);
+                if (c.size() == 0) continue;
+                auto &chain = chains[u];
+                for (auto &q : c) chain.push_back(q);
+            }
+            for (size_t i = 0; i < pfs.size(); i++)
+                if (i != best) pfs[i]->set_best_chains(chains);
+        }
+        best = 0;
+    }
+
+    //! returns true if the statistics `a` are strictly better than `b`, using the same ordering as
+    //! `pathfinder_base::check_improvement`: the smaller maximum wins, then the smaller count at that
+    //! maximum, and so on down the histogram.  empty statistics (nothing recorded) always lose.
+    static bool better_statistics(const vector<int> &a, const vector<int> &b) {
+        if (a.size() == 0 || b.size() == 0) return b.size() < a.size();
+        if (a.size() != b.size()) return a.size() < b.size();
+        for (size_t i = a.size(); i--;)
+            if (a[i] != b[i]) return a[i] < b[i];
+        return false;
+    }
+
     template <bool parallel, bool fixed, bool restricted, bool verbose, typename... Args>
     inline std::unique_ptr<pathfinder_public_interface> _pf_parse4(Args &&... args) {
         return std::unique_ptr<pathfinder_public_interface>(static_cast<pathfinder_public_interface *>(
@@ -228,10 +501,13 @@ class pathfinder_wrapper {
 //!     serial and parallel
 //! The optional parameters themselves can be found in util.hpp.  Respectively,
 //! the controlling options for the above are restrict_chains, fixed_chains,
-//! and threads.
+//! and threads.  Independently, the portfolio parameter runs several such
+//! searches concurrently (see `pathfinder_wrapper`).  Callers embedding into the same
+//! target graph many times can compute its `target_components` once, and pass them as
+//! `prepared`.
 int findEmbedding(graph::input_graph &var_g, graph::input_graph &qubit_g, optional_parameters &params,
-                  vector<vector<int>> &chains) {
-    pathfinder_wrapper pf(var_g, qubit_g, params);
+                  vector<vector<int>> &chains, TargetComponentsPtr prepared = TargetComponentsPtr()) {
+    pathfinder_wrapper pf(var_g, qubit_g, params, prepared);
     int success = pf.heuristicEmbedding();
 
     if (params.return_overlap || success) {
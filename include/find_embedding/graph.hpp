@@ -14,6 +14,10 @@
 
 #pragma once
 
+#include <algorithm>
+#include <cstdint>
+#include <cstdlib>
+#include <limits>
 #include <map>
 #include <random>
 #include <set>
@@ -335,4 +339,91 @@ class components {
     std::vector<std::vector<int>> component;
     std::vector<input_graph> component_g;
 };
+
+//! An oracle for hop distances in a fixed graph.
+//!
+//! Breadth-first search tables from a few landmark nodes give, through the triangle
+//! inequality, lower and upper bounds on the distance between any two nodes in time
+//! and memory linear in the number of landmarks.  Landmarks are chosen farthest-first,
+//! so that each connected component receives one before any receives a second, and
+//! nodes in distinct components are recognized as such whenever there are at least as
+//! many landmarks as components.  Exact distances from a node are computed on demand.
+//!
+//! Distances are stored in 16 bits, so graphs are limited to 65535 nodes.
+class distance_oracle {
+  public:
+    typedef uint16_t distance_t;
+    enum : distance_t { unreachable = std::numeric_limits<distance_t>::max() };
+
+  private:
+    std::vector<std::vector<int>> nbrs;
+    std::vector<int> landmarks;
+    std::vector<std::vector<distance_t>> tables;
+
+  public:
+    distance_oracle(const input_graph& g, int num_landmarks) : nbrs(g.get_neighbors()), landmarks(), tables() {
+        minorminer_assert(g.num_nodes() < unreachable);
+        size_t n = nbrs.size();
+        if (n == 0) return;
+        // the distance from each node to the nearest landmark chosen so far
+        std::vector<distance_t> nearest(n, static_cast<distance_t>(unreachable));
+        int next = 0;
+        while (static_cast<int>(landmarks.size()) < num_landmarks) {
+            landmarks.push_back(next);
+            tables.emplace_back();
+            distances_from(next, tables.back());
+            auto& table = tables.back();
+            for (size_t x = 0; x < n; x++) nearest[x] = std::min(nearest[x], table[x]);
+            next = static_cast<int>(std::max_element(std::begin(nearest), std::end(nearest)) - std::begin(nearest));
+            if (nearest[next] == 0) break;
+        }
+    }
+
+    //! the number of nodes in the graph
+    size_t num_nodes() const { return nbrs.size(); }
+
+    //! the landmark nodes, in the order they were chosen
+    const std::vector<int>& get_landmarks() const { return landmarks; }
+
+    //! fill `out` with the distance from `u` to every node (`unreachable` for nodes in other components)
+    void distances_from(int u, std::vector<distance_t>& out) const {
+        out.assign(nbrs.size(), static_cast<distance_t>(unreachable));
+        std::vector<int> frontier{u}, next;
+        out[u] = 0;
+        for (distance_t d = 1; frontier.size(); d++) {
+            next.clear();
+            for (auto& x : frontier)
+                for (auto& y : nbrs[x])
+                    if (out[y] == unreachable) {
+                        out[y] = d;
+                        next.push_back(y);
+                    }
+            frontier.swap(next);
+        }
+    }
+
+    //! a lower bound on the distance between `u` and `v`, or `unreachable` if they are
+    //! known to lie in distinct components
+    int lower_bound(int u, int v) const {
+        int bound = 0;
+        for (auto& table : tables) {
+            int du = table[u], dv = table[v];
+            if ((du == unreachable) != (dv == unreachable)) return unreachable;
+            if (du != unreachable) bound = std::max(bound, std::abs(du - dv));
+        }
+        return bound;
+    }
+
+    //! an upper bound on the distance between `u` and `v`, or `unreachable` if no landmark
+    //! reaches both
+    int upper_bound(int u, int v) const {
+        if (u == v) return 0;
+        int bound = unreachable;
+        for (auto& table : tables) {
+            int du = table[u], dv = table[v];
+            if (du != unreachable && dv != unreachable) bound = std::min(bound, du + dv);
+        }
+        return bound;
+    }
+};
 }  // namespace graph
@@ -16,7 +16,6 @@
 
 #include <algorithm>
 #include <functional>
-#include <future>
 #include <iostream>
 #include <limits>
 #include <mutex>
@@ -55,8 +54,10 @@ class pathfinder_public_interface {
   public:
     virtual int heuristicEmbedding() = 0;
     virtual const chain &get_chain(int) const = 0;
+    virtual const vector<int> &get_statistics() const = 0;
     virtual ~pathfinder_public_interface(){};
     virtual void set_initial_chains(map<int, vector<int>>) = 0;
+    virtual void set_best_chains(map<int, vector<int>>) = 0;
     virtual void quickPass(const vector<int> &, int, int, bool, bool, double) = 0;
     virtual void quickPass(VARORDER, int, int, bool, bool, double) = 0;
 };
@@ -75,10 +76,13 @@ class pathfinder_base : public pathfinder_public_interface {
     optional_parameters &params;
 
     embedding_t bestEmbedding;
-    embedding_t lastEmbedding;
     embedding_t currEmbedding;
     embedding_t initEmbedding;
 
+    //! true when `currEmbedding` differs from `bestEmbedding` only in the chains it
+    //! has recorded as changed, so the two can be synchronized incrementally
+    bool best_synced;
+
     int num_qubits, num_reserved;
     int num_vars, num_fixed;
 
@@ -101,15 +105,31 @@ class pathfinder_base : public pathfinder_public_interface {
     vector<vector<distance_t>> distances;
     vector<vector<int>> qubit_permutations;
 
+    //! scratch space for `compute_root_distances`
+    vector<int> search_nbrs;
+    vector<distance_queue> search_queues;
+    vector<int> settled_count;
+    vector<distance_t> bucket_min;
+
+    //! scratch space for `prepare_windowed_root_distances`: whether the current search is windowed, the
+    //! qubits in the window and bordering it, and the stamp marking the qubits already placed in either
+    bool window_active;
+    vector<int> window;
+    vector<int> window_border;
+    vector<int> window_frontier;
+    vector<int> window_next;
+    vector<unsigned int> window_mark;
+    unsigned int window_stamp;
+
   public:
     pathfinder_base(optional_parameters &p_, int &n_v, int &n_f, int &n_q, int &n_r, vector<vector<int>> &v_n,
-                    vector<vector<int>> &q_n)
+                    const vector<vector<int>> &q_n)
             : ep(p_, n_v, n_f, n_q, n_r, v_n, q_n),
               params(p_),
               bestEmbedding(ep),
-              lastEmbedding(ep),
               currEmbedding(ep),
               initEmbedding(ep, params.fixed_chains, params.initial_chains),
+              best_synced(false),
               num_qubits(ep.num_qubits()),
               num_reserved(ep.num_reserved()),
               num_vars(ep.num_vars()),
@@ -122,7 +142,18 @@ class pathfinder_base : public pathfinder_public_interface {
               best_stats(),
               visited_list(num_vars + num_fixed, vector<int>(num_qubits)),
               distances(num_vars + num_fixed, vector<distance_t>(num_qubits + num_reserved, 0)),
-              qubit_permutations() {
+              qubit_permutations(),
+              search_nbrs(),
+              search_queues(),
+              settled_count(num_qubits, 0),
+              bucket_min(),
+              window_active(false),
+              window(),
+              window_border(),
+              window_frontier(),
+              window_next(),
+              window_mark(num_qubits + num_reserved, 0),
+              window_stamp(0) {
         vector<int> permutation(num_qubits);
         for (int q = num_qubits; q--;) permutation[q] = q;
         for (int v = num_vars + num_reserved; v--;) {
@@ -136,10 +167,52 @@ class pathfinder_base : public pathfinder_public_interface {
         initEmbedding = embedding_t(ep, params.fixed_chains, chains);
     }
 
+    //! replace the best embedding found so far (along with the fixed chains), as when restoring a saved state
+    virtual void set_best_chains(map<int, vector<int>> chains) override {
+        bestEmbedding = embedding_t(ep, params.fixed_chains, chains);
+        best_synced = false;
+        best_stats.clear();
+    }
+
     virtual ~pathfinder_base() {}
 
-    //! nonzero return if this is an improvement on our previous best embedding
+    //! presents `bestEmbedding` and `best_stats` to `LocalInteraction::improved`
+    class best_view : public embedding_view {
+        const pathfinder_base &pf;
+
+      public:
+        best_view(const pathfinder_base &p) : pf(p) {}
+        virtual bool embedded() const override { return pf.ep.embedded; }
+        virtual const vector<int> &statistics() const override { return pf.best_stats; }
+        virtual int num_vars() const override { return pf.num_vars + pf.num_fixed; }
+        virtual void get_chain(int u, vector<int> &output) const override {
+            for (auto &q : pf.bestEmbedding.get_chain(u)) output.push_back(q);
+        }
+    };
+
+    //! true if `LocalInteraction::improved` has asked us to stop, or the quality targets have been reached
+    bool stop_requested() const { return stoptime == clock::time_point::min(); }
+
+    //! true if `bestEmbedding` is an embedding which meets the `chainlength_target` and
+    //! `total_chainlength_target` parameters (and at least one of them is set)
+    bool reached_targets() const {
+        if (!ep.embedded || !(params.chainlength_target || params.total_chainlength_target)) return false;
+        int max_length = static_cast<int>(best_stats.size()) - 1;
+        if (params.chainlength_target && max_length > params.chainlength_target) return false;
+        if (params.total_chainlength_target) {
+            long long int total = 0;
+            for (int length = max_length; length > 0; length--) total += length * best_stats[length];
+            if (total > params.total_chainlength_target) return false;
+        }
+        return true;
+    }
+
+    //! nonzero return if this is an improvement on our previous best embedding.  improvements are reported
+    //! through `LocalInteraction::improved`, which may ask us to stop (as does reaching the quality targets) --
+    //! in which case, the stop time is moved up so that the next call to `check_stops` winds the search down,
+    //! and `bestEmbedding` is frozen so that the last embedding reported is the one returned
     bool check_improvement(const embedding_t &emb) {
+        if (stop_requested()) return 0;
         bool better = 0;
         int embedded = emb.statistics(tmp_stats);
         if (embedded > ep.embedded) {
@@ -179,15 +252,57 @@ class pathfinder_base : public pathfinder_public_interface {
             }
         }
         if (better) {
-            bestEmbedding = emb;
+            if (&emb == &currEmbedding) {
+                save_best();
+            } else {
+                bestEmbedding = emb;
+                best_synced = false;
+            }
             tmp_stats.swap(best_stats);
+            bool stop = params.localInteractionPtr->improved(best_view(*this));
+            if (reached_targets()) {
+                ep.major_info("quality targets reached\n");
+                stop = true;
+            }
+            if (stop) stoptime = clock::time_point::min();
         }
         return better;
     }
 
+    //! copy `currEmbedding` into `bestEmbedding`
+    void save_best() {
+        if (best_synced) {
+            currEmbedding.push_changes(bestEmbedding);
+        } else {
+            bestEmbedding = currEmbedding;
+            currEmbedding.clear_changes();
+            best_synced = true;
+        }
+    }
+
+    //! copy `bestEmbedding` into `currEmbedding`
+    void restore_best() {
+        if (best_synced) {
+            currEmbedding.pull_changes(bestEmbedding);
+        } else {
+            currEmbedding = bestEmbedding;
+            best_synced = true;
+        }
+    }
+
+    //! copy `initEmbedding` into `currEmbedding`
+    void restore_init() {
+        currEmbedding = initEmbedding;
+        best_synced = false;
+    }
+
     //! chain accessor
     virtual const chain &get_chain(int u) const override { return bestEmbedding.get_chain(u); }
 
+    //! statistics of the best embedding found so far, as computed by `embedding::statistics`
+    //! (empty if no embedding has been recorded yet)
+    virtual const vector<int> &get_statistics() const override { return best_stats; }
+
   protected:
     //! tear out and replace the chain in `emb` for variable `u`
     int find_chain(embedding_t &emb, const int u) {
@@ -209,7 +324,10 @@ class pathfinder_base : public pathfinder_public_interface {
         try {
             params.localInteractionPtr->cancelled(stoptime);
         } catch (const TimeoutException & /*e*/) {
-            ep.major_info("problem timed out");
+            //a portfolio stops its other searches, ahead of their stop time, as soon as one of them succeeds or
+            //is cancelled
+            if (!stop_requested())
+                ep.major_info(clock::now() >= stoptime ? "problem timed out" : "search stopped by the portfolio");
             return -2;
         } catch (const ProblemCancelledException & /*e*/) {
             ep.major_info("problem cancelled via keyboard interrupt");
@@ -244,7 +362,7 @@ class pathfinder_base : public pathfinder_public_interface {
             if (!find_chain(emb, u)) return -1;
 
             improved |= check_improvement(emb);
-            if (ep.embedded) break;
+            if (ep.embedded || stop_requested()) break;
         }
         return check_stops(static_cast<int>(improved));
     }
@@ -280,7 +398,7 @@ class pathfinder_base : public pathfinder_public_interface {
                 }
             }
             improved |= check_improvement(emb);
-            if (ep.embedded) break;
+            if (ep.embedded || stop_requested()) break;
         }
         ep.weight_bound = oldbound;
         if (!improved) pushback += (num_vars * 2) / params.inner_rounds;
@@ -298,6 +416,7 @@ class pathfinder_base : public pathfinder_public_interface {
             if (!find_chain(emb, u)) return -1;
 
             improved |= check_improvement(emb);
+            if (stop_requested()) break;
         }
         return check_stops(improved);
     }
@@ -359,7 +478,10 @@ class pathfinder_base : public pathfinder_public_interface {
         prepare_root_distances(emb, u);
 
         // select a random root among those qubits at minimum heuristic distance
-        collectMinima(total_distance, min_list);
+        if (window_active)
+            collectMinima(total_distance, window, min_list);
+        else
+            collectMinima(total_distance, min_list);
 
         int q0 = min_list[ep.randint(0, static_cast<int>(min_list.size()) - 1)];
         if (total_distance[q0] == max_distance) return 0;  // oops all qubits were overfull or unreachable
@@ -427,6 +549,7 @@ class pathfinder_base : public pathfinder_public_interface {
                             visited[p] = 1;
                             if (!emb.weight(p)) {
                                 parent[p] = q;
+                                distance[p] = d;
                                 pq.emplace(p, permutation[p], d);
                             }
                         }
@@ -451,6 +574,7 @@ class pathfinder_base : public pathfinder_public_interface {
         static_assert(std::is_same<behavior_tag, embedded_tag>::value || std::is_same<behavior_tag, default_tag>::value,
                       "unknown behavior tag");
         auto &permutation = qubit_permutations[v];
+        auto &distance = distances[v];
 
         // scan through the qubits.
         // * qubits in the chain of v have distance 0,
@@ -463,11 +587,13 @@ class pathfinder_base : public pathfinder_public_interface {
                     if (std::is_same<behavior_tag, embedded_tag>::value)
                         if (emb.weight(p) == 0) {
                             pq.emplace(p, permutation[p], 1);
+                            distance[p] = 1;
                             parent[p] = q;
                             visited[p] = 1;
                         }
                     if (std::is_same<behavior_tag, default_tag>::value) {
                         pq.emplace(p, permutation[p], qubit_weight[p]);
+                        distance[p] = qubit_weight[p];
                         parent[p] = q;
                         visited[p] = 1;
                     }
@@ -476,6 +602,7 @@ class pathfinder_base : public pathfinder_public_interface {
         } else {
             for (auto &q : emb.get_chain(v)) {
                 pq.emplace(q, permutation[q], 0);
+                distance[q] = 0;
                 parent[q] = -1;
                 visited[q] = 1;
             }
@@ -506,11 +633,227 @@ class pathfinder_base : public pathfinder_public_interface {
                         distance[p] = max_distance;
                     } else {
                         parent[p] = z.node;
-                        pq.emplace(p, permutation[p], z.dist + qubit_weight[p]);
+                        distance[p] = z.dist + qubit_weight[p];
+                        pq.emplace(p, permutation[p], distance[p]);
+                    }
+                }
+            }
+        }
+    }
+
+    //! compute `total_distance`, the sum of distances from the neighboring chains of `u`, to the same effect as
+    //! running `compute_distances_from_chain` and `accumulate_distance` for each neighbor -- except that the
+    //! searches are run in lockstep, and stop as soon as no qubit which hasn't been reached by every search can
+    //! beat the best root found so far.  such qubits get a total distance of `max_distance`; their true total
+    //! distance exceeds the minimum, so the set of minimum-distance roots (and the chain that is ultimately
+    //! built from one) is unchanged.  precondition: `total_distance` has been prepared and qubit weights have
+    //! been computed.  returns the number of neighbors of `u` with chains
+    //!
+    //! note: the searches are not cached between calls.  a distance field from the chain of `v` depends on the
+    //! fill of every qubit it reaches, including those of the chain of `u` that was just torn out -- so the
+    //! field computed while placing `u` is never valid when `v` is next searched for a different variable, and
+    //! `find_chain` swaps qubit permutations (which break ties between equidistant parents) on every call.
+    //!
+    //! when `window_active`, every qubit outside of `window` is ignored, and the searches are kept inside of it
+    //! (see `prepare_windowed_root_distances`)
+    int compute_root_distances(const embedding_t &emb, const int u) {
+        search_nbrs.clear();
+        for (auto &v : ep.var_neighbors(u))
+            if (emb.chainsize(v)) search_nbrs.push_back(v);
+        const int k = static_cast<int>(search_nbrs.size());
+        if (k == 0) return 0;
+
+        // total_distance is seeded with the cost of the neighboring chains, and qubits which can never be
+        // roots are knocked out up front so that they don't weaken the stopping criterion below
+        for (auto &v : search_nbrs) accumulate_distance_at_chain(emb, v);
+        for_each_candidate([this, &emb](int q) {
+            if (ep.reserved(q) || emb.weight(q) >= ep.weight_bound) total_distance[q] = max_distance;
+            settled_count[q] = 0;
+        });
+        bucket_min.assign(k, max_distance);
+
+        // fronts holds one entry per nonempty search, keyed by the distance at the top of its queue
+        min_queue<distance_t> fronts;
+        while (static_cast<int>(search_queues.size()) < k) search_queues.emplace_back(num_qubits + num_reserved);
+        for (int i = 0; i < k; i++) {
+            int v = search_nbrs[i];
+            auto &pq = search_queues[i];
+            pq.reset();
+            prepare_search_visited(visited_list[v], u, v);
+            dijkstra_initialize_chain(emb, v, parents[v], visited_list[v], pq, default_tag{});
+            if (!pq.empty()) fronts.emplace(i, i, pq.top().dist);
+        }
+
+        distance_t best = max_distance;
+        distance_t radius = -1;
+        while (!fronts.empty()) {
+            auto front = fronts.top();
+            if (front.dist != radius) {
+                // every qubit that some search hasn't settled is at least `radius` from that search's chain
+                radius = front.dist;
+                if (best != max_distance && root_distance_bound(radius, k) > best) break;
+            }
+            fronts.pop();
+            int i = front.node;
+            int q = root_search_step(emb, i);
+            if (q < num_qubits) {
+                int c = ++settled_count[q];
+                if (total_distance[q] != max_distance) {
+                    total_distance[q] += distances[search_nbrs[i]][q];
+                    if (c == k)
+                        best = min(best, total_distance[q]);
+                    else
+                        bucket_min[c] = min(bucket_min[c], total_distance[q]);
+                }
+            }
+            if (!search_queues[i].empty()) fronts.emplace(i, i, search_queues[i].top().dist);
+        }
+
+        for_each_candidate([this, k](int q) {
+            if (settled_count[q] != k) total_distance[q] = max_distance;
+        });
+
+        // `construct_chain_steiner` compares the distance from each neighboring chain to the root against the
+        // distances to other qubits; so we extend each search until it has reached every qubit that is at
+        // least as close as any minimum-distance root.  (distances are recorded as qubits are queued, so
+        // the qubits left in the queues are already accounted for)
+        auto &reach = bucket_min;
+        reach.assign(k, -1);
+        if (best != max_distance)
+            for_each_candidate([this, best, k, &reach](int q) {
+                if (total_distance[q] == best)
+                    for (int i = 0; i < k; i++) reach[i] = max(reach[i], distances[search_nbrs[i]][q]);
+            });
+        for (int i = 0; i < k; i++) {
+            auto &pq = search_queues[i];
+            while (!pq.empty() && pq.top().dist < reach[i]) root_search_step(emb, i);
+        }
+        return k;
+    }
+
+    //! call `f(q)` for each qubit which may be a root: every qubit, or only those in `window` when it is active
+    template <typename F>
+    void for_each_candidate(F f) const {
+        if (window_active) {
+            for (auto &q : window) f(q);
+        } else {
+            for (int q = num_qubits; q--;) f(q);
+        }
+    }
+
+    //! prepare `visited` for a search from the chain of `v` towards a root for `u`; in a windowed search, only
+    //! the qubits in and bordering the window are touched, and the border is marked as visited to fence the
+    //! search in
+    void prepare_search_visited(vector<int> &visited, const int u, const int v) {
+        if (window_active) {
+            for (auto &q : window) visited[q] = ep.visited_mask(u, v, q);
+            for (auto &q : window_border) visited[q] = 1;
+        } else {
+            ep.prepare_visited(visited, u, v);
+        }
+    }
+
+    //! collect the qubits within `radius` hops of the chains neighboring `u` into `window`, and those one hop
+    //! further out into `window_border`.  reserved qubits (which belong to fixed chains) are passed through but
+    //! left out of both.  returns false if the window already holds every qubit the searches could reach
+    bool collect_window(const embedding_t &emb, const int u, const int radius) {
+        if (++window_stamp == 0) {
+            std::fill(std::begin(window_mark), std::end(window_mark), 0);
+            window_stamp = 1;
+        }
+        window.clear();
+        window_border.clear();
+        window_frontier.clear();
+        for (auto &v : ep.var_neighbors(u))
+            for (auto &q : emb.get_chain(v))
+                if (window_mark[q] != window_stamp) {
+                    window_mark[q] = window_stamp;
+                    window_frontier.push_back(q);
+                }
+        for (int d = 0; window_frontier.size(); d++) {
+            auto &layer = d <= radius ? window : window_border;
+            for (auto &q : window_frontier)
+                if (q < num_qubits) layer.push_back(q);
+            if (d > radius) break;
+            window_next.clear();
+            for (auto &q : window_frontier)
+                for (auto &p : ep.qubit_neighbors(q))
+                    if (window_mark[p] != window_stamp) {
+                        window_mark[p] = window_stamp;
+                        window_next.push_back(p);
                     }
+            window_frontier.swap(window_next);
+        }
+        return window_border.size() > 0;
+    }
+
+    //! the windowed counterpart of `prepare_root_distances`, used when `params.search_window` is positive: the
+    //! searches for a root for `u` are confined to the qubits within `search_window` hops of its neighbors'
+    //! chains, and the radius is doubled until a root is found or the window holds every reachable qubit.  the
+    //! cost of each attempt grows with the size of the window rather than the size of the target graph.  returns
+    //! false, having done nothing, if windowing is disabled or no neighbor of `u` has a chain
+    bool prepare_windowed_root_distances(const embedding_t &emb, const int u) {
+        window_active = false;
+        if (params.search_window <= 0) return false;
+        bool seeded = false;
+        for (auto &v : ep.var_neighbors(u)) seeded |= emb.chainsize(v) > 0;
+        if (!seeded) return false;
+
+        ep.populate_weight_table(emb.max_weight());
+        window_active = true;
+        for (int radius = params.search_window;; radius = 2 * radius) {
+            bool partial = collect_window(emb, u, radius);
+            for (auto &q : window) {
+                qubit_weight[q] = ep.weight(emb.weight(q));
+                total_distance[q] = ep.distance_mask(u, q, max_distance);
+            }
+            compute_root_distances(emb, u);
+            if (!partial) break;
+            for (auto &q : window)
+                if (total_distance[q] != max_distance) return true;
+        }
+        return true;
+    }
+
+    //! settle the next qubit in the `i`th search of `compute_root_distances`, exactly as
+    //! `compute_distances_from_chain` would, and return that qubit
+    int root_search_step(const embedding_t &emb, const int i) {
+        int v = search_nbrs[i];
+        auto &pq = search_queues[i];
+        auto &parent = parents[v];
+        auto &permutation = qubit_permutations[v];
+        auto &distance = distances[v];
+        auto &visited = visited_list[v];
+
+        auto z = pq.top();
+        pq.pop();
+        distance[z.node] = z.dist;
+        for (auto &p : ep.qubit_neighbors(z.node)) {
+            if (!visited[p]) {
+                visited[p] = 1;
+                if (emb.weight(p) >= ep.weight_bound) {
+                    distance[p] = max_distance;
+                } else {
+                    parent[p] = z.node;
+                    distance[p] = z.dist + qubit_weight[p];
+                    pq.emplace(p, permutation[p], distance[p]);
                 }
             }
         }
+        return z.node;
+    }
+
+    //! a lower bound on the total distance of any qubit which has been settled by fewer than all `k`
+    //! searches in `compute_root_distances`, when each unfinished search has reached `radius`
+    distance_t root_distance_bound(const distance_t radius, const int k) const {
+        auto bound = [radius](distance_t partial, int missing) {
+            if (radius > 0 && missing > (max_distance - partial) / radius) return max_distance;
+            return partial + missing * radius;
+        };
+        distance_t b = bound(0, k);
+        for (int c = 1; c < k; c++)
+            if (bucket_min[c] != max_distance) b = min(b, bound(bucket_min[c], k - c));
+        return b;
     }
 
     //! compute the weight of each qubit, first selecting `alpha`
@@ -547,6 +890,7 @@ class pathfinder_base : public pathfinder_public_interface {
         int old_bound = ep.weight_bound;
         ep.weight_bound = 1 + overlap_bound;
         ep.round_beta = round_beta;
+        best_synced = false;
         if (clear_first) bestEmbedding = initEmbedding;
         for (auto &u : varorder) {
             lastsize = bestEmbedding.chainsize(u);
@@ -592,14 +936,14 @@ class pathfinder_base : public pathfinder_public_interface {
         ep.reset_mood();
         if (params.skip_initialization) {
             if (initEmbedding.linked()) {
-                currEmbedding = initEmbedding;
+                restore_init();
             } else {
                 throw BadInitializationException(
                         "cannot bootstrap from initial embedding.  "
                         "disable skip_initialization or throw this embedding away");
             }
         } else {
-            currEmbedding = initEmbedding;
+            restore_init();
             switch (initialization_pass(currEmbedding)) {
                 case -2:
                     return 0;
@@ -616,7 +960,7 @@ class pathfinder_base : public pathfinder_public_interface {
         best_stats.clear();
         check_improvement(currEmbedding);
         ep.improved = 1;
-        currEmbedding = bestEmbedding;
+        restore_best();
         for (int trial_patience = params.tries; trial_patience-- && (!ep.embedded);) {
             int improvement_patience = params.max_no_improvement;
             ep.major_info("embedding trial %d\n", params.tries - trial_patience);
@@ -639,7 +983,7 @@ class pathfinder_base : public pathfinder_public_interface {
                         improvement_patience = 0;
                         break;
                     case -1:
-                        currEmbedding = bestEmbedding;  // fallthrough
+                        restore_best();  // fallthrough
                     case 0:
                         improvement_patience--;
                         ep.improved = 0;
@@ -653,14 +997,14 @@ class pathfinder_base : public pathfinder_public_interface {
             }
             if (trial_patience && !ep.embedded && !improvement_patience) {
                 ep.initialized = ep.desperate = pushback = 0;
-                currEmbedding = initEmbedding;
+                restore_init();
                 int r = initialization_pass(currEmbedding);
                 switch (r) {
                     case -2:
                         trial_patience = 0;
                         break;
                     case -1:
-                        currEmbedding = bestEmbedding;
+                        restore_best();
                         break;
                     case 1:
                         best_stats.clear();  // overwrite bestEmbedding for a real restart
@@ -671,20 +1015,22 @@ class pathfinder_base : public pathfinder_public_interface {
             }
         }
 
-        if (ep.embedded && params.chainlength_patience) {
+        if (ep.embedded && params.chainlength_patience && !stop_requested()) {
             ep.major_info("reducing chain lengths\n");
             int improvement_patience = params.chainlength_patience;
+            auto budget = duration<double>(params.chainlength_timeout);
+            if (budget < stoptime - clock::now()) stoptime = clock::now() + duration_cast<clock::duration>(budget);
             ep.weight_bound = 1;
-            currEmbedding = bestEmbedding;
+            restore_best();
             while (improvement_patience) {
-                lastEmbedding = currEmbedding;
+                currEmbedding.checkpoint();
                 ep.extra_info("chainlength improvement pass (%d more before giving up)\n", improvement_patience - 1);
                 ep.extra_info("max chain length %d, num of max chains %d\n", best_stats.size() - 1, best_stats.back());
                 ep.desperate = (improvement_patience == 1);
                 int r = improve_chainlength_pass(currEmbedding);
                 switch (r) {
                     case -1:
-                        currEmbedding = lastEmbedding;
+                        currEmbedding.rollback();
                         improvement_patience--;
                         break;
                     case -2:
@@ -715,23 +1061,17 @@ class pathfinder_serial : public pathfinder_base<embedding_problem_t> {
   private:
   public:
     pathfinder_serial(optional_parameters &p_, int n_v, int n_f, int n_q, int n_r, vector<vector<int>> &v_n,
-                      vector<vector<int>> &q_n)
+                      const vector<vector<int>> &q_n)
             : super(p_, n_v, n_f, n_q, n_r, v_n, q_n) {}
     virtual ~pathfinder_serial() {}
 
     virtual void prepare_root_distances(const embedding_t &emb, const int u) override {
+        if (super::prepare_windowed_root_distances(emb, u)) return;
         super::ep.prepare_distances(super::total_distance, u, max_distance);
         super::compute_qubit_weights(emb);
 
         // run Dijkstra's algorithm from each neighbor to compute distances and shortest paths to neighbor's chains
-        int neighbors_embedded = 0;
-        for (auto &v : super::ep.var_neighbors(u)) {
-            if (!emb.chainsize(v)) continue;
-            neighbors_embedded++;
-            super::ep.prepare_visited(super::visited_list[v], u, v);
-            super::compute_distances_from_chain(emb, v, super::visited_list[v]);
-            super::accumulate_distance(emb, v, super::visited_list[v]);
-        }
+        int neighbors_embedded = super::compute_root_distances(emb, u);
 
         if (!neighbors_embedded) {
             for (int q = super::num_qubits; q--;)
@@ -745,7 +1085,9 @@ class pathfinder_serial : public pathfinder_base<embedding_problem_t> {
     }
 };
 
-//! A pathfinder where the Dijkstra-from-neighboring-chain passes are done serially.
+//! A pathfinder where the Dijkstra-from-neighboring-chain passes are done in parallel, on a pool of threads which
+//! persists for the lifetime of the pathfinder.  The searches are handed out one neighbor at a time, so that threads
+//! which draw quick searches go on to take more of them.
 template <typename embedding_problem_t>
 class pathfinder_parallel : public pathfinder_base<embedding_problem_t> {
   public:
@@ -754,26 +1096,19 @@ class pathfinder_parallel : public pathfinder_base<embedding_problem_t> {
 
   private:
     int num_threads;
-    vector<std::future<void>> futures;
+    thread_pool pool;
     vector<int> thread_weight;
     mutex get_job;
 
+    //! the embedded neighbors of the variable being placed, in the order that their searches are handed out
+    vector<int> jobs;
     unsigned int nbr_i;
-    int neighbors_embedded;
 
     void run_in_thread(const embedding_t &emb, const int u) {
         get_job.lock();
         while (1) {
             int v = -1;
-            const vector<int> &neighbors = super::ep.var_neighbors(u);
-            while (nbr_i < neighbors.size()) {
-                int v0 = neighbors[nbr_i++];
-                if (emb.chainsize(v0)) {
-                    v = v0;
-                    neighbors_embedded++;
-                    break;
-                }
-            }
+            if (nbr_i < jobs.size()) v = jobs[nbr_i++];
             get_job.unlock();
 
             if (v < 0) break;
@@ -789,38 +1124,36 @@ class pathfinder_parallel : public pathfinder_base<embedding_problem_t> {
     template <typename C>
     void exec_chunked(C e_chunk) {
         const int grainsize = super::num_qubits / num_threads;
-        int grainmod = super::num_qubits % num_threads;
+        const int grainmod = super::num_qubits % num_threads;
 
-        int a = 0;
-        for (int i = num_threads; i--;) {
-            int b = a + grainsize + (grainmod-- > 0);
-            futures[i] = std::async(std::launch::async, e_chunk, a, b);
-            a = b;
-        }
-        for (int i = num_threads; i--;) futures[i].wait();
+        pool.run([grainsize, grainmod, &e_chunk](int i) {
+            int a = i * grainsize + min(i, grainmod);
+            int b = a + grainsize + (i < grainmod);
+            e_chunk(a, b);
+        });
     }
 
     template <typename C>
     void exec_indexed(C e_chunk) {
         const int grainsize = super::num_qubits / num_threads;
-        int grainmod = super::num_qubits % num_threads;
+        const int grainmod = super::num_qubits % num_threads;
 
-        int a = 0;
-        for (int i = num_threads; i--;) {
-            int b = a + grainsize + (grainmod-- > 0);
-            futures[i] = std::async(std::launch::async, e_chunk, i, a, b);
-            a = b;
-        }
-        for (int i = num_threads; i--;) futures[i].wait();
+        pool.run([grainsize, grainmod, &e_chunk](int i) {
+            int a = i * grainsize + min(i, grainmod);
+            int b = a + grainsize + (i < grainmod);
+            e_chunk(i, a, b);
+        });
     }
 
   public:
     pathfinder_parallel(optional_parameters &p_, int n_v, int n_f, int n_q, int n_r, vector<vector<int>> &v_n,
-                        vector<vector<int>> &q_n)
+                        const vector<vector<int>> &q_n)
             : super(p_, n_v, n_f, n_q, n_r, v_n, q_n),
               num_threads(min(p_.threads, n_q)),
-              futures(num_threads),
-              thread_weight(num_threads) {}
+              pool(num_threads),
+              thread_weight(num_threads),
+              jobs(),
+              nbr_i(0) {}
     virtual ~pathfinder_parallel() {}
 
     virtual void prepare_root_distances(const embedding_t &emb, const int u) override {
@@ -834,11 +1167,11 @@ class pathfinder_parallel : public pathfinder_base<embedding_problem_t> {
             this->ep.prepare_distances(this->total_distance, u, max_distance, a, b);
         });
 
+        jobs.clear();
+        for (auto &v : super::ep.var_neighbors(u))
+            if (emb.chainsize(v)) jobs.push_back(v);
         nbr_i = 0;
-        neighbors_embedded = 0;
-        for (int i = 0; i < num_threads; i++)
-            futures[i] = std::async(std::launch::async, [this, &emb, &u]() { run_in_thread(emb, u); });
-        for (int i = 0; i < num_threads; i++) futures[i].wait();
+        pool.run([this, &emb, u](int) { run_in_thread(emb, u); });
 
         for (auto &v : super::ep.var_neighbors(u)) {
             super::accumulate_distance_at_chain(emb, v);  // this isn't parallel but at least it should be sparse?
@@ -850,7 +1183,7 @@ class pathfinder_parallel : public pathfinder_base<embedding_problem_t> {
                     this->accumulate_distance(emb, v, super::visited_list[v], a, b);
                 }
             }
-            if (!neighbors_embedded)
+            if (jobs.empty())
                 for (int q = a; q < b; q++)
                     if (emb.weight(q) >= super::ep.weight_bound) super::total_distance[q] = max_distance;
         });
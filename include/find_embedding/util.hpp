@@ -15,8 +15,12 @@
 #pragma once
 #include <algorithm>
 #include <chrono>
+#include <condition_variable>
+#include <exception>
+#include <functional>
 #include <iterator>
 #include <map>
+#include <memory>
 #include <mutex>
 #include <queue>
 #include <random>
@@ -57,6 +61,10 @@ using min_queue = std::priority_queue<priority_node<P, min_heap_tag>>;
 template <typename P>
 using max_queue = std::priority_queue<priority_node<P, max_heap_tag>>;
 
+// note: a bucket queue (Dial's algorithm) looks tempting, since qubit weights take few values and are all 1 in the
+// chainlength phase.  but ties are broken by a random `dirt` -- which is where parent selection gets its entropy --
+// so each bucket must be kept in heap order, and that costs more than the pairing queue.  the pairing queue also
+// does no work for nodes which are queued but never popped, which is common as searches stop early.
 using distance_queue = pairing_queue<priority_node<distance_t, min_heap_tag>>;
 
 using minorminer::MinorMinerException;
@@ -87,6 +95,24 @@ class CorruptEmbeddingException : public MinorMinerException {
     CorruptEmbeddingException(const string& m = "chains may be invalid") : MinorMinerException(m) {}
 };
 
+//! A read-only view of an embedding in progress, handed to `LocalInteraction::improved`.  The view is only valid for
+//! the duration of that call.
+class embedding_view {
+  public:
+    virtual ~embedding_view() {}
+
+    //! true if no two chains overlap
+    virtual bool embedded() const = 0;
+
+    //! the histogram computed by `embedding::statistics`: chain lengths if `embedded()`, qubit overfill otherwise
+    virtual const vector<int>& statistics() const = 0;
+
+    virtual int num_vars() const = 0;
+
+    //! append the chain of variable `u` to `output`
+    virtual void get_chain(int u, vector<int>& output) const = 0;
+};
+
 //! Interface for communication between the library and various bindings.
 //!
 //! Any bindings of this library need to provide a concrete subclass.
@@ -94,10 +120,10 @@ class LocalInteraction {
   public:
     virtual ~LocalInteraction() {}
     //! Print a message through the local output method
-    void displayOutput(int loglevel, const string& msg) const { displayOutputImpl(msg); }
+    void displayOutput(int loglevel, const string& msg) const { displayOutputImpl(loglevel, msg); }
 
     //! Print an error through the local output method
-    void displayError(int loglevel, const string& msg) const { displayErrorImpl(msg); }
+    void displayError(int loglevel, const string& msg) const { displayErrorImpl(loglevel, msg); }
 
     //! Check if someone is trying to cancel the embedding process
     int cancelled(const clock::time_point stoptime) const {
@@ -106,18 +132,25 @@ class LocalInteraction {
         return 0;
     }
 
+    //! Report that the heuristic has recorded a new best embedding.  Returns true if the search should stop
+    //! (gracefully, as it would on a timeout)
+    bool improved(const embedding_view& emb) const { return improvedImpl(emb); }
+
   private:
     //! Print the string to a binding specified sink
-    virtual void displayOutputImpl(const string&) const = 0;
+    virtual void displayOutputImpl(int loglevel, const string&) const = 0;
 
     //! Print the error to a binding specified sink
-    virtual void displayErrorImpl(const string&) const = 0;
+    virtual void displayErrorImpl(int loglevel, const string&) const = 0;
 
     //! Check if the embedding process has timed out.
     virtual bool timedOutImpl(const clock::time_point stoptime) const { return clock::now() >= stoptime; }
 
     //! Check if someone has tried to cancel the embedding process
     virtual bool cancelledImpl() const = 0;
+
+    //! Receive a new best embedding; by default, progress is ignored
+    virtual bool improvedImpl(const embedding_view&) const { return false; }
 };
 
 typedef shared_ptr<LocalInteraction> LocalInteractionPtr;
@@ -139,7 +172,19 @@ class optional_parameters {
     int max_fill = numeric_limits<int>::max();
     bool return_overlap = false;
     int chainlength_patience = 2;
+    //! Number of seconds the chainlength phase may run before it is stopped (gracefully, like `timeout`)
+    double chainlength_timeout = numeric_limits<double>::max();
+    //! Stop as soon as an embedding is found whose longest chain has at most this many qubits (0 for no target)
+    int chainlength_target = 0;
+    //! Stop as soon as an embedding is found whose chains use at most this many qubits in total (0 for no target).
+    //! If both targets are set, both must be met.  Fixed chains are not counted towards either one.
+    int total_chainlength_target = 0;
+    //! When positive, confine each chain search to the qubits within this many hops of the neighboring chains,
+    //! doubling the radius whenever no root is found (see `pathfinder_base::prepare_windowed_root_distances`)
+    int search_window = 0;
     int threads = 1;
+    //! Number of independent searches run concurrently (see `pathfinder_wrapper`)
+    int portfolio = 1;
     bool skip_initialization = false;
     map<int, vector<int>> fixed_chains;
     map<int, vector<int>> initial_chains;
@@ -162,7 +207,12 @@ class optional_parameters {
               max_fill(p.max_fill),
               return_overlap(p.return_overlap),
               chainlength_patience(p.chainlength_patience),
+              chainlength_timeout(p.chainlength_timeout),
+              chainlength_target(p.chainlength_target),
+              total_chainlength_target(p.total_chainlength_target),
+              search_window(p.search_window),
               threads(p.threads),
+              portfolio(p.portfolio),
               skip_initialization(p.skip_initialization),
               fixed_chains(fixed_chains),
               initial_chains(initial_chains),
@@ -251,4 +301,113 @@ void collectMinima(const vector<T>& input, vector<int>& output) {
         index++;
     }
 }
+
+//! Fill output with the indices from `subset` (which must be nonempty) at which `input` attains its minimum
+//! over `subset`
+template <typename T>
+void collectMinima(const vector<T>& input, const vector<int>& subset, vector<int>& output) {
+    output.clear();
+    auto lowest_value = input[subset[0]];
+    for (auto& index : subset) {
+        auto y = input[index];
+        if (y == lowest_value) {
+            output.push_back(index);
+        } else if (y < lowest_value) {
+            output.clear();
+            output.push_back(index);
+            lowest_value = y;
+        }
+    }
+}
+
+//! A fixed set of worker threads which repeatedly run a job on every thread at once.  `run(job)` calls `job(i)` for
+//! each `i` in `[0, size())` -- `job(0)` on the calling thread, and the others on workers which persist between calls
+//! -- and returns once they have all finished, rethrowing the first exception thrown by any of them.  Jobs which need
+//! dynamic load balancing are expected to pull their work from a shared counter.
+class thread_pool {
+    int num_threads;
+    vector<thread> workers;
+    mutex lock;
+    std::condition_variable wake;
+    std::condition_variable done;
+    std::function<void(int)> job;
+    unsigned int generation;
+    int running;
+    bool stopping;
+    std::exception_ptr error;
+
+  public:
+    thread_pool(int n)
+            : num_threads(max(n, 1)),
+              workers(),
+              lock(),
+              wake(),
+              done(),
+              job(),
+              generation(0),
+              running(0),
+              stopping(false),
+              error() {
+        for (int i = 1; i < num_threads; i++) workers.emplace_back([this, i]() { work(i); });
+    }
+
+    ~thread_pool() {
+        {
+            std::lock_guard<mutex> guard(lock);
+            stopping = true;
+        }
+        wake.notify_all();
+        for (auto& w : workers) w.join();
+    }
+
+    thread_pool(const thread_pool&) = delete;
+    thread_pool& operator=(const thread_pool&) = delete;
+
+    int size() const { return num_threads; }
+
+    template <typename F>
+    void run(F&& f) {
+        {
+            std::lock_guard<mutex> guard(lock);
+            job = std::forward<F>(f);
+            error = nullptr;
+            running = num_threads - 1;
+            generation++;
+        }
+        wake.notify_all();
+        attempt(0);
+        std::exception_ptr e;
+        {
+            std::unique_lock<mutex> guard(lock);
+            done.wait(guard, [this]() { return running == 0; });
+            job = nullptr;
+            std::swap(e, error);
+        }
+        if (e) std::rethrow_exception(e);
+    }
+
+  private:
+    void work(int i) {
+        unsigned int seen = 0;
+        std::unique_lock<mutex> guard(lock);
+        while (1) {
+            wake.wait(guard, [this, seen]() { return stopping || generation != seen; });
+            if (stopping) return;
+            seen = generation;
+            guard.unlock();
+            attempt(i);
+            guard.lock();
+            if (--running == 0) done.notify_one();
+        }
+    }
+
+    void attempt(int i) {
+        try {
+            job(i);
+        } catch (...) {
+            std::lock_guard<mutex> guard(lock);
+            if (!error) error = std::current_exception();
+        }
+    }
+};
 }  // namespace find_embedding
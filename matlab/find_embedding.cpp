@@ -102,12 +102,12 @@ void parseChainArray(const mxArray* a, const char* errorMsg, std::map<int, std::
 
 class LocalInteractionMATLAB : public find_embedding::LocalInteraction {
   private:
-    virtual void displayOutputImpl(const std::string& msg) const {
+    virtual void displayOutputImpl(int, const std::string& msg) const {
         mexPrintf("%s", msg.c_str());
         mexEvalString("drawnow;");
     }
 
-    virtual void displayErrorImpl(const std::string& msg) const {
+    virtual void displayErrorImpl(int, const std::string& msg) const {
         mexPrintf("%s", msg.c_str());
         mexEvalString("drawnow;");
     }
@@ -145,11 +145,16 @@ void checkFindEmbeddingParameters(const mxArray* paramsArray,
     paramsNameSet.insert("max_fill");
     paramsNameSet.insert("return_overlap");
     paramsNameSet.insert("chainlength_patience");
+    paramsNameSet.insert("chainlength_timeout");
+    paramsNameSet.insert("chainlength_target");
+    paramsNameSet.insert("total_chainlength_target");
+    paramsNameSet.insert("search_window");
     paramsNameSet.insert("skip_initialization");
     paramsNameSet.insert("fixed_chains");
     paramsNameSet.insert("initial_chains");
     paramsNameSet.insert("restrict_chains");
     paramsNameSet.insert("threads");
+    paramsNameSet.insert("portfolio");
 
     int numFields = mxGetNumberOfFields(paramsArray);
     for (int i = 0; i < numFields; ++i) {
@@ -207,11 +212,36 @@ void checkFindEmbeddingParameters(const mxArray* paramsArray,
         parseScalar<int>(fieldValueArray, "threads parameter must be an integer >= 0",
                          findEmbeddingExternalParams.threads);
 
+    fieldValueArray = mxGetField(paramsArray, 0, "portfolio");
+    if (fieldValueArray)
+        parseScalar<int>(fieldValueArray, "portfolio parameter must be an integer >= 0",
+                         findEmbeddingExternalParams.portfolio);
+
     fieldValueArray = mxGetField(paramsArray, 0, "chainlength_patience");
     if (fieldValueArray)
         parseScalar<int>(fieldValueArray, "chainlength_patience parameter must be an integer >= 0",
                          findEmbeddingExternalParams.chainlength_patience);
 
+    fieldValueArray = mxGetField(paramsArray, 0, "chainlength_timeout");
+    if (fieldValueArray)
+        parseScalar<double>(fieldValueArray, "chainlength_timeout parameter must be a number >= 0.0",
+                            findEmbeddingExternalParams.chainlength_timeout);
+
+    fieldValueArray = mxGetField(paramsArray, 0, "chainlength_target");
+    if (fieldValueArray)
+        parseScalar<int>(fieldValueArray, "chainlength_target parameter must be an integer >= 0",
+                         findEmbeddingExternalParams.chainlength_target);
+
+    fieldValueArray = mxGetField(paramsArray, 0, "total_chainlength_target");
+    if (fieldValueArray)
+        parseScalar<int>(fieldValueArray, "total_chainlength_target parameter must be an integer >= 0",
+                         findEmbeddingExternalParams.total_chainlength_target);
+
+    fieldValueArray = mxGetField(paramsArray, 0, "search_window");
+    if (fieldValueArray)
+        parseScalar<int>(fieldValueArray, "search_window parameter must be an integer >= 0",
+                         findEmbeddingExternalParams.search_window);
+
     fieldValueArray = mxGetField(paramsArray, 0, "verbose");
     if (fieldValueArray)
         parseScalar(fieldValueArray, "verbose parameter must be an integer >= 0", findEmbeddingExternalParams.verbose);
@@ -58,6 +58,21 @@
 %                         passes.
 %                         (must be an integer >= 0, default = 2)
 %
+%   chainlength_timeout: the chainlength improvement passes stop after this many seconds,
+%                        and the best embedding found so far is returned.  the overall
+%                        timeout still applies.
+%                        (must be a number >= 0, default is effectively infinite, stored as double)
+%
+%   chainlength_target: stop as soon as an embedding is found whose longest chain has at
+%                       most this many qubits.
+%                       (must be an integer >= 0, default = 0, meaning no target)
+%
+%   total_chainlength_target: stop as soon as an embedding is found whose chains use at most
+%                             this many qubits in total.  if chainlength_target is also set,
+%                             both targets must be met.  fixed_chains are not counted towards
+%                             either target.
+%                             (must be an integer >= 0, default = 0, meaning no target)
+%
 %   max_fill: until a valid embedding is found, this restricts the the maximum number
 %             of variables whose chain may contain a given qubit.
 %             (must be an integer >= 0, default = effectively infinite)
@@ -67,6 +82,19 @@
 %            greater than the number of threads.
 %            (must be an integer >= 1, default = 1)
 %
+%   search_window: if positive, each chain search only considers the qubits within this
+%                  many hops of the chains of its neighbors, doubling the radius until a
+%                  chain is found.  this makes each search much cheaper on large hardware
+%                  graphs when the chains are already roughly placed (e.g. through
+%                  initial_chains).  a radius of 1 or 2 is usually enough.  only used
+%                  when threads is 1.
+%                  (must be an integer >= 0, default = 0, meaning the whole hardware graph)
+%
+%   portfolio: number of independent searches (each with its own random seed) to run
+%              concurrently.  as soon as one finds an embedding the others are stopped,
+%              and the best embedding found by any of them is returned.
+%              (must be an integer >= 1, default = 1)
+%
 %   return_overlap: return an embedding whether or not qubits are used by multiple
 %                   variables -- capture both return values to determine whether or
 %                   not the returned embedding is valid
@@ -83,20 +83,28 @@ This implementation adds several useful features:
 """
 
 include "_minorminer_h.pxi"
-import os as _os, logging as _logging
+import os as _os, logging as _logging, threading as _threading, time as _time
+from collections import namedtuple as _namedtuple
+from collections.abc import Mapping as _Mapping
+from concurrent.futures import ThreadPoolExecutor as _ThreadPoolExecutor, wait as _wait, FIRST_COMPLETED as _FIRST_COMPLETED
+import numpy as _np
 
 def find_embedding(S, T, **params):
     """Heuristically attempt to find a minor-embedding of source graph S 
     into a target graph T.
 
     Args:
-        S (iterable/NetworkX Graph): 
+        S (iterable/NetworkX Graph/array): 
             The source graph as an iterable of label pairs representing the 
-            edges, or a NetworkX Graph.
+            edges, or a NetworkX Graph. Graphs with integer labels may also be 
+            given as an ``(m, 2)`` array of 32- or 64-bit integers (or any 
+            object exposing such a buffer), which is read without creating a 
+            Python object per edge. If the labels in the array are exactly 
+            ``0, 1, ..., n-1``, they are used as node indices as-is.
 
-        T (iterable/NetworkX Graph):
-            The target graph as an iterable of label pairs representing the 
-            edges, or a NetworkX Graph.
+        T (iterable/NetworkX Graph/array/:class:`Target`):
+            The target graph in any of the forms accepted for ``S``, or a 
+            :class:`Target` prepared in advance.
 
         **params (optional): See below.
  
@@ -116,6 +124,10 @@ def find_embedding(S, T, **params):
         Note that failure to return an embedding does not prove that no embedding 
         exists.
 
+        The heuristic runs with the GIL released (it is reacquired only to log 
+        and to check for Ctrl-C), so independent calls made from several Python 
+        threads execute concurrently.
+
     Optional Parameters:
         max_no_improvement (int, optional, default=10):
             Maximum number of failed iterations to improve the current solution, 
@@ -150,6 +162,33 @@ def find_embedding(S, T, **params):
             current solution, where each iteration attempts to find an embedding 
             for each variable of S such that it is adjacent to all its neighbours. 
 
+        chainlength_timeout (double, optional, default=None):
+            Number of seconds the chain length improvement phase may run before 
+            it is stopped and the best embedding found so far is returned. This 
+            phase is still subject to ``timeout``. If None, only ``timeout`` 
+            applies.
+
+        chainlength_target (int, optional, default=None):
+            Stop as soon as an embedding is found whose longest chain has at 
+            most this many qubits. If None, there is no target.
+
+        total_chainlength_target (int, optional, default=None):
+            Stop as soon as an embedding is found whose chains use at most this 
+            many qubits in total. If both this and ``chainlength_target`` are 
+            given, the search stops once both are met. Chains in 
+            ``fixed_chains`` and ``suspend_chains`` are not counted.
+
+        search_window (int, optional, default=None):
+            If given, each search for a chain only considers the qubits within 
+            this many hops of the chains of its neighbors, doubling the radius 
+            until a chain is found. This makes each search much cheaper on 
+            large target graphs when the chains are already placed roughly 
+            (e.g. through ``initial_chains``), at some cost in quality for 
+            searches from scratch. On well-connected targets such as Pegasus, 
+            a radius of 1 or 2 already covers a large neighborhood. Only used 
+            when ``threads`` is 1. If None, every search considers the whole 
+            target graph.
+
         max_fill (int, optional, default=None):
             Restricts the number of chains that can simultaneously incorporate 
             the same qubit during the search. Values above 63 are treated as 63.
@@ -161,6 +200,24 @@ def find_embedding(S, T, **params):
             significantly greater than the number of threads. Value must be 
             greater than 1.
 
+        portfolio (int, optional, default=1):
+            Number of independent searches, each with its own random seed, to 
+            run concurrently on separate threads. As soon as one of them finds 
+            an embedding the others are stopped, and the best embedding found by 
+            any search is returned. Each search honors ``tries``, ``timeout`` and 
+            ``threads`` on its own, so up to ``portfolio * threads`` threads are 
+            used. Values below 2 run a single search on the calling thread.
+
+        progress (callable, optional, default=None):
+            Called with an :class:`EmbeddingProgress` each time the search 
+            records a new best embedding: once after the initialization pass, 
+            whenever the overlap or chain lengths improve, and at the start of 
+            each restart. If it returns a true value, the search stops as if it 
+            had timed out, and the best embedding found so far is returned. An 
+            exception raised by ``progress`` also stops the search, and is 
+            re-raised once it has wound down. With ``portfolio``, each search 
+            reports its own progress, from its own thread.
+
         return_overlap (bool, optional, default=False):
             This function returns an embedding, regardless of whether or not
             qubits are used by multiple variables. ``return_overlap`` determines
@@ -169,6 +226,12 @@ def find_embedding(S, T, **params):
             a bool representing the embedding validity. If False, only an
             embedding is returned.
 
+        return_arrays (bool, optional, default=False):
+            Return the embedding as an :class:`EmbeddingArrays`, which holds 
+            the chains in a pair of NumPy arrays rather than lists, in place of 
+            a dict. It is a read-only mapping from labels in S to lists of 
+            labels in T, computed only as they are accessed.
+
         skip_initialization (bool, optional, default=False):
             Skip the initialization pass. Note that this only works if the chains 
             passed in through ``initial_chains`` and ``fixed_chains`` are 
@@ -239,7 +302,7 @@ def find_embedding(S, T, **params):
             verbosity levels 1 through 3 will use ``logger.info()`` and level 4 
             will use ``logger.debug()``.
 
-        initial_chains (dict, optional):
+        initial_chains (dict/tuple, optional):
             Initial chains inserted into an embedding before ``fixed_chains`` are 
             placed, which occurs before the initialization pass. These can be 
             used to restart the algorithm in a similar state to a previous 
@@ -249,17 +312,24 @@ def find_embedding(S, T, **params):
             or empty entries are ignored. Each value in the dictionary is a list
             of qubit labels.
 
-        fixed_chains (dict, optional):
+            When the source and target labels are integers, the chains may 
+            instead be given in compressed sparse row form, as a pair 
+            ``(offsets, qubits)`` of integer arrays: the chain of source node 
+            ``i`` is ``qubits[offsets[i]:offsets[i+1]]``.
+
+        fixed_chains (dict/tuple, optional):
             Fixed chains inserted into an embedding before the initialization 
             pass. As the algorithm proceeds, these chains are not allowed to 
             change, and the qubits used by these chains are not used by other 
             chains. Missing or empty entries are ignored. Each value in the
-            dictionary is a list of qubit labels.
+            dictionary is a list of qubit labels. Accepts the same pair of 
+            arrays as ``initial_chains``.
 
-        restrict_chains (dict, optional):
+        restrict_chains (dict/tuple, optional):
             Throughout the algorithm, it is guaranteed that chain[i] is a subset 
             of ``restrict_chains[i]`` for each i, except those with missing or 
             empty entries. Each value in the dictionary is a list of qubit labels.
+            Accepts the same pair of arrays as ``initial_chains``.
 
         suspend_chains (dict, optional):
             This is a metafeature that is only implemented in the Python
@@ -288,17 +358,14 @@ def find_embedding(S, T, **params):
     except EmptySourceGraphError:
         return {}
 
-    cdef vector[int] chain
     cdef vector[vector[int]] chains
-    cdef int success = findEmbedding(_in.Sg, _in.Tg, _in.opts, chains)
-
-    cdef int nc = chains.size()
+    cdef int success
+    _in.start_progress()
+    with nogil:
+        success = findEmbedding(_in.Sg, _in.Tg, _in.opts, chains, _in.target)
+    _in.finish_progress()
 
-    rchain = {}
-    if chains.size():
-        for v in range(nc-_in.pincount):
-            chain = chains[v]
-            rchain[_in.SL.label(v)] = [_in.TL.label(z) for z in chain]
+    rchain = _chain_output(_in, chains)
 
     if _in.opts.return_overlap:
         return rchain, success
@@ -308,6 +375,292 @@ def find_embedding(S, T, **params):
 class EmptySourceGraphError(RuntimeError):
     pass
 
+class EmbeddingArrays(_Mapping):
+    """
+    An embedding stored in compressed sparse row form, as returned by
+    :func:`find_embedding` with ``return_arrays=True``.  The chain of the
+    source node with index ``i`` consists of the target nodes with indices
+    ``qubits[offsets[i]:offsets[i+1]]``.  If the target graph was given as an
+    array with labels ``0, 1, ..., n-1``, those indices are the labels.
+
+    This is also a read-only mapping from labels in S to lists of labels in T,
+    as :func:`find_embedding` would otherwise return; lists are only created
+    for the chains which are looked up.
+
+    Attributes:
+        offsets (numpy.ndarray): ``len(self)+1`` nondecreasing offsets into ``qubits``
+
+        qubits (numpy.ndarray): target node indices of each chain, in turn
+
+        source_labels (list): ``source_labels[i]`` is the label of the source node with index ``i``
+
+        target_labels (list): ``target_labels[q]`` is the label of the target node with index ``q``
+    """
+    def __init__(self, offsets, qubits, source_labels, target_labels):
+        self.offsets = offsets
+        self.qubits = qubits
+        self.source_labels = source_labels
+        self.target_labels = target_labels
+        self._index = None
+
+    def __len__(self):
+        return len(self.offsets) - 1
+
+    def __iter__(self):
+        return iter(self.source_labels[:len(self)])
+
+    def __getitem__(self, v):
+        if self._index is None:
+            self._index = {u: i for i, u in enumerate(self.source_labels[:len(self)])}
+        i = self._index[v]
+        T = self.target_labels
+        return [T[q] for q in self.qubits[self.offsets[i]:self.offsets[i+1]].tolist()]
+
+    def __repr__(self):
+        return "%s(%r)" % (type(self).__name__, dict(self))
+
+cdef _chain_output(_input_parser _in, vector[vector[int]] &chains):
+    """Converts the chains computed by the heuristic into the output format selected by the
+    ``return_arrays`` parameter; `chains` is either empty or has one entry per variable."""
+    cdef Py_ssize_t n = 0, v, k = 0, total = 0
+    cdef int[::1] O, Q
+    cdef int q
+    if chains.size():
+        n = chains.size() - _in.pincount
+    if not _in.return_arrays:
+        rchain = {}
+        for v in range(n):
+            rchain[_in.SL.label(v)] = [_in.TL.label(q) for q in chains[v]]
+        return rchain
+
+    for v in range(n):
+        total += chains[v].size()
+    offsets = _np.empty(n+1, dtype=_np.intc)
+    qubits = _np.empty(total, dtype=_np.intc)
+    O = offsets
+    Q = qubits
+    O[0] = 0
+    for v in range(n):
+        for q in chains[v]:
+            Q[k] = q
+            k += 1
+        O[v+1] = k
+    return EmbeddingArrays(offsets, qubits, _in.SL._label, _in.TL._label)
+
+EmbeddingProgress = _namedtuple("EmbeddingProgress",
+    ["embedding", "valid", "max_chain_length", "max_fill", "statistics", "elapsed"], module=__name__)
+EmbeddingProgress.__doc__ = """
+    The best embedding recorded so far by a search, as reported to the
+    ``progress`` parameter of :func:`find_embedding`.
+
+    Attributes:
+        embedding (dict): maps labels in S to lists of labels in T
+
+        valid (bool): True if no two chains overlap
+
+        max_chain_length (int): the length of the longest chain
+
+        max_fill (int): the largest number of chains sharing a qubit
+
+        statistics (tuple): when ``valid``, ``statistics[i]`` is the number
+            of chains of length ``i``; otherwise, ``statistics[i]`` is the
+            number of qubits shared by ``i+2`` chains
+
+        elapsed (float): seconds since the search started
+"""
+
+EmbeddingScores = _namedtuple("EmbeddingScores",
+    ["chain_lengths", "overlaps", "total_qubits", "max_chain_length"], module=__name__)
+EmbeddingScores.__doc__ = """
+    Statistics of several embeddings, as computed by :meth:`miner.score_embeddings`.
+    Row ``i`` of each array describes the ``i``-th embedding.
+
+    Attributes:
+        chain_lengths (numpy.ndarray): ``chain_lengths[i, s]`` is the number of
+            chains of length ``s``
+
+        overlaps (numpy.ndarray): ``overlaps[i, k]`` is the number of qubits
+            shared by ``k`` chains (all zero if overlaps were not counted)
+
+        total_qubits (numpy.ndarray): the number of distinct qubits used
+
+        max_chain_length (numpy.ndarray): the length of the longest chain
+"""
+
+cdef class _progress_reporter:
+    cdef object callback
+    cdef labeldict SL, TL
+    cdef int pincount
+    cdef double start
+    cdef object error
+
+    def __init__(self, callback, labeldict SL, labeldict TL, int pincount):
+        self.callback = callback
+        self.SL = SL
+        self.TL = TL
+        self.pincount = pincount
+        self.start = _time.perf_counter()
+        self.error = None
+
+    cdef bint report(self, const embedding_view &emb):
+        cdef vector[int] chain
+        cdef int v
+        cdef list stats
+        cdef bint valid
+        try:
+            embedding = {}
+            for v in range(emb.num_vars() - self.pincount):
+                chain.clear()
+                emb.get_chain(v, chain)
+                embedding[self.SL.label(v)] = [self.TL.label(q) for q in chain]
+            stats = emb.statistics()
+            valid = emb.embedded()
+            progress = EmbeddingProgress(
+                embedding = embedding,
+                valid = valid,
+                max_chain_length = max([len(c) for c in embedding.values()], default=0),
+                max_fill = 1 if valid else len(stats) + 1,
+                statistics = tuple(stats),
+                elapsed = _time.perf_counter() - self.start,
+            )
+            return True if self.callback(progress) else False
+        except BaseException as e:
+            if self.error is None:
+                self.error = e
+            return True
+
+cdef bint wrap_progress(void *reporter, const embedding_view &emb):
+    return (<_progress_reporter>reporter).report(emb)
+
+cdef class Target:
+    """
+    A target graph which has been parsed once, so that it can be reused by many
+    calls to :func:`find_embedding` without reading its edges again.
+
+    Args:
+        T (iterable/NetworkX Graph/array):
+            The target graph as an iterable of label pairs representing the 
+            edges, a NetworkX Graph, or an ``(m, 2)`` integer array of edges 
+            (see :func:`find_embedding`).
+
+    Besides the edges, a Target holds the connected components of the graph
+    and the neighborhoods of its nodes, which would otherwise be recomputed by
+    every call to :func:`find_embedding` (this is skipped for calls with
+    ``fixed_chains`` or ``suspend_chains``, which change the components).  It
+    can be passed as ``T`` to :func:`find_embedding`, :class:`miner` and
+    :func:`find_embeddings_batch`.
+
+    A Target also answers hop-distance queries (see :meth:`distance_bounds` and
+    :meth:`distance_matrix`).  The tables behind them are built on the first
+    query and kept for later ones.
+
+    A Target is never modified after construction (apart from building the
+    distance tables, which is done under a lock), so a single instance can be
+    shared between threads.
+
+    Example::
+        >>> import networkx, dwave_networkx, minorminer
+        >>> T = minorminer.Target(dwave_networkx.pegasus_graph(16))
+        >>> sources = [networkx.complete_graph(k) for k in range(3, 10)]
+        >>> embs = [minorminer.find_embedding(S, T) for S in sources]
+
+    """
+    cdef input_graph Tg
+    cdef labeldict TL
+    cdef shared_ptr[target_components] components
+    cdef shared_ptr[distance_oracle] distances
+    cdef object _distances_lock
+    def __cinit__(self, T):
+        self.TL = _read_graph(self.Tg, T)
+        if not self.TL:
+            raise ValueError("Cannot embed a non-empty source graph into an empty target graph.")
+        self.components.reset(new target_components(self.Tg))
+        self._distances_lock = _threading.Lock()
+
+    cdef distance_oracle *_oracle(self) except NULL:
+        with self._distances_lock:
+            if self.distances.get() == NULL:
+                if len(self.TL) >= 65535:
+                    raise ValueError("distance queries are limited to graphs with fewer than 65535 nodes")
+                # sixteen landmarks give tight bounds on hardware graphs, in a few BFS passes
+                self.distances.reset(new distance_oracle(self.Tg, 16))
+        return self.distances.get()
+
+    cdef int _index(self, q) except -1:
+        if q not in self.TL:
+            raise KeyError(q)
+        return self.TL[q]
+
+    def distance_bounds(self, u, v):
+        """Bounds the number of edges in a shortest path between two nodes.
+
+        The bounds come from breadth-first search tables of a few landmark
+        nodes, so they take constant time regardless of the size of the graph.
+
+        Args:
+            u, v: node labels
+
+        Returns:
+            tuple: ``(lower, upper)``, where ``lower`` is ``inf`` if ``u`` and
+            ``v`` are known to lie in distinct components, and ``upper`` is
+            ``inf`` if no landmark reaches both.
+        """
+        cdef distance_oracle *oracle = self._oracle()
+        cdef int a = self._index(u), b = self._index(v)
+        lower, upper = oracle.lower_bound(a, b), oracle.upper_bound(a, b)
+        return (float('inf') if lower == 65535 else lower,
+                float('inf') if upper == 65535 else upper)
+
+    def distance_matrix(self, nodes=None, disconnected_distance=None):
+        """Computes the exact hop distances between nodes.
+
+        Args:
+            nodes (iterable, optional, default=None):
+                The node labels to include, in order.  If None, all nodes are
+                included, in the order of iteration over the Target.
+
+            disconnected_distance (number, optional, default=None):
+                The distance reported between nodes in distinct components.  If
+                None, the number of nodes in the Target is used.
+
+        Returns:
+            numpy.ndarray: a square array whose ``i, j`` entry is the distance
+            between the ``i``-th and ``j``-th nodes.
+        """
+        cdef distance_oracle *oracle = self._oracle()
+        cdef vector[int] index
+        cdef vector[uint16_t] row
+        cdef Py_ssize_t i, j, k
+        if nodes is None:
+            index = range(len(self.TL))
+        else:
+            for q in nodes:
+                index.push_back(self._index(q))
+        k = index.size()
+        D = _np.empty((k, k), dtype=_np.uint16)
+        cdef uint16_t[:, ::1] M = D
+        with nogil:
+            for i in range(k):
+                oracle.distances_from(index[i], row)
+                for j in range(k):
+                    M[i, j] = row[index[j]]
+        if disconnected_distance is None:
+            disconnected_distance = len(self.TL)
+        return _np.where(D == 65535, disconnected_distance, D.astype(_np.int_))
+
+    def __len__(self):
+        return len(self.TL)
+
+    def __contains__(self, q):
+        return q in self.TL
+
+    def __iter__(self):
+        return iter(self.TL._label)
+
+    def __reduce__(self):
+        # the components are cheap to recompute, relative to reading the edges
+        return Target, (_graph_state(self.Tg, self.TL, self.Tg.num_edges(), len(self.TL)),)
+
 cdef void wrap_logger(void *logger, int loglevel, const string &msg):
     if loglevel == 0:
         (<object>logger).error(msg.rstrip())
@@ -321,6 +674,14 @@ cdef class _input_parser:
     cdef labeldict SL, TL
     cdef optional_parameters opts
     cdef int pincount
+    cdef bint return_arrays
+    cdef shared_ptr[target_components] target
+    cdef _progress_reporter progress
+    # what is needed to reconstruct this parser: see source_state and target_state
+    cdef dict params
+    cdef object T
+    cdef size_t source_edges, target_edges
+    cdef Py_ssize_t source_nodes, target_nodes
     def __init__(self, S, T, params):
         cdef uint64_t *seed
         cdef object z
@@ -328,11 +689,14 @@ cdef class _input_parser:
         names = {"max_no_improvement", "random_seed", "timeout", "tries", "verbose",
                  "fixed_chains", "initial_chains", "max_fill", "chainlength_patience",
                  "return_overlap", "skip_initialization", "inner_rounds", "threads",
-                 "restrict_chains", "suspend_chains", "max_beta", "interactive"}
+                 "restrict_chains", "suspend_chains", "max_beta", "interactive",
+                 "portfolio", "progress", "chainlength_timeout", "chainlength_target",
+                 "total_chainlength_target", "return_arrays", "search_window"}
 
         for name in params:
             if name not in names:
                 raise ValueError("%s is not a valid parameter for find_embedding"%name)
+        self.params = dict(params)
 
         z = params.get("interactive")
         if z is None or not z:
@@ -356,6 +720,22 @@ cdef class _input_parser:
         if z is not None:
             self.opts.chainlength_patience = int(z)
 
+        z = params.get("chainlength_timeout")
+        if z is not None:
+            self.opts.chainlength_timeout = float(z)
+
+        z = params.get("chainlength_target")
+        if z is not None:
+            self.opts.chainlength_target = int(z)
+
+        z = params.get("total_chainlength_target")
+        if z is not None:
+            self.opts.total_chainlength_target = int(z)
+
+        z = params.get("search_window")
+        if z is not None:
+            self.opts.search_window = int(z)
+
         z = params.get("random_seed")
         if z is not None:
             self.opts.seed( long(z) )
@@ -388,6 +768,10 @@ cdef class _input_parser:
         if z is not None:
             self.opts.return_overlap = int(z)
 
+        z = params.get("return_arrays")
+        if z is not None:
+            self.return_arrays = int(z)
+
         z = params.get("max_fill")
         if z is not None:
             self.opts.max_fill = int(z)
@@ -396,13 +780,26 @@ cdef class _input_parser:
         if z is not None:
             self.opts.threads = int(z)
 
+        z = params.get("portfolio")
+        if z is not None:
+            self.opts.portfolio = int(z)
+
         self.SL = _read_graph(self.Sg, S)
         if not self.SL:
             raise EmptySourceGraphError
 
-        self.TL = _read_graph(self.Tg, T)
-        if not self.TL:
-            raise ValueError("Cannot embed a non-empty source graph into an empty target graph.")
+        if isinstance(T, Target):
+            self.Tg = (<Target>T).Tg
+            self.TL = (<Target>T).TL
+            self.target = (<Target>T).components
+        else:
+            self.TL = _read_graph(self.Tg, T)
+            if not self.TL:
+                raise ValueError("Cannot embed a non-empty source graph into an empty target graph.")
+
+        self.T = T if isinstance(T, Target) else None
+        self.source_edges, self.source_nodes = self.Sg.num_edges(), len(self.SL)
+        self.target_edges, self.target_nodes = self.Tg.num_edges(), len(self.TL)
 
         _get_chainmap(params.get("fixed_chains", ()), self.opts.fixed_chains, self.SL, self.TL, "fixed_chains")
         _get_chainmap(params.get("initial_chains", ()), self.opts.initial_chains, self.SL, self.TL, "initial_chains")
@@ -414,6 +811,9 @@ cdef class _input_parser:
         cdef vector[int] chain
         suspend_chains = params.get("suspend_chains", ())
         if suspend_chains:
+            if isinstance(T, Target):
+                # the pins below add target labels; leave the shared Target alone
+                self.TL = self.TL.copy()
             for v, blobs in suspend_chains.items():
                 for i,blob in enumerate(blobs):
                     nonempty = 0
@@ -440,6 +840,50 @@ cdef class _input_parser:
                         else:
                             raise RuntimeError("suspend_chains use source node labels that weren't referred to by any edges")
 
+        z = params.get("progress")
+        if z is not None:
+            if not callable(z):
+                raise TypeError("progress must be callable")
+            self.progress = _progress_reporter(z, self.SL, self.TL, self.pincount)
+            self.opts.localInteractionPtr.reset(
+                new LocalInteractionProgress(self.opts.localInteractionPtr, wrap_progress, <void *>self.progress))
+
+    cdef source_state(self):
+        """The source graph as it was read, without the suspend_chains pins."""
+        return _graph_state(self.Sg, self.SL, self.source_edges, self.source_nodes)
+
+    cdef target_state(self):
+        """The Target this parser was given, or the target graph as it was read."""
+        if self.T is not None:
+            return self.T
+        return _graph_state(self.Tg, self.TL, self.target_edges, self.target_nodes)
+
+    cdef start_progress(self):
+        if self.progress is not None:
+            self.progress.start = _time.perf_counter()
+            self.progress.error = None
+
+    cdef finish_progress(self):
+        if self.progress is not None and self.progress.error is not None:
+            error, self.progress.error = self.progress.error, None
+            raise error
+
+cdef uint64_t _next_seed(uint64_t seed):
+    # a step of Knuth's MMIX generator; gives each retry of a task a reproducible seed
+    return seed * 6364136223846793005ULL + 1442695040888963407ULL
+
+cdef inline void _count_into(vector[int] &hist, Py_ssize_t x):
+    if <Py_ssize_t> hist.size() <= x:
+        hist.resize(x+1, 0)
+    hist[x] += 1
+
+cdef inline void _use_qubit(vector[int] &count, vector[int] &touched, int q):
+    if <int> count.size() <= q:
+        count.resize(q+1, 0)
+    if count[q] == 0:
+        touched.push_back(q)
+    count[q] += 1
+
 cdef class miner:
     """
     A class for higher-level algorithms based on the heuristic embedding algorithm components.
@@ -448,25 +892,102 @@ cdef class miner:
 
         S: an iterable of label pairs representing the edges in the source graph
 
-        T: an iterable of label pairs representing the edges in the target graph
+        T: an iterable of label pairs representing the edges in the target graph, or a :class:`Target`
 
         **params (optional): see documentation of minorminer.find_embedding
 
+    The heuristics run with the GIL released.  Calls on a single miner are
+    serialized by an internal lock, but distinct miner objects can be driven
+    concurrently from separate threads.
+
+    A miner can be pickled, which saves its graphs, parameters, initial chains,
+    the state of its random number generators and the best embedding it has
+    found so far.  The internal search state of the heuristic is not saved, so
+    an unpickled miner does not replay the original call for call; but every
+    copy unpickled from the same data behaves identically.  Use :meth:`seed` to
+    give each copy its own stream, e.g. when fanning a miner out to the workers
+    of a process pool (within one process, see the ``workers`` argument of
+    :meth:`find_embeddings` and :meth:`improve_embeddings`).  The ``progress``
+    callback, which is typically a lambda or a closure, is not pickled; an
+    unpickled miner does not report progress::
+
+        >>> import pickle
+        >>> data = pickle.dumps(mm)
+        >>> copies = [pickle.loads(data) for _ in range(4)]
+        >>> for i, m in enumerate(copies):
+        ...     m.seed(i)
+
     """
     cdef _input_parser _in
     cdef bool quickpassed
     cdef pathfinder_wrapper *pf
+    cdef object _lock
     def __cinit__(self, S, T, **params):
         try:
             self._in = _input_parser(S, T, params)
         except EmptySourceGraphError:
             raise ValueError, "The source graph has zero edges; cowardly refusing to construct a miner object for a trivial problem."
         self.quickpassed = False
-        self.pf = new pathfinder_wrapper(self._in.Sg, self._in.Tg, self._in.opts)
+        self._lock = _threading.Lock()
+        self.pf = new pathfinder_wrapper(self._in.Sg, self._in.Tg, self._in.opts, self._in.target)
 
     def __dealloc__(self):
         del self.pf
 
+    def __reduce__(self):
+        cdef vector[uint64_t] rng
+        cdef vector[int] chain
+        cdef int v
+        offsets = [0]
+        qubits = []
+        with self._lock:
+            self.pf.get_rng_state(rng)
+            for v in range(self.pf.num_vars()-self._in.pincount):
+                chain.clear()
+                self.pf.get_chain(v, chain)
+                qubits.extend(chain)
+                offsets.append(len(qubits))
+            state = (list(rng), _np.array(offsets, dtype=_np.intc),
+                     _np.array(qubits, dtype=_np.intc), self.quickpassed)
+        params = {name: z for name, z in self._in.params.items() if name != "progress"}
+        return _make_miner, (self._in.source_state(), self._in.target_state(), params), state
+
+    def __setstate__(self, state):
+        cdef vector[uint64_t] rng
+        cdef chainmap c = chainmap()
+        cdef vector[int] chain
+        cdef int v
+        rng_state, offsets, qubits, quickpassed = state
+        for x in rng_state:
+            rng.push_back(x)
+        for v in range(len(offsets)-1):
+            if offsets[v] < offsets[v+1]:
+                chain.clear()
+                for q in qubits[offsets[v]:offsets[v+1]]:
+                    chain.push_back(q)
+                c.insert(pair[int, vector[int]](v, chain))
+        with self._lock:
+            self.pf.set_rng_state(rng)
+            self.pf.set_best_chains(c)
+            self.quickpassed = quickpassed
+
+    def seed(self, random_seed=None):
+        """
+        Reseeds the random number generators of this miner.
+
+        Args::
+
+            random_seed: int (default None), the new seed; if None, a seed is drawn from os.urandom
+
+        """
+        cdef uint64_t *seed
+        if random_seed is None:
+            seed_obj = _os.urandom(sizeof(uint64_t))
+            seed = <uint64_t *>(<void *>(<uint8_t *>(seed_obj)))
+            random_seed = seed[0]
+        with self._lock:
+            self.pf.seed(<uint64_t> long(random_seed))
+
     def find_embedding(self):
         """
         Finds a single embedding, and returns it.  If the state of this object has not been changed,
@@ -479,15 +1000,19 @@ cdef class miner:
 
             When return_overlap = True, returns a tuple consisting of a dict that maps labels in S to lists of labels in T and a bool indicating whether or not a valid embedding was foun
         """
-        cdef int i, success = self.pf.heuristicEmbedding()
-        cdef vector[int] chain
-
-        rchain = {}
-        if self._in.opts.return_overlap or success:
-            for v in range(self.pf.num_vars()-self._in.pincount):
-                chain.clear()
-                self.pf.get_chain(v, chain)
-                rchain[self._in.SL.label(v)] = [self._in.TL.label(z) for z in chain]
+        cdef int v, success
+        cdef vector[vector[int]] chains
+
+        with self._lock:
+            self._in.start_progress()
+            with nogil:
+                success = self.pf.heuristicEmbedding()
+            self._in.finish_progress()
+            if self._in.opts.return_overlap or success:
+                chains.resize(self.pf.num_vars())
+                for v in range(chains.size()):
+                    self.pf.get_chain(v, chains[v])
+        rchain = _chain_output(self._in, chains)
 
         if self._in.opts.return_overlap:
             return rchain, success
@@ -528,29 +1053,92 @@ cdef class miner:
         cdef vector[int] neworder
         cdef vector[int] chain
 
-        if not self.quickpassed:
-            clear_first = True
-            self.quickpassed = True
-
         if varorder is not None:
             for v in varorder:
                 if v not in self._in.SL:
                    raise ValueError, "entries of the variable ordering must be source graph labels"
                 else:
                     neworder.push_back(self._in.SL[v])
-            self.pf.quickPass(neworder, chainlength_bound, overlap_bound, local_search, clear_first, round_beta)
-        else:
-            self.pf.quickPass(strategy, chainlength_bound, overlap_bound, local_search, clear_first, round_beta)
 
         rchain = {}
-        for v in range(self.pf.num_vars()-self._in.pincount):
-            chain.clear()
-            self.pf.get_chain(v, chain)
-            if chain.size():
-                rchain[self._in.SL.label(v)] = [self._in.TL.label(z) for z in chain]
+        with self._lock:
+            if not self.quickpassed:
+                clear_first = True
+                self.quickpassed = True
+
+            with nogil:
+                if varorder is not None:
+                    self.pf.quickPass(neworder, chainlength_bound, overlap_bound, local_search, clear_first, round_beta)
+                else:
+                    self.pf.quickPass(strategy, chainlength_bound, overlap_bound, local_search, clear_first, round_beta)
+
+            for v in range(self.pf.num_vars()-self._in.pincount):
+                chain.clear()
+                self.pf.get_chain(v, chain)
+                if chain.size():
+                    rchain[self._in.SL.label(v)] = [self._in.TL.label(z) for z in chain]
         return rchain
 
-    def find_embeddings(self, int n, bool force = False):
+    cdef uint64_t _draw_seed(self):
+        with self._lock:
+            return self.pf.draw_seed()
+
+    def _embed_task(self, init, uint64_t seed):
+        """Runs one task of `_embed_parallel` on a new search, and returns the
+        embedding and whether it succeeded.  A search carries state from one call
+        to the next, so each task gets a fresh one, which depends only on `seed`
+        and `init`; constructing it is cheap next to running it."""
+        cdef optional_parameters opts
+        cdef pathfinder_wrapper *pf
+        cdef vector[vector[int]] chains
+        cdef int v, success
+        with self._lock:
+            opts = self._in.opts
+        if init is not None:
+            _get_chainmap(init, opts.initial_chains, self._in.SL, self._in.TL, "initial_chains")
+        opts.seed(seed)
+        pf = new pathfinder_wrapper(self._in.Sg, self._in.Tg, opts, self._in.target)
+        try:
+            with nogil:
+                success = pf.heuristicEmbedding()
+            if self._in.opts.return_overlap or success:
+                chains.resize(pf.num_vars())
+                for v in range(chains.size()):
+                    pf.get_chain(v, chains[v])
+        finally:
+            del pf
+        return _chain_output(self._in, chains), success
+
+    def _embed_parallel(self, list inits, workers, bint force):
+        """Finds an embedding for each entry of `inits` (a set of initial chains,
+        or None for the current ones) on up to `workers` threads, and yields
+        (index, embedding, success) as each completes.  Seeds are drawn from
+        this miner in task order, so the results do not depend on scheduling.
+        With `force`, failed tasks are retried."""
+        cdef uint64_t seed
+        cdef list seeds = [self._draw_seed() for _ in inits]
+        cdef dict pending = {}
+        self._in.start_progress()
+        with _ThreadPoolExecutor(workers) as executor:
+            for i, init in enumerate(inits):
+                pending[executor.submit(self._embed_task, init, seeds[i])] = i
+            try:
+                while pending:
+                    done, _ = _wait(pending, return_when=_FIRST_COMPLETED)
+                    for f in sorted(done, key=pending.get):
+                        i = pending.pop(f)
+                        emb, success = f.result()
+                        if success or self._in.opts.return_overlap or not force:
+                            yield i, emb, success
+                        else:
+                            seeds[i] = seed = _next_seed(seeds[i])
+                            pending[executor.submit(self._embed_task, inits[i], seed)] = i
+            finally:
+                for f in pending:
+                    f.cancel()
+        self._in.finish_progress()
+
+    def find_embeddings(self, int n, bool force = False, workers = 1, bool as_completed = False):
         """
         Finds n embeddings, and returns them.
 
@@ -560,12 +1148,27 @@ cdef class miner:
 
             force: bool, whether or not to retry failed embeddings until n successes are counted
 
+            workers: int (default 1), the number of embeddings to search for in parallel threads,
+                or None for the number of processors.  each worker runs an independent copy of
+                this miner's search, seeded from this miner's random number generator, so the
+                results are reproducible for a given random_seed
+
+            as_completed: bool (default False), if True, return an iterator which yields
+                (index, embedding) pairs as the searches complete, rather than a list
+
         Returns::
 
             a list of embeddings (which may have overlaps if return_overlap is True)
 
         """
 
+        if workers is None or workers > 1 or as_completed:
+            embs = ((i, emb) for i, emb, success in self._embed_parallel([None]*n, workers, force)
+                    if success or self._in.opts.return_overlap)
+            if as_completed:
+                return embs
+            return [emb for i, emb in sorted(embs, key=lambda x: x[0])]
+
         embs = []
 
         while n > 0:
@@ -592,9 +1195,12 @@ cdef class miner:
 
         cdef chainmap c = chainmap()
         _get_chainmap(emb, c, self._in.SL, self._in.TL, "initial_chains")
-        self.pf.set_initial_chains(c)
+        with self._lock:
+            self.pf.set_initial_chains(c)
+            self._in.opts.initial_chains = c
+            self._in.params["initial_chains"] = emb
 
-    def improve_embeddings(self, list embs):
+    def improve_embeddings(self, list embs, workers = 1, bool as_completed = False):
         """
         For each embedding in the input,
             * update the initial_chains parameter in this object, and
@@ -604,6 +1210,12 @@ cdef class miner:
 
             embs: list of dicts
 
+            workers: int (default 1), the number of embeddings to improve in parallel threads,
+                or None for the number of processors (see find_embeddings)
+
+            as_completed: bool (default False), if True, return an iterator which yields
+                (index, embedding) pairs as the searches complete, rather than a list
+
         Returns::
 
             a list of embeddings with the same length as embs.  note, embeddings may have overlaps if return_overlap is True
@@ -611,6 +1223,14 @@ cdef class miner:
         """
         cdef int n = len(embs)
         cdef list _embs = []
+        if workers is None or workers > 1 or as_completed:
+            if embs:
+                self.set_initial_chains(embs[-1])
+            improved = ((i, emb) for i, emb, success in self._embed_parallel(embs, workers, False))
+            if as_completed:
+                return improved
+            return [emb for i, emb in sorted(improved, key=lambda x: x[0])]
+
         for i in range(len(embs)):
             self.set_initial_chains(embs[i])
             emb = self.find_embedding()
@@ -619,22 +1239,145 @@ cdef class miner:
             _embs.append(emb)
         return _embs
 
-    cdef dict count_overlaps(self, list chains):
-        cdef dict o = {}
-        for chain in chains:
-            for q in chain:
-                o[q] = 1+o.get(q,-1)
-        return o
+    cdef int _histograms(self, embs, bint embedded, vector[int] &sizes,
+                         vector[vector[int]] &lengths, vector[vector[int]] &overlaps) except -1:
+        """For the i-th embedding of `embs`, sets sizes[i] to its number of chains,
+        lengths[i][s] to its number of chains of length s and, unless `embedded`,
+        overlaps[i][k] to the number of its qubits which are shared by k chains."""
+        cdef labeldict TL = self._in.TL
+        cdef vector[int] count, touched
+        cdef const int[::1] O
+        cdef const int[::1] Q
+        cdef Py_ssize_t i, v, j, m = len(embs)
+        cdef int q, k
+        cdef dict extra = {}
+        cdef PyObject *x
+        sizes.assign(m, 0)
+        lengths.resize(m)
+        overlaps.resize(m)
+        count.assign(len(TL), 0)
+        for i, emb in enumerate(embs):
+            sizes[i] = len(emb)
+            if isinstance(emb, EmbeddingArrays):
+                O = _np.ascontiguousarray(emb.offsets, dtype=_np.intc)
+                Q = _np.ascontiguousarray(emb.qubits, dtype=_np.intc)
+                for v in range(O.shape[0]-1):
+                    _count_into(lengths[i], O[v+1]-O[v])
+                    if not embedded:
+                        for j in range(O[v], O[v+1]):
+                            _use_qubit(count, touched, Q[j])
+            else:
+                for chain in emb.values():
+                    _count_into(lengths[i], len(chain))
+                    if not embedded:
+                        for label in chain:
+                            # a plain lookup, bypassing labeldict.__missing__, which would add the label
+                            x = PyDict_GetItem(TL, label)
+                            if x != NULL:
+                                _use_qubit(count, touched, <object> x)
+                            elif TL._dense_label(label):
+                                _use_qubit(count, touched, label.__index__())
+                            else:
+                                _use_qubit(count, touched, extra.setdefault(label, len(TL) + len(extra)))
+            for q in touched:
+                _count_into(overlaps[i], count[q])
+                count[q] = 0
+            touched.clear()
+        return 0
+
+    def score_embeddings(self, embs, embedded = False):
+        """
+        Computes the chain length and overlap statistics of many embeddings at once.
+
+        Args::
+
+            embs: list of embeddings, each a dict or an EmbeddingArrays (with or without overlaps)
+
+            embedded: bool (default False), if this is true, we don't count overlaps
+                and assume that there are none.
+
+        Returns::
 
-    cdef list histogram_key(self, list sizes):
-        cdef dict h = {}
-        cdef int s, x
-        cdef tuple t
-        for s in sizes:
-            if s:
-                h[s] = 1+h.get(s, 0)
+            an EmbeddingScores tuple of arrays, with one row per embedding
 
-        return [t[i] for t in sorted(h.items(), reverse = True) for i in (0,1)]
+        """
+        cdef vector[int] sizes
+        cdef vector[vector[int]] lengths, overlaps
+        cdef Py_ssize_t i, s, m
+        self._histograms(embs, embedded, sizes, lengths, overlaps)
+        m = sizes.size()
+        chain_lengths = _np.zeros((m, max([lengths[i].size() for i in range(m)] or [1])), dtype=_np.intc)
+        shared = _np.zeros((m, max([overlaps[i].size() for i in range(m)] or [1])), dtype=_np.intc)
+        cdef int[:, ::1] L = chain_lengths
+        cdef int[:, ::1] O = shared
+        for i in range(m):
+            for s in range(lengths[i].size()):
+                L[i, s] = lengths[i][s]
+            for s in range(overlaps[i].size()):
+                O[i, s] = overlaps[i][s]
+        if embedded:
+            total = chain_lengths @ _np.arange(chain_lengths.shape[1])
+        else:
+            total = shared.sum(axis=1)
+        longest = chain_lengths.shape[1] - 1 - _np.argmax(chain_lengths[:, ::-1] > 0, axis=1)
+        longest[~chain_lengths.any(axis=1)] = 0
+        return EmbeddingScores(chain_lengths, shared, total, longest)
+
+    def quality_keys(self, embs, embedded = False):
+        """
+        Computes the quality_key of each of several embeddings in one pass, which
+        is much faster than calling quality_key for each.
+
+        Args::
+
+            embs: list of embeddings, each a dict or an EmbeddingArrays (with or without overlaps)
+
+            embedded: bool (default False), if this is true, we don't count overlaps
+                and assume that there are none.
+
+        Returns::
+
+            a list of quality keys, in the order of embs
+
+        """
+        cdef vector[int] sizes
+        cdef vector[vector[int]] lengths, overlaps
+        cdef Py_ssize_t i, s
+        cdef list keys = [], L, O
+        self._histograms(embs, embedded, sizes, lengths, overlaps)
+        for i in range(sizes.size()):
+            if sizes[i] == 0:
+                keys.append((2,))
+                continue
+            L = []
+            for s in range(lengths[i].size()-1, 0, -1):
+                if lengths[i][s]:
+                    L += [s, lengths[i][s]]
+            # quality_key ranks overlaps by the number of chains beyond the first
+            O = []
+            for s in range(overlaps[i].size()-1, 1, -1):
+                if overlaps[i][s]:
+                    O += [s-1, overlaps[i][s]]
+            keys.append((1 if O else 0, O, L))
+        return keys
+
+    def best_embedding_index(self, embs, embedded = False):
+        """
+        Returns the index of the best of several embeddings, as ranked by quality_key
+        (the first, among several of equal quality).
+
+        Args::
+
+            embs: nonempty list of embeddings, each a dict or an EmbeddingArrays
+
+            embedded: bool (default False), if this is true, we don't count overlaps
+                and assume that there are none.
+
+        """
+        keys = self.quality_keys(embs, embedded)
+        if not keys:
+            raise ValueError("cannot choose among zero embeddings")
+        return min(range(len(keys)), key=keys.__getitem__)
 
     def quality_key(self, emb, embedded = False):
         """
@@ -648,6 +1391,8 @@ cdef class miner:
             >>> embs = mm.find_embeddings(10)
             >>> emb = min(embs, key=mm.quality_key)
 
+        To compare many embeddings, quality_keys and best_embedding_index are faster.
+
         Args::
 
             emb: dict, an embedding object (with or without overlaps)
@@ -656,29 +1401,14 @@ cdef class miner:
                 and assume that there are none.
 
         """
-        cdef int state = 2
-        cdef dict o
-        cdef list L, O
-        if emb == {}:
-            return (state,)
+        return self.quality_keys((emb,), embedded)[0]
 
-        state = 0
-        L = self.histogram_key([len(c) for c in emb.values()])
 
-        if embedded:
-            O = []
-        else:
-            o = self.count_overlaps(list(emb.values()))
-            O = self.histogram_key(list(o.values()))
-            if len(O):
-                state = 1
-
-        return (state, O, L)
-
-
-cdef int _get_chainmap(C, chainmap &CMap, SL, TL, parameter) except -1:
+cdef int _get_chainmap(C, chainmap &CMap, labeldict SL, labeldict TL, parameter) except -1:
     cdef vector[int] chain
     CMap.clear();
+    if isinstance(C, tuple) and len(C) == 2:
+        return _get_chainmap_csr(C[0], C[1], CMap, SL, TL, parameter)
     try:
         for a in C:
             chain.clear()
@@ -703,10 +1433,187 @@ cdef int _get_chainmap(C, chainmap &CMap, SL, TL, parameter) except -1:
         else:
             raise ValueError("initial_chains and fixed_chains must be mappings (dict-like) from ints to iterables of ints; C has type %s and next(C) has type %s"%(type(C), type(nc)))
 
+cdef int _get_chainmap_csr(offsets, qubits, chainmap &CMap, labeldict SL, labeldict TL, parameter) except -1:
+    cdef vector[int64_t] off, qub
+    cdef vector[int] chain
+    cdef size_t v, j
+    cdef int64_t q
+    if not _read_index_buffer(offsets, 1, off):
+        for x in offsets:
+            off.push_back(x)
+    if not _read_index_buffer(qubits, 1, qub):
+        for x in qubits:
+            qub.push_back(x)
+    for v in range(1, off.size()):
+        if off[v] < off[v-1] or off[v-1] < 0 or <size_t> off[v] > qub.size():
+            raise ValueError("%s: offsets must be nondecreasing, and within the bounds of the qubit array"%parameter)
+    for v in range(1, off.size()):
+        if off[v-1] == off[v]:
+            continue
+        chain.clear()
+        for j in range(off[v-1], off[v]):
+            q = qub[j]
+            if 0 <= q < TL._dense:
+                chain.push_back(<int> q)
+            elif q in TL:
+                chain.push_back(<int> TL[q])
+            else:
+                raise RuntimeError, "%s uses target node labels that weren't referred to by any edges"%parameter
+        if <Py_ssize_t> (v-1) < SL._dense:
+            CMap.insert(pair[int,vector[int]](v-1, chain))
+        elif v-1 in SL:
+            CMap.insert(pair[int,vector[int]](SL[v-1], chain))
+        else:
+            raise RuntimeError, "%s uses source node labels that weren't referred to by any edges"%parameter
+
+ctypedef fused _index_t:
+    int32_t
+    uint32_t
+    int64_t
+    uint64_t
+
+cdef int _copy_indices(const _index_t[:] A, vector[int64_t] &out) except -1:
+    cdef Py_ssize_t i
+    out.reserve(A.shape[0])
+    for i in range(A.shape[0]):
+        if _index_t is uint64_t and A[i] >> 63:
+            raise OverflowError("node labels must be less than 2**63")
+        out.push_back(<int64_t> A[i])
+
+cdef int _copy_index_pairs(const _index_t[:, :] A, vector[int64_t] &out) except -1:
+    cdef Py_ssize_t i, j
+    out.reserve(2*A.shape[0])
+    for i in range(A.shape[0]):
+        for j in range(2):
+            if _index_t is uint64_t and A[i, j] >> 63:
+                raise OverflowError("node labels must be less than 2**63")
+            out.push_back(<int64_t> A[i, j])
+
+cdef bint _read_index_buffer(A, int ndim, vector[int64_t] &out) except -1:
+    """Copies the contents of `A` into `out`, if `A` exposes a buffer of 32- or 64-bit
+    integers with `ndim` dimensions (and two columns, if `ndim` is 2), and returns True.
+    Otherwise, returns False and leaves `out` alone."""
+    if not PyObject_CheckBuffer(A):
+        return False
+    view = memoryview(A)
+    fmt = view.format.lstrip("@")
+    if view.ndim != ndim or (ndim == 2 and view.shape[1] != 2):
+        return False
+    if len(fmt) != 1 or fmt not in "iIlLqQnN" or view.itemsize not in (4, 8):
+        return False
+    if ndim == 1:
+        if view.itemsize == 4:
+            if fmt.islower():
+                _copy_indices[int32_t](A, out)
+            else:
+                _copy_indices[uint32_t](A, out)
+        elif fmt.islower():
+            _copy_indices[int64_t](A, out)
+        else:
+            _copy_indices[uint64_t](A, out)
+    else:
+        if view.itemsize == 4:
+            if fmt.islower():
+                _copy_index_pairs[int32_t](A, out)
+            else:
+                _copy_index_pairs[uint32_t](A, out)
+        elif fmt.islower():
+            _copy_index_pairs[int64_t](A, out)
+        else:
+            _copy_index_pairs[uint64_t](A, out)
+    return True
+
+cdef labeldict _read_index_edges(input_graph &g, vector[int64_t] &ends):
+    """Fills `g` with the edges (ends[0], ends[1]), (ends[2], ends[3]), ... .  If the labels
+    are exactly 0, 1, ..., n-1, they are used as node indices as they are; otherwise, they
+    are numbered in order of appearance (as `_read_graph` would) with a hash table."""
+    cdef labeldict L = labeldict()
+    cdef unordered_map[int64_t, int] index
+    cdef vector[int64_t] labels
+    cdef vector[uint8_t] seen
+    cdef int64_t lo, hi, x
+    cdef size_t i, n = ends.size()
+    cdef bint dense = True
+    if n == 0:
+        return L
+    lo = hi = ends[0]
+    for x in ends:
+        lo = min(lo, x)
+        hi = max(hi, x)
+    if lo == 0 and <size_t> hi < n:
+        seen.assign(hi+1, 0)
+        for x in ends:
+            seen[x] = 1
+        for i in range(hi+1):
+            if not seen[i]:
+                dense = False
+                break
+    else:
+        dense = False
+    if dense:
+        L._label = list(range(hi+1))
+        L._dense = hi+1
+    else:
+        for i in range(n):
+            x = ends[i]
+            if index.count(x) == 0:
+                index[x] = labels.size()
+                labels.push_back(x)
+            ends[i] = index[x]
+        L._label = labels
+        L.update(zip(L._label, range(len(L._label))))
+    for i in range(0, n, 2):
+        g.push_back(<int> ends[i], <int> ends[i+1])
+    return L
+
+def _make_miner(S, T, params):
+    """Constructs a miner; used to unpickle them."""
+    return miner(S, T, **params)
+
+_GraphState = _namedtuple("_GraphState", ["labels", "edges"], module=__name__)
+_GraphState.__doc__ = """The picklable form of a graph which has been read by `_read_graph`: `labels`
+is the list of node labels in index order (or their number n, if the labels are 0, ..., n-1),
+and `edges` is an (m, 2) array of node indices."""
+
+cdef _graph_state(input_graph &g, labeldict L, size_t num_edges, Py_ssize_t num_nodes):
+    """Returns a `_GraphState` holding the first `num_edges` edges of `g` and the first
+    `num_nodes` labels of `L`."""
+    cdef size_t i
+    edges = _np.empty((num_edges, 2), dtype=_np.intc)
+    cdef int[:, ::1] E = edges
+    for i in range(num_edges):
+        E[i, 0] = g.a(i)
+        E[i, 1] = g.b(i)
+    if L._dense == num_nodes:
+        return _GraphState(num_nodes, edges)
+    return _GraphState(L._label[:num_nodes], edges)
+
+cdef labeldict _read_graph_state(input_graph &g, state):
+    """Inverse of `_graph_state`: fills `g` with the edges of `state`, and returns its labels."""
+    cdef labeldict L = labeldict()
+    cdef vector[int64_t] ends
+    cdef size_t i
+    labels, edges = state
+    if isinstance(labels, int):
+        L._label = list(range(labels))
+        L._dense = labels
+    else:
+        L._label = list(labels)
+        L.update(zip(L._label, range(len(L._label))))
+    _read_index_buffer(edges, 2, ends)
+    for i in range(0, ends.size(), 2):
+        g.push_back(<int> ends[i], <int> ends[i+1])
+    return L
+
 cdef _read_graph(input_graph &g, E):
     cdef labeldict L = labeldict()
     cdef bool nodescan = False
     cdef int i, last
+    cdef vector[int64_t] ends
+    if isinstance(E, _GraphState):
+        return _read_graph_state(g, E)
+    if not hasattr(E, 'edges') and _read_index_buffer(E, 2, ends):
+        return _read_index_edges(g, ends)
     if hasattr(E, 'edges'):
         G = E
         E = E.edges()
@@ -721,4 +1628,4 @@ cdef _read_graph(input_graph &g, E):
             g.push_back(i, i)
     return L
 
-__all__ = ["find_embedding", "VARORDER", "miner"]
+__all__ = ["find_embedding", "VARORDER", "miner", "Target", "EmbeddingProgress", "EmbeddingArrays", "EmbeddingScores"]
@@ -16,8 +16,12 @@ from libcpp cimport bool
 from libcpp.vector cimport vector
 from libcpp.map cimport map
 from libcpp.pair cimport pair
-from libc.stdint cimport uint8_t, uint64_t
+from libcpp.unordered_map cimport unordered_map
+from libc.stdint cimport uint8_t, uint16_t, int32_t, uint32_t, int64_t, uint64_t
 from libcpp.string cimport string
+from cpython.buffer cimport PyObject_CheckBuffer
+from cpython.dict cimport PyDict_GetItem
+from cpython.object cimport PyObject
 
 ctypedef pair[int,int] intpair
 ctypedef pair[intpair, int] intpairint
@@ -26,20 +30,40 @@ ctypedef map[int, vector[int]] chainmap
 
 cdef class labeldict(dict):
     cdef list _label
+    # the labels 0, 1, ..., _dense-1 map to themselves, without being stored in the dict
+    cdef Py_ssize_t _dense
     def __init__(self,*args,**kwargs):
         super(labeldict,self).__init__(args,**kwargs)
         self._label = []
+        self._dense = 0
+    cdef inline bint _dense_label(self, l):
+        if self._dense == 0 or not hasattr(l, '__index__'):
+            return False
+        return 0 <= l.__index__() < self._dense
     def __missing__(self,l):
+        if self._dense_label(l):
+            return l.__index__()
         self[l] = k = len(self._label)
         self._label.append(l)
         return k
+    def __contains__(self,l):
+        return dict.__contains__(self, l) or self._dense_label(l)
+    def __len__(self):
+        return len(self._label)
     def label(self,k):
         return self._label[k]
+    def copy(self):
+        cdef labeldict L = labeldict()
+        L.update(self)
+        L._label = list(self._label)
+        L._dense = self._dense
+        return L
 
 cdef extern from "<memory>" namespace "std":
     cdef cppclass shared_ptr[T]:
         shared_ptr() nogil
         void reset(T*)
+        T* get()
 
     cdef cppclass unique_ptr[T]:
         unique_ptr() nogil
@@ -54,6 +78,12 @@ cdef extern from "../include/find_embedding/util.hpp" namespace "find_embedding"
 
     ctypedef shared_ptr[LocalInteraction] LocalInteractionPtr
 
+    cppclass embedding_view:
+        bint embedded()
+        const vector[int] &statistics()
+        int num_vars()
+        void get_chain(int, vector[int] &)
+
 
     cppclass optional_parameters:
         optional_parameters()
@@ -70,12 +100,17 @@ cdef extern from "../include/find_embedding/util.hpp" namespace "find_embedding"
         int inner_rounds
         int max_fill
         int chainlength_patience
+        double chainlength_timeout
+        int chainlength_target
+        int total_chainlength_target
+        int search_window
         bint return_overlap
         bint skip_initialization
         chainmap fixed_chains
         chainmap initial_chains
         chainmap restrict_chains
         int threads
+        int portfolio
 
 cdef extern from "src/pyutil.hpp" namespace "":
     cppclass LocalInteractionPython(LocalInteraction):
@@ -86,6 +121,11 @@ cdef extern from "src/pyutil.hpp" namespace "":
     cppclass LocalInteractionLogger(LocalInteraction):
         LocalInteractionLogger(cython_callback, void *)
 
+    ctypedef bint (*cython_progress)(void *, const embedding_view &)
+
+    cppclass LocalInteractionProgress(LocalInteraction):
+        LocalInteractionProgress(LocalInteractionPtr, cython_progress, void *)
+
     void handle_exceptions()
 
 cdef extern from "../include/find_embedding/graph.hpp" namespace "graph":
@@ -93,8 +133,22 @@ cdef extern from "../include/find_embedding/graph.hpp" namespace "graph":
         input_graph()
         void push_back(int,int)
         int num_nodes()
+        size_t num_edges()
+        int a(int)
+        int b(int)
         void clear()
 
+    cppclass distance_oracle:
+        distance_oracle(const input_graph &, int) except +
+        size_t num_nodes()
+        void distances_from(int, vector[uint16_t] &) nogil
+        int lower_bound(int, int)
+        int upper_bound(int, int)
+
+cdef extern from "../include/find_embedding/find_embedding.hpp" namespace "find_embedding":
+    cppclass target_components:
+        target_components(const input_graph &) except +
+
 cdef extern from "../include/find_embedding/pathfinder.hpp" namespace "find_embedding":
     cppclass pathfinder_public_interface
 
@@ -120,12 +174,18 @@ cdef extern from "../include/find_embedding/chain.hpp" namespace "find_embedding
         parameter_processor pp
         unique_ptr[pathfinder_public_interface] pf
         pathfinder_wrapper(input_graph &, input_graph &, optional_parameters &)
-        int heuristicEmbedding() except +handle_exceptions
+        pathfinder_wrapper(input_graph &, input_graph &, optional_parameters &, shared_ptr[target_components])
+        int heuristicEmbedding() nogil except +handle_exceptions
         int num_vars()
         void get_chain(int, vector[int] &)
         void set_initial_chains(chainmap &)
-        void quickPass(const vector[int] &, int, int, bool, bool, double) except +handle_exceptions
-        void quickPass(VARORDER, int, int, bool, bool, double) except +handle_exceptions
+        void set_best_chains(chainmap &) except +handle_exceptions
+        void get_rng_state(vector[uint64_t] &)
+        void set_rng_state(const vector[uint64_t] &) except +handle_exceptions
+        void seed(uint64_t)
+        uint64_t draw_seed()
+        void quickPass(const vector[int] &, int, int, bool, bool, double) nogil except +handle_exceptions
+        void quickPass(VARORDER, int, int, bool, bool, double) nogil except +handle_exceptions
 
     cppclass chain:
         chain(vector[int] &w, int l)
@@ -152,5 +212,6 @@ cdef class cppembedding:
         pass
 
 cdef extern from "../include/find_embedding/find_embedding.hpp" namespace "find_embedding":
-    int findEmbedding(input_graph, input_graph, optional_parameters, vector[vector[int]]&) except +handle_exceptions
+    int findEmbedding(input_graph, input_graph, optional_parameters, vector[vector[int]]&) nogil except +handle_exceptions
+    int findEmbedding(input_graph, input_graph, optional_parameters, vector[vector[int]]&, shared_ptr[target_components]) nogil except +handle_exceptions
 
@@ -16,9 +16,11 @@
 # cython: language_level=3
 include "busclique_h.pxi"
 
-import homebase, os, pathlib, fasteners, threading, random
+import homebase, os, pathlib, fasteners, threading, random, mmap, atexit, time
 from pickle import dump, load
-import networkx as nx, dwave_networkx as dnx
+from collections import OrderedDict, namedtuple
+from collections.abc import Mapping
+import numpy as np, networkx as nx, dwave_networkx as dnx
 
 from cpython.mem cimport PyMem_Malloc, PyMem_Free
 from cpython.bytes cimport PyBytes_FromStringAndSize
@@ -26,12 +28,103 @@ from cpython.bytes cimport PyBytes_FromStringAndSize
 #increment this version any time there is a change made to the cache format,
 #when yield-improving changes are made to clique algorithms, or when bugs are
 #fixed in the same.
-cdef int __cache_version = 6
+cdef int __cache_version = 9
 
-cdef int __lru_size = 100
 cdef dict __global_locks = {'clique': threading.Lock(),
+                            'clique_sizes': threading.Lock(),
                             'biclique': threading.Lock()}
 
+#marks the smallest size in a lazy clique cache for which no embedding was
+#found (see _merge_clique_sizes)
+cdef uint32_t __no_chainlength = 0xffffffff
+
+#threads computing full clique caches for lazy busgraph_cache instances, keyed
+#by graph identifier
+cdef dict __clique_fills = {}
+cdef object __clique_fills_lock = threading.Lock()
+
+CachePolicy = namedtuple('CachePolicy', ['max_entries', 'max_bytes', 'ttl',
+                                         'rootdir', 'per_family',
+                                         'memory_bytes'], module=__name__)
+CachePolicy.__new__.__defaults__ = (100, None, None, None, False, 1 << 27)
+CachePolicy.__doc__ = """Configuration of the clique and biclique caches
+of :class:`busgraph_cache`; see :meth:`busgraph_cache.set_cache_policy`.
+
+Args:
+    max_entries (int/None, optional, default=100):
+        Maximum number of cache files in each cache directory, or None for no
+        limit.
+
+    max_bytes (int/None, optional, default=None):
+        Maximum total size, in bytes, of the cache files in each cache
+        directory, or None for no limit.
+
+    ttl (float/None, optional, default=None):
+        Maximum age, in seconds, of a cache file.  Older files are recomputed
+        on access and evicted when the directory is cleaned up.  None means
+        that cache files do not expire.
+
+    rootdir (str/None, optional, default=None):
+        Directory in which to store the caches, in place of the default
+        directory chosen by `homebase`.
+
+    per_family (bool, optional, default=False):
+        If True, the caches of Chimera, Pegasus and Zephyr graphs are stored
+        in separate subdirectories, each with its own limits.
+
+    memory_bytes (int, optional, default=2**27):
+        Maximum total size, in bytes, of the caches kept in memory by this
+        process.  Zero disables the in-memory cache.
+"""
+
+CacheStats = namedtuple('CacheStats', ['hits', 'memory_hits', 'misses',
+                                       'evictions', 'memory_bytes',
+                                       'disk_bytes', 'disk_entries'],
+                        module=__name__)
+CacheStats.__doc__ = """Statistics of the clique and biclique caches of
+:class:`busgraph_cache`; see :meth:`busgraph_cache.cache_stats`.
+
+Args:
+    hits (int):
+        Number of lookups in this process that were served from a cache,
+        either in memory or on disk.
+
+    memory_hits (int):
+        Number of those lookups that were served from memory.
+
+    misses (int):
+        Number of lookups in this process that computed a cache.
+
+    evictions (int):
+        Number of cache files removed by this process to enforce the
+        :class:`CachePolicy`.
+
+    memory_bytes (int):
+        Total size of the caches held in memory by this process.
+
+    disk_bytes (int):
+        Total size of the cache files in the cache root directory.
+
+    disk_entries (int):
+        Number of cache files in the cache root directory.
+"""
+
+_cache_policy = CachePolicy()
+cdef dict __cache_counts = {'hits': 0, 'memory_hits': 0, 'misses': 0,
+                            'evictions': 0}
+
+#the in-process tier of the cache, in front of the filesystem.  Accesses that
+#are served from memory are recorded in `__lru_pending`, keyed by the pair
+#(dirname, basedir), and written to the `.lru` files later (see _fetch_cache)
+cdef dict __lru_pending = {}
+cdef dict __lru_flushed = {}
+cdef double __lru_flush_interval = 60
+
+#Windows refuses to replace or remove a file while another thread or process
+#has it open; cache files are only held open briefly, so we retry a few times
+cdef int __replace_attempts = 20
+cdef double __replace_delay = 0.05
+
 def _num_nodes(nn, offset = 0):
     """Internal-use function to normalize inputs.
 
@@ -53,7 +146,8 @@ def _num_nodes(nn, offset = 0):
     return num, nodes
 
 _no_seed = object()
-def find_clique_embedding(nodes, g, seed = _no_seed, use_cache = True):
+def find_clique_embedding(nodes, g, seed = _no_seed, use_cache = True,
+                          lazy = False, background = False):
     """Finds a clique embedding in the graph ``g`` using a polynomial-time 
     algorithm.
 
@@ -68,10 +162,10 @@ def find_clique_embedding(nodes, g, seed = _no_seed, use_cache = True):
         
         use_cache (bool, optional, default=True):
             Whether or not to compute/restore a cache of clique embeddings for 
-            ``g``. Note that this function only uses the filesystem cache, and 
-            does not maintain the cache in memory. If many (or even several) 
-            embeddings are desired in a single session, it is recommended to use 
-            :class:`.busgraph_cache`.
+            ``g``. Caches are kept in memory (up to a fixed total size) in
+            front of the filesystem cache, but ``g`` is parsed on every call.
+            If many (or even several) embeddings are desired in a single
+            session, it is recommended to use :class:`.busgraph_cache`.
             
         seed (int, optional):
             A seed for an internal random number generator.  If ``use_cache`` is
@@ -79,6 +173,15 @@ def find_clique_embedding(nodes, g, seed = _no_seed, use_cache = True):
             is consistent between runs.  Otherwise, a seed is generated from the
             current python random state.
 
+        lazy (bool, optional, default=False):
+            If True and ``use_cache`` is True, only the clique embedding of the
+            requested size is computed (and cached) when the cache of all
+            sizes is missing.  See :class:`.busgraph_cache`.
+
+        background (bool, optional, default=False):
+            If True and ``lazy`` is True, the cache of all sizes is computed
+            in a background thread.
+
     Returns:
         dict: An embedding of node labels (either nodes, or range(nodes)) mapped 
         to chains of a clique embedding.
@@ -96,7 +199,8 @@ def find_clique_embedding(nodes, g, seed = _no_seed, use_cache = True):
         to pay off after a fairly small number of calls. An exceptional use case 
         is when there are a large number of missing internal couplers, where the 
         result is nondeterministic -- avoiding the cache in this case may be 
-        preferable.
+        preferable.  When the first call for a newly calibrated graph must be
+        quick, set ``lazy`` (and perhaps ``background``) instead.
     
     """
     try:
@@ -114,7 +218,8 @@ def find_clique_embedding(nodes, g, seed = _no_seed, use_cache = True):
     if use_cache:
         if seed is _no_seed:
             seed = 0
-        return busgraph_cache(g, seed=seed).find_clique_embedding(nodes)
+        return busgraph_cache(g, seed=seed, lazy=lazy,
+                              background=background).find_clique_embedding(nodes)
     else:
         if seed is _no_seed:
             seed = None
@@ -127,12 +232,26 @@ class busgraph_cache:
     The cache files are stored in a directory determined by `homebase` (use
     :meth:`busgraph_cache.cache_rootdir` to retrieve the path to this directory). 
     Subdirectories named `cliques` and `bicliques` are then created to store the
-    respective caches in each.
+    respective caches in each.  The location, size limits and expiry of the
+    caches are configured with :meth:`busgraph_cache.set_cache_policy`.
 
     Args:
         g (NetworkX Graph):
             A :func:`dwave_networkx.pegasus_graph` or :func:`dwave_networkx.chimera_graph`.
                 or :func:`dwave_networkx.zephyr_graph`.
+
+        lazy (bool, optional, default=False):
+            If True, :meth:`find_clique_embedding` does not compute the clique
+            cache of all sizes when it is missing.  Instead, only the requested
+            size is computed, and cached along with the other sizes that the
+            same embedding serves.  If that search fails, or once the full
+            clique cache exists, the full cache is used.  The other methods
+            compute the full cache when it is needed.
+
+        background (bool, optional, default=False):
+            If True (and ``lazy`` is True), the full clique cache is computed
+            in a background thread while lazy requests are served.
+
     Note:
         Due to internal optimizations, not all Chimera graphs are supported by
         this code. Specifically, the graphs :func:`dwave_networkx.chimera_graph(m, n, t)`
@@ -141,7 +260,7 @@ class busgraph_cache:
         :math:`t>8`, use the legacy chimera-embedding package.
     
     """
-    def __init__(self, g, seed = 0):
+    def __init__(self, g, seed = 0, lazy = False, background = False):
         self._family = g.graph['family']
         graphclass = {'pegasus': _pegasus_busgraph,
                       'zephyr': _zephyr_busgraph,
@@ -154,12 +273,56 @@ class busgraph_cache:
         self._graph = graphclass(g, seed=seed, compute_identifier=True)
         self._cliques = None
         self._bicliques = None
+        self._lazy = lazy
+        self._clique_sizes = None
+        self._fill = (g, seed) if lazy and background else None
 
     def _ensure_clique_cache(self):
         """Fetch/compute the clique cache, if it's not already in memory."""
         if self._cliques is None:
             self._cliques = self._fetch_cache('clique', self._graph.cliques)
 
+    def _ensure_clique_size(self, num):
+        """Fetch the clique cache if it exists, and otherwise fetch/compute a
+        lazy clique cache that holds the size `num` (see `_merge_clique_sizes`).
+        If the single-size search finds no embedding, the clique cache is
+        computed after all.  Returns whichever cache holds the answer."""
+        sizes = self._clique_sizes
+        if sizes is None or not _has_clique_size(sizes, num):
+            if self._cliques is None:
+                self._cliques = self._fetch_cache('clique', None)
+            if self._cliques is not None:
+                return self._cliques
+            if self._fill is not None:
+                self._start_fill()
+            graph = self._graph
+            def compute(cache):
+                return _merge_clique_sizes(cache, num, graph.clique(num))
+            def accept(cache):
+                return _has_clique_size(cache, num)
+            sizes = self._fetch_cache('clique_sizes', compute, accept)
+            self._clique_sizes = sizes
+        if num in sizes['size']:
+            return sizes
+        #the single-size search is a heuristic; it can miss embeddings that
+        #best_cliques finds, so the full cache has the final word
+        self._ensure_clique_cache()
+        return self._cliques
+
+    def _start_fill(self):
+        """Start computing the clique cache in a background thread, unless
+        one is already computing it."""
+        identifier = self._graph.identifier
+        with __clique_fills_lock:
+            if identifier in __clique_fills:
+                return
+            thread = threading.Thread(target=_fill_clique_cache,
+                                      args=self._fill + (identifier,),
+                                      daemon=True)
+            __clique_fills[identifier] = thread
+            thread.start()
+        self._fill = None
+
 
     def _ensure_biclique_cache(self):
         """Fetch/compute the clique cache, if it's not already in memory."""
@@ -178,7 +341,87 @@ class busgraph_cache:
         Returns:
             str
         """
-        return homebase.user_data_dir('busclique', 'dwave', version)
+        return _cache_rootdir(_cache_policy, version)
+
+    @staticmethod
+    def cache_policy():
+        """Returns the current cache policy.
+
+        Returns:
+            :class:`CachePolicy`
+        """
+        return _cache_policy
+
+    @staticmethod
+    def set_cache_policy(policy=None, **changes):
+        """Sets the policy of the clique and biclique caches.
+
+        Limits on the size of the cache directories are enforced the next time
+        a cache file is written.
+
+        Args:
+            policy (:class:`CachePolicy`, optional, default=current policy):
+                The new policy.
+
+            **changes:
+                Fields of :class:`CachePolicy` to replace in ``policy``.
+
+        Returns:
+            :class:`CachePolicy`: the new policy.
+
+        Examples:
+            >>> from minorminer.busclique import busgraph_cache, CachePolicy
+            >>> busgraph_cache.set_cache_policy(max_bytes=2**30, ttl=86400)  # doctest: +SKIP
+            >>> busgraph_cache.set_cache_policy(CachePolicy())  # restore defaults  # doctest: +SKIP
+        """
+        global _cache_policy
+        if policy is None:
+            policy = _cache_policy
+        policy = policy._replace(**changes)
+        for name in ('max_entries', 'max_bytes', 'ttl'):
+            value = getattr(policy, name)
+            if value is not None and value < 0:
+                raise ValueError(f"{name} must be nonnegative or None")
+        if policy.memory_bytes < 0:
+            raise ValueError("memory_bytes must be nonnegative")
+        with _memory_cache.lock:
+            old = _cache_policy
+            _cache_policy = policy
+        if (old.rootdir, old.per_family) != (policy.rootdir, policy.per_family):
+            #the memory tier mirrors the old cache directories
+            _memory_cache.clear()
+        _memory_cache.resize(policy.memory_bytes)
+        return policy
+
+    @staticmethod
+    def cache_stats(reset=False):
+        """Returns statistics of the clique and biclique caches.
+
+        Args:
+            reset (bool, optional, default=False):
+                If True, the counts of hits, misses and evictions are reset to
+                zero after they are read.
+
+        Returns:
+            :class:`CacheStats`
+        """
+        disk_bytes = disk_entries = 0
+        for dirpath, dirnames, filenames in os.walk(busgraph_cache.cache_rootdir()):
+            for f in filenames:
+                if not f.startswith('.') and not f.endswith('~'):
+                    try:
+                        disk_bytes += os.path.getsize(os.path.join(dirpath, f))
+                        disk_entries += 1
+                    except FileNotFoundError:
+                        pass
+        with _memory_cache.lock:
+            counts = dict(__cache_counts)
+            if reset:
+                for k in __cache_counts:
+                    __cache_counts[k] = 0
+        return CacheStats(memory_bytes=_memory_cache.nbytes,
+                          disk_bytes=disk_bytes, disk_entries=disk_entries,
+                          **counts)
 
     @staticmethod
     def clear_all_caches():
@@ -188,6 +431,8 @@ class busgraph_cache:
         Returns:
             None
         """
+        _memory_cache.clear()
+        __lru_pending.clear()
         dirstack = []
         for i in range(__cache_version + 1):
             rootdir = pathlib.Path(busgraph_cache.cache_rootdir(i))
@@ -207,7 +452,7 @@ class busgraph_cache:
                 top.rmdir()
                 dirstack.pop()
 
-    def _fetch_cache(self, dirname, compute):
+    def _fetch_cache(self, dirname, compute, accept=None):
         """This is an ad-hoc implementation of a file-cache using a LRU strategy.
         It's intended to be platform independent, thread- and multiprocess-safe,
         and reasonably performant -- I couldn't find a ready-made solution that
@@ -223,24 +468,77 @@ class busgraph_cache:
         `self.graph` has the filename `str(shortcode)` -- this is preferable to
         using a single file to store the entire cache.  In the case of hash
         collisions, the databases of multiple graphs will be stored in a single
-        cache file -- so that file contains a `pickle`'d dict mapping
-        indentifiers (not shortcodes) to the corresponding clique/biclique
-        caches.
+        cache file -- so that file contains a sequence of entries, each holding
+        an identifier (not shortcode) and the corresponding clique/biclique
+        cache in the binary layout of `_pack_cache`.  The file is memory-mapped
+        just long enough to find the matching entry and copy out its payload;
+        embeddings are decoded from that copy when they are looked up.
 
         Inside a cache directory, we have two special files and perhaps many
         cache files.  The `.lock` file is used by `fasteners.InterProcessLock`
-        to provide process-level locking.  The `.lru` file is a list of up to
-        `__lru_size` different cache filenames, sorted descending in the
-        recentness of the last access of a given filename.  This enables us to
-        automatically clean up the cache before it gets too large.
+        to provide process-level locking.  The `.lru` file is a list of pairs
+        (filename, size) of cache files, sorted descending in the recentness
+        of the last access of a given filename.  This enables us to
+        automatically clean up the cache before it exceeds the limits of the
+        `CachePolicy`.  If the policy has `per_family` set, each graph family
+        gets its own cache directory below `cliques` and `bicliques`.
+
+        Cache files are never modified in place: writers publish a complete
+        new file with an atomic rename, and a reader that has mapped the old
+        file keeps a consistent view of it.  So a cache hit, whether served
+        from memory or from the filesystem, takes no locks and writes no files;
+        only writers of a missing identifier serialize on the locks, and they
+        check again for the identifier once they hold them.
+
+        In front of the filesystem sits `_memory_cache`, an in-process LRU
+        keyed by directory and identifier, and bounded by the `memory_bytes` of the cache
+        policy.  It only holds caches that own their data -- never views of a
+        mapped file, which would keep that file open while it is cached.  The
+        shortcodes of hits are noted in `__lru_pending`, and the `.lru` file
+        catches up on the next write, when a hit finds the locks free at least
+        `__lru_flush_interval` seconds after the last update, or when the
+        interpreter exits.
+
+        If `compute` is None, a missing cache is not computed, and None is
+        returned instead.  If `accept` is given, a cached entry is only
+        returned if `accept(cache)` is true; otherwise, `compute(cache)` is
+        called with the rejected entry (or None if there is none) to produce
+        its replacement.  This is how lazy clique caches, which are kept in a
+        third subdirectory `clique_sizes`, grow one size at a time.
         """
-        rootdir = busgraph_cache.cache_rootdir()
+        identifier = self._graph.identifier
+        shortcode = self._graph.short_identifier
+        policy = _cache_policy
+        rootdir = _cache_rootdir(policy)
         basedir = os.path.join(rootdir, dirname)
+        if policy.per_family:
+            basedir = os.path.join(basedir, self._family)
+        cachefile = os.path.join(basedir, str(shortcode))
+
+        key = basedir, identifier
+        item = _memory_cache.get(key)
+        if item is not None and item[1] > time.time() and (accept is None or accept(item[0])):
+            _note_access(dirname, basedir, shortcode, 'memory_hits')
+            return item[0]
+
+        written = _cache_file_written(cachefile, policy.ttl)
+        if written is not None:
+            buf = _map_cache_file(cachefile)
+            try:
+                cache = _read_cache_entry(buf, identifier, dirname)
+            finally:
+                _close_map(buf)
+            if cache is not None and (accept is None or accept(cache)):
+                _memory_cache.put(key, (cache, written + (policy.ttl or float('inf'))),
+                                  cache['raw'].nbytes)
+                _note_access(dirname, basedir, shortcode)
+                return cache
+
+        if compute is None:
+            return None
+
         pathlib.Path(basedir).mkdir(parents=True, exist_ok=True)
         lockfile = os.path.join(basedir, ".lock")
-        lrufile = os.path.join(basedir, ".lru")
-        identifier = self._graph.identifier
-        shortcode = self._graph.short_identifier
         
         #this makes our writes to the filesystem atomic
         file_context = copy_on_close_context()
@@ -249,42 +547,42 @@ class busgraph_cache:
         with __global_locks[dirname]:
             #this solves inter-process safety?
             with fasteners.InterProcessLock(lockfile):
-                cachefile = os.path.join(basedir, str(shortcode))
-                if os.path.exists(cachefile):
-                    with open(cachefile, 'rb') as filecache:
-                        currcache = load(filecache)
-                else:
-                    currcache = {}
-                cache = currcache.get(identifier)
-                if cache is None:
-                    cache = compute()
-                    currcache[identifier] = cache
-                    with file_context.open(cachefile, 'wb') as filecache:
-                        dump(currcache, filecache)
-
-                #now, update the LRU cache -- if this was being done in-memory,
-                #there are more efficient algorithms... but since we're doing 
-                #linear-time read&write, might as well do it the lazy way.
+                #another writer may have published the cache in the meantime
+                buf = _map_cache_file(cachefile)
                 try:
-                    with open(lrufile, 'rb') as lru:
-                        LRU = load(lru)
-                except FileNotFoundError:
-                    LRU = []
-                newLRU = [shortcode]
-                for x in LRU:
-                    if x != shortcode:
-                        newLRU.append(x)
-
-                #this violates atomicity, but it's okay -- at worst, we'll need
-                #to recompute a deleted file that still has an entry in the LRU
-                while len(newLRU) > __lru_size:
-                    oldkey = newLRU.pop()
-                    os.remove(os.path.join(basedir, oldkey))
-                with file_context.open(lrufile, 'wb') as lru:
-                    dump(newLRU, lru)
-
-        #perform the copy-on-write for the lrufile and cachefile
-        file_context.close()
+                    written = _cache_file_written(cachefile, policy.ttl)
+                    cache = None
+                    if written is not None:
+                        cache = _read_cache_entry(buf, identifier, dirname)
+                    if accept is None:
+                        missing = cache is None
+                        if missing:
+                            cache = compute()
+                    else:
+                        missing = cache is None or not accept(cache)
+                        if missing:
+                            cache = compute(cache)
+                    if missing:
+                        payload = _pack_cache(cache, dirname)
+                        nbytes = len(payload)
+                        with file_context.open(cachefile, 'wb') as filecache:
+                            _write_cache_file(filecache, buf, identifier, payload)
+                        written = time.time()
+                        counter = 'misses'
+                    else:
+                        nbytes = cache['raw'].nbytes
+                        counter = 'hits'
+                finally:
+                    _close_map(buf)
+                _update_lru(dirname, basedir, shortcode, file_context, policy)
+
+                #perform the copy-on-write for the lrufile and cachefile; the
+                #next writer removes any temporary files it finds, so we must
+                #not release the locks before they are renamed
+                file_context.close()
+        with _memory_cache.lock:
+            __cache_counts[counter] += 1
+        _memory_cache.put(key, (cache, written + (policy.ttl or float('inf'))), nbytes)
         return cache
 
     def largest_clique(self):
@@ -332,7 +630,8 @@ class busgraph_cache:
         its size.
         
         This will compute the entire clique cache if it is missing from
-        the filesystem.
+        the filesystem, unless this cache is lazy; then, only the requested
+        size is computed.
         
         Args:
             nn (int/iterable):
@@ -345,12 +644,17 @@ class busgraph_cache:
         
         """
         num, nodes = _num_nodes(nn)
-        self._ensure_clique_cache()
-        keys = self._cliques['size']
-        key = keys.get(num)
+        if not self._lazy:
+            self._ensure_clique_cache()
+            cliques = self._cliques
+        elif num == 0:
+            return {}
+        else:
+            cliques = self._ensure_clique_size(num)
+        key = cliques['size'].get(num)
         if key is None:
             return {}
-        emb = dict(zip(nodes, self._cliques['raw'][key]))
+        emb = dict(zip(nodes, cliques['raw'][key]))
         return self._graph.relabel(emb)
 
     def largest_balanced_biclique(self):
@@ -371,6 +675,8 @@ class busgraph_cache:
         self._ensure_biclique_cache()
         biggest = self._bicliques['max_side']
         embs = self._bicliques['raw']
+        if not embs:
+            return {}
         s0, s1 = key = max(embs, key=lambda x: min(x))
         raw_emb = embs[key]
         raw_emb0 = sorted(raw_emb[:s0], key=len)
@@ -471,6 +777,59 @@ cdef dict _make_clique_cache(vector[embedding_t] &embs):
                 break
     return {'raw': raw, 'size': by_size}
 
+def _merge_clique_sizes(cache, size_t num, list emb):
+    """
+    Add a clique embedding of size `num` to a lazy clique cache, and return the
+    updated cache.  A lazy clique cache has the structure of the output of
+    `_make_clique_cache`, except that `raw` is a dict keyed by chainlength and
+    `by_size` only holds the sizes that have been searched for (or found
+    along the way), plus a member `fail` holding the smallest size for which
+    no embedding was found (or None).
+
+    `emb` is the output of the `clique` method of a busgraph: a list of chains
+    sorted by length, or an empty list.  If the first `num` chains have maximum
+    chainlength `L`, then every chain of length at most `L` is kept in
+    `raw[L]`, and that embedding serves every size from `num` up to its
+    length.
+    """
+    cdef size_t length, size
+    if cache is None:
+        raw, by_size, fail = {}, {}, None
+    else:
+        raw, by_size, fail = dict(cache['raw']), dict(cache['size']), cache['fail']
+    if len(emb) < num:
+        fail = num if fail is None else min(fail, num)
+    else:
+        length = len(emb[num-1])
+        emb = [chain for chain in emb if len(chain) <= length]
+        if len(emb) > len(raw.get(length, ())):
+            raw[length] = tuple(emb)
+        for size in range(num, len(raw[length]) + 1):
+            if by_size.get(size, length) >= length:
+                by_size[size] = length
+    used = set(by_size.values())
+    raw = {key: val for key, val in raw.items() if key in used}
+    return {'raw': raw, 'size': by_size, 'fail': fail}
+
+def _has_clique_size(cache, num):
+    """
+    Returns True if the lazy clique `cache` answers a request for a clique of
+    size `num`, whether or not an embedding of that size was found.
+    """
+    fail = cache['fail']
+    return num in cache['size'] or (fail is not None and num >= fail)
+
+def _fill_clique_cache(g, seed, identifier):
+    """
+    Compute and store the full clique cache of `g`.  This is the target of the
+    background threads started by lazy instances of `busgraph_cache`.
+    """
+    try:
+        busgraph_cache(g, seed=seed)._ensure_clique_cache()
+    finally:
+        with __clique_fills_lock:
+            __clique_fills.pop(identifier, None)
+
 cdef _keep_biclique_key(tuple key0, tuple key1, dict chainlength):
     """
     Helper function for `_make_biclique_cache`.  Each "key" is a pair of ints
@@ -502,8 +861,8 @@ cdef dict _make_biclique_cache(vector[pair[pair[size_t, size_t],
     dict `size` where `size[s0][s1]` (given s0 >= s1) is a key into `raw` where
     `raw[size[s0][s1]]` is the minimum chainlength embedding of K_{s0, s1}; and
     a dictionary `max_side` where `max_side[None]` gives the largest value of
-    `x` such that K_{x, y} exists for any `y > 0`; and otherwise `max_side[x]`
-    gives the largest value y for which K_{x, y} exists.
+    `x` such that K_{x, y} exists for any `y > 0` (or 0 if there is none); and
+    otherwise `max_side[x]` gives the largest value y for which K_{x, y} exists.
     """
     cdef embedding_t emb
     cdef dict raw = {(s0, s1): emb for (s0, s1), emb in embs if emb.size()}
@@ -522,11 +881,430 @@ cdef dict _make_biclique_cache(vector[pair[pair[size_t, size_t],
         if not _keep_biclique_key(realkey, key, chainlength):
             by_size[s0][s1] = key
 
-    max_side = {None: max(by_size)}
+    max_side = {None: max(by_size, default=0)}
+    for key, val in by_size.items():
+        max_side[key] = max(val)
+    return {'raw': raw, 'size': by_size, 'max_side': max_side}
+
+class _byte_lru:
+    """
+    A thread-safe LRU mapping, bounded by the total size of its values.  The
+    size of each value is given when it is inserted; values larger than the
+    bound are not kept.
+    """
+    def __init__(self, maxbytes):
+        self.maxbytes = maxbytes
+        self.nbytes = 0
+        self.lock = threading.Lock()
+        self._items = OrderedDict()
+
+    def get(self, key):
+        with self.lock:
+            item = self._items.get(key)
+            if item is None:
+                return None
+            self._items.move_to_end(key)
+            return item[0]
+
+    def put(self, key, value, size_t nbytes):
+        with self.lock:
+            old = self._items.pop(key, None)
+            if old is not None:
+                self.nbytes -= old[1]
+            if nbytes > self.maxbytes:
+                return
+            self._items[key] = value, nbytes
+            self.nbytes += nbytes
+            while self.nbytes > self.maxbytes:
+                _, (_, size) = self._items.popitem(last=False)
+                self.nbytes -= size
+
+    def clear(self):
+        with self.lock:
+            self._items.clear()
+            self.nbytes = 0
+
+    def resize(self, maxbytes):
+        with self.lock:
+            self.maxbytes = maxbytes
+            while self.nbytes > self.maxbytes:
+                _, (_, size) = self._items.popitem(last=False)
+                self.nbytes -= size
+
+    def __len__(self):
+        return len(self._items)
+
+#values are pairs (cache, expiry); caches read from disk are copies (see
+#_read_cache_entry), so no cache file is held open by this
+_memory_cache = _byte_lru(_cache_policy.memory_bytes)
+
+def _cache_rootdir(policy, version=__cache_version):
+    """
+    The cache directory of `version` under `policy`; see
+    `busgraph_cache.cache_rootdir`.
+    """
+    if policy.rootdir is not None:
+        return os.path.join(policy.rootdir, str(version))
+    return homebase.user_data_dir('busclique', 'dwave', version)
+
+def _cache_file_written(cachefile, ttl):
+    """
+    Returns the time at which `cachefile` was written, or None if it does not
+    exist or is older than `ttl` seconds.  If `ttl` is None, the file is not
+    inspected and the current time is returned in its place.
+    """
+    if ttl is None:
+        return time.time()
+    try:
+        written = os.stat(cachefile).st_mtime
+    except FileNotFoundError:
+        return None
+    if written + ttl <= time.time():
+        return None
+    return written
+
+def _update_lru(dirname, basedir, shortcode, file_context, policy=None):
+    """
+    Move `shortcode`, and any shortcodes whose accesses were served without
+    locks since the last update, to the front of the `.lru` file in
+    `basedir`, and evict the least-recently used cache files until the
+    directory satisfies `policy`.  The caller must hold the locks of
+    `dirname` until it has closed `file_context`.
+    """
+    if policy is None:
+        policy = _cache_policy
+    with _memory_cache.lock:
+        pending = __lru_pending.pop((dirname, basedir), {})
+        __lru_flushed[dirname, basedir] = time.monotonic()
+    touched = list(pending)
+    if shortcode is not None:
+        touched.append(shortcode)
+    if not touched:
+        return
+    lrufile = os.path.join(basedir, ".lru")
+
+    #every writer holds our locks until its temporary files are renamed, so
+    #any others were left by a writer that died -- e.g. a background fill cut
+    #off at interpreter exit
+    for name in os.listdir(basedir):
+        stale = os.path.join(basedir, name)
+        if name.endswith('~') and stale[:-1] not in file_context.files:
+            try:
+                os.remove(stale)
+            except (FileNotFoundError, PermissionError):
+                pass
+
+    #now, update the LRU cache -- if this was being done in-memory,
+    #there are more efficient algorithms... but since we're doing 
+    #linear-time read&write, might as well do it the lazy way.
+    try:
+        with open(lrufile, 'rb') as lru:
+            LRU = load(lru)
+    except FileNotFoundError:
+        LRU = []
+    newLRU = []
+    recent = set()
+    for x in touched[::-1]:
+        if x not in recent:
+            recent.add(x)
+            newLRU.append((x, None))
+    newLRU.extend(x for x in LRU if x[0] not in recent)
+
+    #drop entries of files that are gone, refresh the sizes of touched files,
+    #and evict expired files
+    entries = []
+    total = 0
+    expiry = None if policy.ttl is None else time.time() - policy.ttl
+    for x, size in newLRU:
+        cachefile = os.path.join(basedir, x)
+        try:
+            if size is None or expiry is not None:
+                #a file written under these locks is not yet in place
+                stat = os.stat(file_context.files.get(cachefile, (cachefile,))[0])
+                size = stat.st_size
+                if expiry is not None and stat.st_mtime <= expiry:
+                    if _evict_cache_file(cachefile):
+                        continue
+        except FileNotFoundError:
+            continue
+        entries.append((x, size))
+        total += size
+
+    #this violates atomicity, but it's okay -- at worst, we'll need
+    #to recompute a deleted file that still has an entry in the LRU
+    stuck = []
+    while entries and ((policy.max_entries is not None and
+                        len(entries) > policy.max_entries) or
+                       (policy.max_bytes is not None and
+                        total > policy.max_bytes)):
+        oldkey, size = entries.pop()
+        total -= size
+        if not _evict_cache_file(os.path.join(basedir, oldkey)):
+            stuck.append((oldkey, size))
+    #files that could not be removed keep their entries, to be evicted later
+    entries.extend(reversed(stuck))
+    with file_context.open(lrufile, 'wb') as lru:
+        dump(entries, lru)
+
+def _evict_cache_file(cachefile):
+    """
+    Remove a cache file, and count the eviction.  Returns False if the file is
+    still there, because it is open elsewhere (on Windows).
+    """
+    for attempt in range(__replace_attempts):
+        try:
+            os.remove(cachefile)
+            break
+        except FileNotFoundError:
+            return True
+        except PermissionError:
+            time.sleep(__replace_delay)
+    else:
+        return False
+    with _memory_cache.lock:
+        __cache_counts['evictions'] += 1
+    return True
+
+def _note_access(dirname, basedir, shortcode, counter='hits'):
+    """
+    Count a cache hit and record it in `__lru_pending`, then write out the
+    pending hits if the last update of the `.lru` file is old enough and the
+    locks are free.
+    """
+    key = dirname, basedir
+    with _memory_cache.lock:
+        __cache_counts['hits'] += 1
+        if counter != 'hits':
+            __cache_counts[counter] += 1
+        pending = __lru_pending.setdefault(key, OrderedDict())
+        pending.pop(shortcode, None)
+        pending[shortcode] = None
+        flushed = __lru_flushed.setdefault(key, time.monotonic())
+        stale = time.monotonic() - flushed > __lru_flush_interval
+    if stale:
+        _flush_lru(dirname, basedir, blocking=False)
+
+def _flush_lru(dirname, basedir, blocking=True):
+    """
+    Write the pending hits of `basedir` to its `.lru` file.  If `blocking` is
+    False, give up instead of waiting for a lock.
+    """
+    if not os.path.isdir(basedir):
+        return
+    lock = __global_locks[dirname]
+    if not lock.acquire(blocking):
+        return
+    try:
+        plock = fasteners.InterProcessLock(os.path.join(basedir, ".lock"))
+        if not plock.acquire(blocking=blocking):
+            return
+        try:
+            file_context = copy_on_close_context()
+            _update_lru(dirname, basedir, None, file_context)
+            file_context.close()
+        finally:
+            plock.release()
+    finally:
+        lock.release()
+
+@atexit.register
+def _flush_lru_pending():
+    """
+    Write out the pending hits, so that the `.lru` files reflect them.  While
+    clique caches are being computed in the background, we don't wait for
+    their locks.
+    """
+    blocking = not __clique_fills
+    for dirname, basedir in list(__lru_pending):
+        _flush_lru(dirname, basedir, blocking)
+
+class _mapped_embeddings(Mapping):
+    """
+    A read-only mapping from record keys to embeddings, backed by the packed
+    records of a cache entry (see `_pack_cache`).  Only the record table is
+    read on construction; each embedding is decoded when it is looked up, as
+    a tuple of tuples.
+    """
+    def __init__(self, words):
+        num, width, length = (int(x) for x in words[:3])
+        start = 3 + length
+        keys = words[start:start + num*width].tolist()
+        if width == 2:
+            keys = list(zip(keys[::2], keys[1::2]))
+        start += num*width
+        self._words = words
+        self._offsets = words[start:start + num + 1].tolist()
+        self._position = {key: i for i, key in enumerate(keys)}
+
+    def __getitem__(self, key):
+        i = self._position[key]
+        record = self._words[self._offsets[i]:self._offsets[i+1]]
+        num = int(record[0])
+        bounds = record[1:num + 2].tolist()
+        nodes = record[num + 2:].tolist()
+        return tuple(tuple(nodes[bounds[j]:bounds[j+1]]) for j in range(num))
+
+    def __iter__(self):
+        return iter(self._position)
+
+    def __len__(self):
+        return len(self._position)
+
+    @property
+    def nbytes(self):
+        """The size of the packed cache entry backing this mapping."""
+        return self._words.nbytes
+
+def _pack_cache(dict cache, str kind):
+    """
+    Pack a clique or biclique cache into a flat array of little-endian uint32
+    words, and return its bytes.  The layout is
+
+        num, width, length, index[length], keys[num*width], offsets[num+1],
+        records
+
+    where each record is an embedding `emb`, stored as
+
+        len(emb), bounds[len(emb)+1], nodes
+
+    with `nodes[bounds[i]:bounds[i+1]]` being the chain `emb[i]`.  Offsets are
+    counted in words from the start of the array.  For cliques, the record
+    keys are chainlengths (width 1) and `index[i]` is `cache['size'][i]`.  For
+    lazy clique caches (kind 'clique_sizes'), the keys are chainlengths and the
+    index is a flat list of pairs (size, chainlength), with `cache['fail']`
+    recorded as the pair (fail, 0xffffffff).  For bicliques, the keys are pairs
+    (s0, s1) and the index is a flat list of quadruples (s0, s1, k0, k1) with
+    `cache['size'][s0][s1] == (k0, k1)`.
+    """
+    cdef list words, keys, embs, index = []
+    cdef list records = []
+    cdef list offsets = []
+    raw = cache['raw']
+    if kind == 'clique':
+        keys = list(range(len(raw)))
+        embs = list(raw)
+        width = 1
+        by_size = cache['size']
+        index = [by_size[i] for i in range(len(by_size))]
+    elif kind == 'clique_sizes':
+        keys = sorted(raw)
+        embs = [raw[key] for key in keys]
+        width = 1
+        for size, length in cache['size'].items():
+            index.extend((size, length))
+        if cache['fail'] is not None:
+            index.extend((cache['fail'], __no_chainlength))
+    else:
+        keys = list(raw)
+        embs = [raw[key] for key in keys]
+        keys = [k for key in keys for k in key]
+        width = 2
+        for s0, row in cache['size'].items():
+            for s1, key in row.items():
+                index.extend((s0, s1) + key)
+    words = [len(embs), width, len(index)] + index + keys
+    start = len(words) + len(embs) + 1
+    for emb in embs:
+        offsets.append(start + len(records))
+        records.append(len(emb))
+        records.append(0)
+        bound = 0
+        for chain in emb:
+            bound += len(chain)
+            records.append(bound)
+        for chain in emb:
+            records.extend(chain)
+    offsets.append(start + len(records))
+    return np.array(words + offsets + records, dtype='<u4').tobytes()
+
+def _unpack_cache(words, str kind):
+    """
+    Inverse of `_pack_cache`, where `words` is a uint32 array.  The returned
+    cache has the same structure as the output of `_make_clique_cache` or
+    `_make_biclique_cache` (or `_merge_clique_sizes`), but its 'raw' member is
+    a `_mapped_embeddings`.
+    """
+    raw = _mapped_embeddings(words)
+    index = words[3:3 + int(words[2])].tolist()
+    if kind == 'clique':
+        return {'raw': raw, 'size': dict(enumerate(index))}
+    if kind == 'clique_sizes':
+        by_size = {}
+        fail = None
+        for size, length in zip(index[::2], index[1::2]):
+            if length == __no_chainlength:
+                fail = size
+            else:
+                by_size[size] = length
+        return {'raw': raw, 'size': by_size, 'fail': fail}
+    by_size = {}
+    for i in range(0, len(index), 4):
+        s0, s1, k0, k1 = index[i:i+4]
+        by_size.setdefault(s0, {})[s1] = (k0, k1)
+    max_side = {None: max(by_size, default=0)}
     for key, val in by_size.items():
         max_side[key] = max(val)
     return {'raw': raw, 'size': by_size, 'max_side': max_side}
 
+def _map_cache_file(filename):
+    """
+    Memory-map a cache file for reading.  Returns None if the file does not
+    exist or is empty.
+    """
+    try:
+        with open(filename, 'rb') as f:
+            return mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+    except (FileNotFoundError, ValueError):
+        return None
+
+def _close_map(buf):
+    """Close a map returned by `_map_cache_file`."""
+    if buf is not None:
+        buf.close()
+
+def _cache_entries(buf):
+    """
+    Iterate over the entries of a cache file, yielding tuples of the form
+    (start, id_start, id_end, payload_start, end) of offsets into `buf`.  Each
+    entry consists of a header of two little-endian uint64s (the lengths of the
+    identifier and the payload), the identifier, and the payload, with the
+    identifier and payload each padded to a multiple of 8 bytes.
+    """
+    cdef size_t start = 0, id_start, payload_start
+    if buf is None:
+        return
+    while start + 16 <= len(buf):
+        idlen, paylen = (int(x) for x in np.frombuffer(buf, '<u8', 2, start))
+        id_start = start + 16
+        payload_start = id_start + ((idlen + 7) & ~7)
+        yield start, id_start, id_start + idlen, payload_start, payload_start + paylen
+        start = payload_start + ((paylen + 7) & ~7)
+
+def _read_cache_entry(buf, identifier, str kind):
+    """
+    Find the cache entry of `identifier` in a memory-mapped cache file, and
+    unpack it.  Returns None if there is no such entry.  The payload is copied
+    out of `buf`, so the map can be closed afterwards.
+    """
+    for start, id_start, id_end, payload_start, end in _cache_entries(buf):
+        if id_end - id_start == len(identifier) and buf[id_start:id_end] == identifier:
+            words = np.frombuffer(buf, '<u4', (end - payload_start)//4, payload_start).copy()
+            return _unpack_cache(words, kind)
+
+def _write_cache_file(f, buf, identifier, payload):
+    """
+    Write a cache file to `f` containing a new entry for `identifier`,
+    preceded by the entries of the old file `buf` for other identifiers.
+    """
+    for start, id_start, id_end, payload_start, end in _cache_entries(buf):
+        if buf[id_start:id_end] != identifier:
+            f.write(buf[start:payload_start + ((end - payload_start + 7) & ~7)])
+    f.write(np.array([len(identifier), len(payload)], dtype='<u8').tobytes())
+    f.write(identifier)
+    f.write(bytes(-len(identifier) & 7))
+    f.write(payload)
+    f.write(bytes(-len(payload) & 7))
+
 def _trivial_relabeler(emb):
     """This doesn't relabel anything"""
     return {v: tuple(chain) for v, chain in emb.items()}
@@ -580,6 +1358,7 @@ cdef class _zephyr_busgraph:
     cdef readonly object delabel
     cdef readonly object identifier
     cdef readonly object short_identifier
+    cdef object _lock
     def __cinit__(self, g, seed = 0, compute_identifier = False):
         """
         This is a class which manages a single zephyr graph, and dispatches 
@@ -615,6 +1394,7 @@ cdef class _zephyr_busgraph:
         else:
             raise ValueError("unrecognized graph labeling")
 
+        self._lock = threading.Lock()
         self.topo = new topo_cache[zephyr_spec](zep[0], self.nodes, edges)
         short_clique(zep[0], self.nodes, edges, self.emb_1)
 
@@ -631,7 +1411,8 @@ cdef class _zephyr_busgraph:
         Returns a biclique cache -- see _make_biclique_cache for more info.
         """
         cdef vector[pair[pair[size_t, size_t], embedding_t]] embs
-        best_bicliques[zephyr_spec](self.topo[0], embs)
+        with self._lock:
+            best_bicliques[zephyr_spec](self.topo[0], embs)
         return _make_biclique_cache(embs)
 
     def cliques(self):
@@ -639,9 +1420,31 @@ cdef class _zephyr_busgraph:
         Returns a clique cache -- see _make_clique_cache for more info.
         """
         cdef vector[embedding_t] embs
-        best_cliques[zephyr_spec](self.topo[0], embs, self.emb_1)
+        with self._lock:
+            with nogil:
+                best_cliques[zephyr_spec](self.topo[0], embs, self.emb_1)
         return _make_clique_cache(embs)
 
+    def clique(self, size):
+        """
+        Returns a clique embedding with at least `size` chains, as a list of
+        chains sorted by length, whose first `size` chains minimize the
+        maximum chainlength -- or an empty list if none is found.  Unlike
+        `cliques`, only this one size is searched for.
+        """
+        cdef embedding_t emb
+        cdef size_t num = size
+        cdef int found = 1
+        if num <= self.emb_1.size():
+            emb = self.emb_1
+        else:
+            with self._lock:
+                with nogil:
+                    found = find_clique(self.topo[0], num, emb)
+        if not found:
+            return []
+        return sorted(map(tuple, emb), key=len)
+
     def independent_set(self, size):
         """
         This is extremely silly, but what else should we do when a user requests
@@ -687,6 +1490,7 @@ cdef class _pegasus_busgraph:
     cdef readonly object delabel
     cdef readonly object identifier
     cdef readonly object short_identifier
+    cdef object _lock
     def __cinit__(self, g, seed = 0, compute_identifier = False):
         """
         This is a class which manages a single pegasus graph, and dispatches 
@@ -724,6 +1528,7 @@ cdef class _pegasus_busgraph:
         else:
             raise ValueError("unrecognized graph labeling")
 
+        self._lock = threading.Lock()
         self.topo = new topo_cache[pegasus_spec](peg[0], self.nodes, edges)
         short_clique(peg[0], self.nodes, edges, self.emb_1)
 
@@ -740,7 +1545,8 @@ cdef class _pegasus_busgraph:
         Returns a biclique cache -- see _make_biclique_cache for more info.
         """
         cdef vector[pair[pair[size_t, size_t], embedding_t]] embs
-        best_bicliques[pegasus_spec](self.topo[0], embs)
+        with self._lock:
+            best_bicliques[pegasus_spec](self.topo[0], embs)
         return _make_biclique_cache(embs)
 
     def cliques(self):
@@ -748,9 +1554,31 @@ cdef class _pegasus_busgraph:
         Returns a clique cache -- see _make_clique_cache for more info.
         """
         cdef vector[embedding_t] embs
-        best_cliques[pegasus_spec](self.topo[0], embs, self.emb_1)
+        with self._lock:
+            with nogil:
+                best_cliques[pegasus_spec](self.topo[0], embs, self.emb_1)
         return _make_clique_cache(embs)
 
+    def clique(self, size):
+        """
+        Returns a clique embedding with at least `size` chains, as a list of
+        chains sorted by length, whose first `size` chains minimize the
+        maximum chainlength -- or an empty list if none is found.  Unlike
+        `cliques`, only this one size is searched for.
+        """
+        cdef embedding_t emb
+        cdef size_t num = size
+        cdef int found = 1
+        if num <= self.emb_1.size():
+            emb = self.emb_1
+        else:
+            with self._lock:
+                with nogil:
+                    found = find_clique(self.topo[0], num, emb)
+        if not found:
+            return []
+        return sorted(map(tuple, emb), key=len)
+
     def independent_set(self, size):
         """
         This is extremely silly, but what else should we do when a user requests
@@ -806,6 +1634,7 @@ cdef class _chimera_busgraph:
     cdef readonly object delabel
     cdef readonly object identifier
     cdef readonly object short_identifier
+    cdef object _lock
     def __cinit__(self, g, seed = 0, compute_identifier = False):
         rows = g.graph['rows']
         cols = g.graph['columns']
@@ -836,6 +1665,7 @@ cdef class _chimera_busgraph:
         else:
             raise ValueError("unrecognized graph labeling")
 
+        self._lock = threading.Lock()
         self.topo = new topo_cache[chimera_spec](chim[0], self.nodes, edges)
         short_clique(chim[0], self.nodes, edges, self.emb_1)
 
@@ -853,7 +1683,8 @@ cdef class _chimera_busgraph:
         Returns a biclique cache -- see _make_biclique_cache for more info.
         """
         cdef vector[pair[pair[size_t, size_t], embedding_t]] embs
-        best_bicliques(self.topo[0], embs)
+        with self._lock:
+            best_bicliques(self.topo[0], embs)
         return _make_biclique_cache(embs)
 
     def cliques(self):
@@ -861,9 +1692,31 @@ cdef class _chimera_busgraph:
         Returns a clique cache -- see _make_clique_cache for more info.
         """
         cdef vector[embedding_t] embs
-        best_cliques(self.topo[0], embs, self.emb_1)
+        with self._lock:
+            with nogil:
+                best_cliques(self.topo[0], embs, self.emb_1)
         return _make_clique_cache(embs)
 
+    def clique(self, size):
+        """
+        Returns a clique embedding with at least `size` chains, as a list of
+        chains sorted by length, whose first `size` chains minimize the
+        maximum chainlength -- or an empty list if none is found.  Unlike
+        `cliques`, only this one size is searched for.
+        """
+        cdef embedding_t emb
+        cdef size_t num = size
+        cdef int found = 1
+        if num <= self.emb_1.size():
+            emb = self.emb_1
+        else:
+            with self._lock:
+                with nogil:
+                    found = find_clique(self.topo[0], num, emb)
+        if not found:
+            return []
+        return sorted(map(tuple, emb), key=len)
+
     def independent_set(self, size):
         """
         This is extremely silly, but what else should we do when a user requests
@@ -918,5 +1771,14 @@ class copy_on_close_context:
     def close(self):
         for file_name, (temp_name, file_obj) in self.files.items():
             file_obj.close()
-            os.replace(temp_name, file_name)
+            for attempt in range(__replace_attempts):
+                try:
+                    os.replace(temp_name, file_name)
+                    break
+                except PermissionError:
+                    time.sleep(__replace_delay)
+            else:
+                #the old file stays in place; at worst, its contents are
+                #recomputed later
+                os.remove(temp_name)
 
@@ -74,8 +74,8 @@ cdef extern from "../include/busclique/topo_cache.hpp" namespace "busclique":
         edges_t fragment_edges() const
 
 cdef extern from "../include/busclique/find_clique.hpp" namespace "busclique":
-    int find_clique[T](topo_cache[T] &, size_t, embedding_t &)
-    void best_cliques[T](topo_cache[T], vector[embedding_t] &, embedding_t &)
+    int find_clique[T](topo_cache[T] &, size_t, embedding_t &) nogil
+    void best_cliques[T](topo_cache[T], vector[embedding_t] &, embedding_t &) nogil
     int short_clique[T](T, nodes_t, edges_t, embedding_t &)
 
 cdef extern from "../include/busclique/find_biclique.hpp" namespace "busclique":
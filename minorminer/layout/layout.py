@@ -21,6 +21,8 @@ from scipy import optimize, spatial
 from math import ceil
 import rpack
 
+from minorminer._minorminer import Target
+
 def p_norm(G, p=2, starting_layout=None, G_distances=None, dim=None, center=None, scale=None, **kwargs):
     """Embeds graph ``G`` in :math:`R^d` with the p-norm and minimizes a 
     Kamada-Kawai-esque objective function to achieve an embedding with low 
@@ -144,7 +146,8 @@ def _graph_distance_matrix(G,
             The graph to find the distance matrix of.
         
         all_pairs_shortest_path_length (dict, optional, default=None):
-            If None, it is computed by calling :func:`nx.all_pairs_shortest_path_length`.
+            If None, the distances are computed by breadth-first search in C++
+            (see :meth:`minorminer.Target.distance_matrix`).
     
         disconnected_distance (float, optional, default=None):
             A default distance to use when nodes belong to different connected
@@ -155,12 +158,14 @@ def _graph_distance_matrix(G,
             An array indexed by sorted vertices of G whose i,j value is d_G(i,j).
     
     """
-    if all_pairs_shortest_path_length is None:
-        all_pairs_shortest_path_length = nx.all_pairs_shortest_path_length(G)
-
     if disconnected_distance is None:
         disconnected_distance = len(G)
 
+    if all_pairs_shortest_path_length is None:
+        if len(G) == 0:
+            return np.zeros((0, 0), dtype=int)
+        return Target(G).distance_matrix(sorted(G), disconnected_distance)
+
     return np.array(
         [
             [V.get(v, disconnected_distance) for v in sorted(G)]
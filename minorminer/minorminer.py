@@ -13,8 +13,10 @@
 #    limitations under the License.
 
 from __future__ import absolute_import as __absolute_import
-from minorminer._minorminer import miner, VARORDER, find_embedding as __find_embedding
+from minorminer._minorminer import miner, VARORDER, Target, EmbeddingProgress, EmbeddingArrays, EmbeddingScores, find_embedding as __find_embedding
 from functools import wraps as __wraps
+from concurrent.futures import ThreadPoolExecutor as __ThreadPoolExecutor
+import networkx as __nx
 
 # This wrapper exists to overcome a curious limitation of Cython, and make
 # find_embedding friendlier for the inspect module.
@@ -27,9 +29,16 @@ def find_embedding(S, T,
                    tries=10,
                    inner_rounds=None,
                    chainlength_patience=10,
+                   chainlength_timeout=None,
+                   chainlength_target=None,
+                   total_chainlength_target=None,
+                   search_window=None,
                    max_fill=None,
                    threads=1,
+                   portfolio=1,
+                   progress=None,
                    return_overlap=False,
+                   return_arrays=False,
                    skip_initialization=False,
                    verbose=0,
                    interactive=False,
@@ -46,9 +55,16 @@ def find_embedding(S, T,
                             tries=tries,
                             inner_rounds=inner_rounds,
                             chainlength_patience=chainlength_patience,
+                            chainlength_timeout=chainlength_timeout,
+                            chainlength_target=chainlength_target,
+                            total_chainlength_target=total_chainlength_target,
+                            search_window=search_window,
                             max_fill=max_fill,
                             threads=threads,
+                            portfolio=portfolio,
+                            progress=progress,
                             return_overlap=return_overlap,
+                            return_arrays=return_arrays,
                             skip_initialization=skip_initialization,
                             verbose=verbose,
                             interactive=interactive,
@@ -57,3 +73,133 @@ def find_embedding(S, T,
                             restrict_chains=restrict_chains,
                             suspend_chains=suspend_chains,
                             )
+
+
+def find_embeddings_batch(sources, T, max_workers=1, **params):
+    """Heuristically attempt to find a minor-embedding of each of several
+    source graphs into a single target graph.
+
+    The target graph is parsed only once (see :class:`Target`), which makes this
+    much faster than repeated calls to :func:`find_embedding` when the sources
+    are small compared to the target.
+
+    Args:
+        sources (iterable):
+            The source graphs, each in any form accepted by
+            :func:`find_embedding`.
+
+        T (iterable/NetworkX Graph/:class:`Target`):
+            The target graph, in any form accepted by :func:`find_embedding`.
+
+        max_workers (int, optional, default=1):
+            Number of sources to embed concurrently.  The heuristic releases
+            the GIL, so up to ``max_workers`` embeddings run in parallel
+            threads.
+
+        **params (optional):
+            Parameters passed to :func:`find_embedding` for every source.
+
+    Returns:
+        A list holding, for each source in order, the value that
+        :func:`find_embedding` returns for it.
+    """
+    if not isinstance(T, Target):
+        T = Target(T)
+
+    def embed(S):
+        return __find_embedding(S, T, **params)
+
+    if max_workers is None or max_workers > 1:
+        with __ThreadPoolExecutor(max_workers) as executor:
+            return list(executor.map(embed, sources))
+    else:
+        return [embed(S) for S in sources]
+
+
+def repair_embedding(S, T, embedding, fix_intact=True, **params):
+    """Repair a minor-embedding after nodes or edges have been removed from
+    the target graph.
+
+    Only the chains that were damaged by the change are torn out: chains that
+    contain a node no longer in ``T``, chains that are no longer connected in
+    ``T``, and, for each source edge that is no longer represented by a target
+    edge, one of its two chains.  The remaining chains are passed to
+    :func:`find_embedding` as ``fixed_chains`` or ``initial_chains``, so the
+    heuristic only has to route the few damaged chains.  This is typically much
+    faster than embedding ``S`` from scratch.
+
+    Args:
+        S (iterable/NetworkX Graph):
+            The source graph, as an iterable of edges or a NetworkX graph.
+
+        T (iterable/NetworkX Graph):
+            The new target graph, as an iterable of edges or a NetworkX graph.
+
+        embedding (dict):
+            An embedding of ``S`` into the previous target graph, of the form
+            {s: [t, ...], ...}.
+
+        fix_intact (bool, optional, default=True):
+            If True, the undamaged chains are held fixed while the damaged
+            chains are rerouted; should that fail, a second attempt is made
+            with the undamaged chains as initial chains, which the heuristic
+            may modify.  If False, only the second attempt is made.
+
+        **params (optional):
+            Parameters passed to :func:`find_embedding`, other than
+            ``initial_chains``, ``fixed_chains``, ``return_overlap`` and
+            ``return_arrays``.
+
+    Returns:
+        dict: An embedding of ``S`` into ``T`` of the form {s: [t, ...], ...},
+        or an empty dictionary if the repair failed.  If no chain was damaged,
+        the intact chains are returned without calling :func:`find_embedding`.
+
+    Raises:
+        ValueError: If ``params`` contains ``initial_chains``,
+            ``fixed_chains``, ``return_overlap`` or ``return_arrays``.
+    """
+    for name in ('initial_chains', 'fixed_chains', 'return_overlap', 'return_arrays'):
+        if name in params:
+            raise ValueError("%s is not a valid parameter for repair_embedding" % name)
+
+    if not hasattr(S, 'edges'):
+        S = __nx.Graph(S)
+    if not hasattr(T, 'edges'):
+        T = __nx.Graph(T)
+
+    intact = {}
+    owner = {}
+    for v in S:
+        chain = embedding.get(v, ())
+        if not chain or any(q not in T or q in owner for q in chain):
+            continue
+        if __nx.is_connected(T.subgraph(chain)):
+            intact[v] = list(chain)
+            owner.update((q, v) for q in chain)
+
+    # source edges whose chains are both intact, but no longer adjacent
+    missing = []
+    for u, v in S.edges():
+        if u != v and u in intact and v in intact:
+            if not any(owner.get(p) == v for q in intact[u] for p in T[q]):
+                missing.append((u, v))
+
+    # tear out one chain per missing edge, preferring chains with many missing
+    # edges and, among those, the longer chain
+    count = {}
+    for u, v in missing:
+        count[u] = count.get(u, 0) + 1
+        count[v] = count.get(v, 0) + 1
+    for u, v in missing:
+        if u in intact and v in intact:
+            del intact[max(u, v, key=lambda x: (count[x], len(intact[x])))]
+
+    if len(intact) == len(S):
+        return intact
+
+    if fix_intact:
+        emb = __find_embedding(S, T, fixed_chains=intact, **params)
+        if emb:
+            return emb
+    return __find_embedding(S, T, initial_chains=intact, **params)
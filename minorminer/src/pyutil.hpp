@@ -17,16 +17,37 @@
 
 namespace {
 
+//! The heuristic runs with the GIL released so that independent embeddings
+//! can proceed concurrently in Python threads.  Every call back into the
+//! Python C-API from the library must hold the GIL for its duration; this
+//! RAII guard acquires it (re-entrantly) and releases it on scope exit.
+class gil_guard {
+    PyGILState_STATE state;
+
+  public:
+    gil_guard() : state(PyGILState_Ensure()) {}
+    ~gil_guard() { PyGILState_Release(state); }
+    gil_guard(const gil_guard &) = delete;
+    gil_guard &operator=(const gil_guard &) = delete;
+};
+
 class LocalInteractionPython : public find_embedding::LocalInteraction {
   public:
     virtual ~LocalInteractionPython() {}
 
   private:
-    virtual void displayOutputImpl(int, const std::string &msg) const { PySys_WriteStdout("%s", msg.c_str()); }
+    virtual void displayOutputImpl(int, const std::string &msg) const {
+        gil_guard gil;
+        PySys_WriteStdout("%s", msg.c_str());
+    }
 
-    virtual void displayErrorImpl(int, const std::string &msg) const { PySys_WriteStderr("%s", msg.c_str()); }
+    virtual void displayErrorImpl(int, const std::string &msg) const {
+        gil_guard gil;
+        PySys_WriteStderr("%s", msg.c_str());
+    }
 
     virtual bool cancelledImpl() const {
+        gil_guard gil;
         bool cancelled = static_cast<bool>(PyErr_CheckSignals());
         if (cancelled) PyErr_Clear();
         return cancelled;
@@ -40,24 +61,68 @@ class LocalInteractionLogger : public find_embedding::LocalInteraction {
 
   public:
     LocalInteractionLogger(cython_callback cb, void *fn) : pycallback(cb), log_fn(fn) { Py_INCREF(log_fn); }
-    virtual ~LocalInteractionLogger() { Py_DECREF(log_fn); }
+    virtual ~LocalInteractionLogger() {
+        gil_guard gil;
+        Py_DECREF(log_fn);
+    }
 
   private:
     virtual void displayOutputImpl(int loglevel, const std::string &msg) const {
+        gil_guard gil;
         pycallback(log_fn, loglevel, msg.c_str());
     }
 
     virtual void displayErrorImpl(int loglevel, const std::string &msg) const {
+        gil_guard gil;
         pycallback(log_fn, loglevel, msg.c_str());
     }
 
     virtual bool cancelledImpl() const {
+        gil_guard gil;
         bool cancelled = static_cast<bool>(PyErr_CheckSignals());
         if (cancelled) PyErr_Clear();
         return cancelled;
     }
 };
 
+typedef int (*cython_progress)(void *reporter, const find_embedding::embedding_view &emb);
+//! Forwards everything to another LocalInteraction, and hands improved embeddings to a
+//! Python progress reporter
+class LocalInteractionProgress : public find_embedding::LocalInteraction {
+    find_embedding::LocalInteractionPtr base;
+    cython_progress pycallback;
+    void *reporter;
+
+  public:
+    LocalInteractionProgress(find_embedding::LocalInteractionPtr b, cython_progress cb, void *r)
+            : base(b), pycallback(cb), reporter(r) {
+        Py_INCREF(reporter);
+    }
+    virtual ~LocalInteractionProgress() {
+        gil_guard gil;
+        Py_DECREF(reporter);
+    }
+
+  private:
+    virtual void displayOutputImpl(int loglevel, const std::string &msg) const { base->displayOutput(loglevel, msg); }
+
+    virtual void displayErrorImpl(int loglevel, const std::string &msg) const { base->displayError(loglevel, msg); }
+
+    virtual bool cancelledImpl() const {
+        try {
+            base->cancelled(find_embedding::clock::time_point::max());
+        } catch (const find_embedding::ProblemCancelledException &) {
+            return true;
+        }
+        return false;
+    }
+
+    virtual bool improvedImpl(const find_embedding::embedding_view &emb) const {
+        gil_guard gil;
+        return pycallback(reporter, emb) != 0;
+    }
+};
+
 void handle_exceptions() {
     try {
         throw;
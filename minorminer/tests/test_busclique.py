@@ -1,6 +1,8 @@
 from minorminer import busclique
 from minorminer.utils import verify_embedding, chimera, pegasus
 import unittest, random, itertools, dwave_networkx as dnx, networkx as nx, os
+import sys, subprocess, threading, tempfile, time
+from unittest import mock
 
 def subgraph_node_yield(g, q):
     """
@@ -328,6 +330,289 @@ class TestBusclique(unittest.TestCase):
                 self.assertEqual(Kfamily, [bgc.find_clique_embedding(i) for i in range(nK+1)])
                 self.assertEqual(Bfamily, [bgc.find_biclique_embedding(i,i) for i in range(nB+1)])
 
+    def test_cache_roundtrip(self):
+        for g in (self.c4_nd[0], self.z4_nd[0], self.p4_nd[0]):
+            with self.subTest(msg=f"cache roundtrip test: {g.graph['family']}"):
+                busclique.busgraph_cache.clear_all_caches()
+                bgc = busclique.busgraph_cache(g)
+                Kfamily = [bgc.find_clique_embedding(i) for i in range(len(bgc.largest_clique())+1)]
+                Bfamily = [bgc.find_biclique_embedding(i, j) for i in range(6) for j in range(6)]
+                cliques = bgc._cliques
+                bicliques = bgc._bicliques
+
+                # a fresh instance reads the file written by the first
+                busclique._memory_cache.clear()
+                bgc = busclique.busgraph_cache(g)
+                self.assertEqual(Kfamily, [bgc.find_clique_embedding(i) for i in range(len(Kfamily))])
+                self.assertEqual(Bfamily, [bgc.find_biclique_embedding(i, j) for i in range(6) for j in range(6)])
+                self.assertEqual(bgc._cliques['size'], cliques['size'])
+                self.assertEqual(bgc._bicliques['size'], bicliques['size'])
+                self.assertEqual(bgc._bicliques['max_side'], bicliques['max_side'])
+                for key, emb in bicliques['raw'].items():
+                    self.assertEqual(bgc._bicliques['raw'][key], tuple(map(tuple, emb)))
+
+                # colliding identifiers share a file; entries are kept apart
+                packed = busclique._pack_cache(cliques, 'clique')
+                cachefile = os.path.join(busclique.busgraph_cache.cache_rootdir(), 'collision')
+                with open(cachefile, 'wb') as f:
+                    busclique._write_cache_file(f, None, b'graph0', packed)
+                buf = busclique._map_cache_file(cachefile)
+                with open(cachefile + '~', 'wb') as f:
+                    busclique._write_cache_file(f, buf, b'graph1', packed[:16])
+                busclique._close_map(buf)
+                os.replace(cachefile + '~', cachefile)
+                buf = busclique._map_cache_file(cachefile)
+                cache0 = busclique._read_cache_entry(buf, b'graph0', 'clique')
+                self.assertIsNotNone(busclique._read_cache_entry(buf, b'graph1', 'clique'))
+                self.assertIsNone(busclique._read_cache_entry(buf, b'graph2', 'clique'))
+
+                # entries are copied out of the map, which can then be closed
+                busclique._close_map(buf)
+                self.assertEqual(list(cache0['raw'].values()), [tuple(map(tuple, e)) for e in cliques['raw']])
+
+        # a graph without edges has an empty biclique cache
+        g = dnx.chimera_graph(2, edge_list=[])
+        busclique.busgraph_cache.clear_all_caches()
+        bgc = busclique.busgraph_cache(g)
+        self.assertEqual(bgc.find_biclique_embedding(1, 1), {})
+        self.assertEqual(bgc.largest_balanced_biclique(), {})
+        busclique._memory_cache.clear()
+        bgc = busclique.busgraph_cache(g)
+        self.assertEqual(bgc.find_biclique_embedding(1, 1), {})
+        self.assertEqual(bgc._bicliques['max_side'], {None: 0})
+
+    def test_memory_cache(self):
+        busclique.busgraph_cache.clear_all_caches()
+        g = self.p4_nd[0]
+        emb = busclique.find_clique_embedding(6, g)
+        basedir = os.path.join(busclique.busgraph_cache.cache_rootdir(), 'clique')
+        lrufile = os.path.join(basedir, '.lru')
+        cachefiles = [f for f in os.listdir(basedir) if not f.startswith('.')]
+        lru_mtime = os.stat(lrufile).st_mtime_ns
+
+        # hits are served from memory, without touching the filesystem
+        for f in cachefiles:
+            os.remove(os.path.join(basedir, f))
+        self.assertEqual(emb, busclique.find_clique_embedding(6, g))
+        self.assertFalse(set(cachefiles) & set(os.listdir(basedir)))
+        self.assertEqual(lru_mtime, os.stat(lrufile).st_mtime_ns)
+
+        # caches read from disk are kept in memory as copies, not views of a map
+        busclique.busgraph_cache.clear_all_caches()
+        busclique.find_clique_embedding(6, g)
+        busclique._memory_cache.clear()
+        self.assertEqual(emb, busclique.find_clique_embedding(6, g))
+        self.assertEqual(len(busclique._memory_cache), 1)
+        for (cache, expiry), nbytes in busclique._memory_cache._items.values():
+            self.assertIsNone(cache['raw']._words.base)
+            self.assertEqual(cache['raw'].nbytes, nbytes)
+
+        # the deferred access is written to the .lru file on flush
+        os.remove(lrufile)
+        busclique._flush_lru_pending()
+        self.assertTrue(os.path.exists(lrufile))
+
+        lru = busclique._byte_lru(10)
+        lru.put('a', 'A', 4)
+        lru.put('b', 'B', 4)
+        lru.get('a')
+        lru.put('c', 'C', 4)
+        lru.put('d', 'D', 11)
+        self.assertEqual((lru.get('a'), lru.get('b'), lru.get('c'), lru.get('d')),
+                         ('A', None, 'C', None))
+        self.assertEqual(lru.nbytes, 8)
+
+    def test_lockfree_read(self):
+        busclique.busgraph_cache.clear_all_caches()
+        g = self.z4_nd[0]
+        emb = busclique.find_clique_embedding(6, g)
+        busclique._memory_cache.clear()
+        basedir = os.path.join(busclique.busgraph_cache.cache_rootdir(), 'clique')
+
+        # another process holds the cache lock while we read a cached clique
+        holder = subprocess.Popen(
+            [sys.executable, '-c',
+             'import fasteners, sys, time\n'
+             'fasteners.InterProcessLock(sys.argv[1]).acquire()\n'
+             'print("locked", flush=True)\n'
+             'time.sleep(60)\n',
+             os.path.join(basedir, '.lock')],
+            stdout=subprocess.PIPE, universal_newlines=True)
+        try:
+            self.assertEqual(holder.stdout.readline().strip(), 'locked')
+            result = []
+            reader = threading.Thread(
+                target=lambda: result.append(busclique.find_clique_embedding(6, g)),
+                daemon=True)
+            reader.start()
+            reader.join(timeout=30)
+            self.assertEqual(result, [emb])
+        finally:
+            holder.kill()
+            holder.wait()
+
+    def test_concurrent_writers(self):
+        busclique.busgraph_cache.clear_all_caches()
+        basedir = os.path.join(busclique.busgraph_cache.cache_rootdir(), 'clique')
+        gs = [dnx.chimera_graph(m) for m in (2, 3)]
+
+        # slow down the renames, so that each writer finds the other's
+        # temporary files if it can get at them
+        close = busclique.copy_on_close_context.close
+        def slow_close(file_context):
+            time.sleep(.5)
+            close(file_context)
+        errors = []
+        def write(g):
+            try:
+                busclique.find_clique_embedding(4, g)
+            except Exception as e:
+                errors.append(e)
+        with mock.patch.object(busclique.copy_on_close_context, 'close', slow_close):
+            writers = [threading.Thread(target=write, args=(g,)) for g in gs]
+            for w in writers:
+                w.start()
+            for w in writers:
+                w.join()
+        self.assertEqual(errors, [])
+        self.assertEqual(len([f for f in os.listdir(basedir) if not f.startswith('.')]), 2)
+
+    def test_cache_policy(self):
+        busgraph_cache = busclique.busgraph_cache
+        gs = [dnx.chimera_graph(m) for m in (2, 3, 4)]
+        with tempfile.TemporaryDirectory() as rootdir:
+            try:
+                # the memory tier doesn't outlive the directories it mirrors
+                busclique.find_clique_embedding(4, gs[0])
+                self.assertGreater(len(busclique._memory_cache), 0)
+                policy = busgraph_cache.set_cache_policy(rootdir=rootdir,
+                                                         per_family=True,
+                                                         max_entries=2)
+                self.assertEqual(len(busclique._memory_cache), 0)
+                self.assertEqual(policy, busgraph_cache.cache_policy())
+                self.assertTrue(busgraph_cache.cache_rootdir().startswith(rootdir))
+                busgraph_cache.cache_stats(reset=True)
+                basedir = os.path.join(busgraph_cache.cache_rootdir(), 'clique', 'chimera')
+                def cachefiles():
+                    return [f for f in os.listdir(basedir) if not f.startswith('.')]
+
+                # entries beyond max_entries are evicted, least-recently used first
+                embs = [busclique.find_clique_embedding(4, g) for g in gs]
+                self.assertEqual(len(cachefiles()), 2)
+                stats = busgraph_cache.cache_stats()
+                self.assertEqual((stats.misses, stats.evictions, stats.disk_entries),
+                                 (3, 1, 2))
+                self.assertEqual(embs, [busclique.find_clique_embedding(4, g) for g in gs])
+                stats = busgraph_cache.cache_stats(reset=True)
+                self.assertEqual((stats.hits, stats.memory_hits), (3, 3))
+
+                # on Windows, files that are open elsewhere can't be removed or
+                # replaced; evictions are put off to the next write, and writes
+                # are dropped
+                with mock.patch('os.remove', side_effect=PermissionError):
+                    busclique.find_clique_embedding(4, dnx.chimera_graph(5))
+                self.assertEqual(len(cachefiles()), 3)
+                self.assertEqual(busgraph_cache.cache_stats().evictions, 0)
+                with mock.patch('os.replace', side_effect=PermissionError):
+                    emb = busclique.find_clique_embedding(4, dnx.chimera_graph(6))
+                self.assertEqual(len(emb), 4)
+                self.assertEqual(len(cachefiles()), 1)
+                self.assertEqual(busgraph_cache.cache_stats(reset=True).evictions, 2)
+
+                # size-aware eviction keeps the directory under max_bytes
+                sizes = {f: os.path.getsize(os.path.join(basedir, f)) for f in cachefiles()}
+                busgraph_cache.set_cache_policy(max_entries=None,
+                                                max_bytes=max(sizes.values()))
+                busclique.find_clique_embedding(4, dnx.chimera_graph(1))
+                total = sum(os.path.getsize(os.path.join(basedir, f)) for f in cachefiles())
+                self.assertLessEqual(total, max(sizes.values()))
+
+                # expired files are recomputed
+                busgraph_cache.set_cache_policy(max_bytes=None, ttl=3600)
+                for f in cachefiles():
+                    os.utime(os.path.join(basedir, f), (0, 0))
+                busclique._memory_cache.clear()
+                busgraph_cache.cache_stats(reset=True)
+                self.assertEqual(embs[0], busclique.find_clique_embedding(4, gs[0]))
+                self.assertEqual(busgraph_cache.cache_stats().misses, 1)
+
+                self.assertRaises(ValueError, busgraph_cache.set_cache_policy, ttl=-1)
+            finally:
+                busgraph_cache.set_cache_policy(busclique.CachePolicy())
+                busclique._memory_cache.clear()
+
+    def test_lazy_cache(self):
+        busgraph_cache = busclique.busgraph_cache
+        # on damaged graphs, the single-size search may find a different
+        # chainlength than the full cache does, or nothing at all
+        graphs = [(dnx.chimera_graph(4), True)]
+        graphs += [(g, False) for g in (self.c4_nd[0], self.z4_nd[0], self.p4_nd[0])]
+        for g, exact in graphs:
+            with self.subTest(msg=f"lazy cache test: {g.graph['family']}"):
+                bgc = busgraph_cache(g)
+                K = bgc.largest_clique()
+                size = len(K)
+                Kfamily = [bgc.find_clique_embedding(i) for i in range(size + 1)]
+                busgraph_cache.clear_all_caches()
+                basedir = os.path.join(busgraph_cache.cache_rootdir(), 'clique')
+                def cachefiles():
+                    if not os.path.exists(basedir):
+                        return []
+                    return [f for f in os.listdir(basedir) if not f.startswith('.')]
+
+                # every size is found, falling back to the full cache where
+                # the single-size search fails; small sizes take the
+                # single-cell path of find_clique
+                bgc = busgraph_cache(g, lazy=True)
+                embs = [bgc.find_clique_embedding(i) for i in range(size + 1)]
+                for i, emb in enumerate(embs):
+                    verify_embedding(emb, nx.complete_graph(i), g)
+                if not exact:
+                    continue
+                for i, emb in enumerate(embs):
+                    self.assertEqual(max_chainlength(emb), max_chainlength(Kfamily[i]))
+                    emb = busclique.find_clique_embedding(i, g, use_cache=False)
+                    verify_embedding(emb, nx.complete_graph(i), g)
+
+                # only the requested sizes were computed
+                self.assertIsNone(bgc._cliques)
+                self.assertEqual(cachefiles(), [])
+
+                # a fresh instance reads the lazy cache from the filesystem
+                sizes = bgc._clique_sizes
+                busclique._memory_cache.clear()
+                busgraph_cache.cache_stats(reset=True)
+                bgc = busgraph_cache(g, lazy=True)
+                self.assertEqual(embs[size], bgc.find_clique_embedding(size))
+                stats = busgraph_cache.cache_stats()
+                self.assertEqual((stats.hits, stats.misses), (1, 0))
+                self.assertEqual(bgc._clique_sizes['size'], sizes['size'])
+
+                # a size that is not found is settled by the full cache
+                self.assertEqual(bgc.find_clique_embedding(len(g) + 1), {})
+                self.assertEqual(bgc._clique_sizes['fail'], len(g) + 1)
+                self.assertIsNotNone(bgc._cliques)
+                self.assertEqual(len(cachefiles()), 1)
+
+                # once the full cache exists, lazy instances use it
+                bgc = busgraph_cache(g, lazy=True)
+                self.assertEqual(K, bgc.find_clique_embedding(size))
+                self.assertIsNotNone(bgc._cliques)
+
+                # the full cache is computed in the background, and the
+                # temporary file of a writer that died is cleaned up
+                busgraph_cache.clear_all_caches()
+                os.makedirs(basedir)
+                with open(os.path.join(basedir, 'stale~'), 'wb') as f:
+                    f.write(b'partial')
+                emb = busclique.find_clique_embedding(4, g, lazy=True, background=True)
+                verify_embedding(emb, nx.complete_graph(4), g)
+                deadline = time.time() + 60
+                while (busgraph_cache(g)._fetch_cache('clique', None) is None
+                       and time.time() < deadline):
+                    time.sleep(.1)
+                self.assertEqual(len(cachefiles()), 1)
+
     def test_perfect_z6_clique(self):
         k88 = nx.complete_graph(88)
         bgc = busclique.busgraph_cache(self.z6)
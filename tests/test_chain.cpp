@@ -243,6 +243,43 @@ TEST(chain, copying) {
     ASSERT_EQ(c.parent(2), 0);
 }
 
+TEST(chain, copying_overlap) {
+    std::vector<int> weight(10, 0);
+    find_embedding::chain d(weight, 0);
+    find_embedding::chain c(weight, 1);
+    d = vector<int>{7, 2, 5};
+    c = vector<int>{5, 1, 9, 2};
+    c = d;
+    ASSERT_EQ(weight, (vector<int>{0, 0, 2, 0, 0, 2, 0, 2, 0, 0}));
+    ASSERT_EQ(c.size(), 3);
+    vector<int> qubits;
+    for (auto &q : c) qubits.push_back(q);
+    ASSERT_EQ(qubits, (vector<int>{2, 5, 7}));
+    c = c;
+    ASSERT_EQ(c.size(), 3);
+    ASSERT_EQ(weight, (vector<int>{0, 0, 2, 0, 0, 2, 0, 2, 0, 0}));
+    ASSERT_EQ(c.run_diagnostic(), 0);
+}
+
+TEST(chain, save_restore) {
+    std::vector<int> weight(10, 0);
+    find_embedding::chain c(weight, 0);
+    find_embedding::frozen_chain keep;
+    c.set_root(3);
+    c.add_leaf(4, 3);
+    c.save(keep);
+    std::vector<int> saved_weight = weight;
+    c.trim_branch(4);
+    c.add_leaf(2, 3);
+    c.add_leaf(1, 2);
+    c.restore(keep);
+    ASSERT_EQ(weight, saved_weight);
+    ASSERT_EQ(c.size(), 2);
+    ASSERT_EQ(c.parent(4), 3);
+    ASSERT_EQ(c.get_link(0), 3);
+    ASSERT_EQ(c.run_diagnostic(), 0);
+}
+
 TEST(chain, clear) {
     std::vector<int> dweight(3, 0);
     std::vector<int> cweight(3, 0);
@@ -0,0 +1,79 @@
+// Copyright 2020 D-Wave Systems Inc.
+//
+//    Licensed under the Apache License, Version 2.0 (the "License");
+//    you may not use this file except in compliance with the License.
+//    You may obtain a copy of the License at
+//
+//        http://www.apache.org/licenses/LICENSE-2.0
+//
+//    Unless required by applicable law or agreed to in writing, software
+//    distributed under the License is distributed on an "AS IS" BASIS,
+//    WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+//    See the License for the specific language governing permissions and
+//    limitations under the License.
+
+#include "find_embedding/graph.hpp"
+#include "gtest/gtest.h"
+
+using graph::distance_oracle;
+
+//! a 3x3 grid, numbered row by row, plus an edge between two more nodes
+static graph::input_graph grid_and_edge() {
+    graph::input_graph graph;
+    for (int r = 0; r < 3; r++)
+        for (int c = 0; c < 3; c++) {
+            if (c < 2) graph.push_back(3 * r + c, 3 * r + c + 1);
+            if (r < 2) graph.push_back(3 * r + c, 3 * r + c + 3);
+        }
+    graph.push_back(9, 10);
+    return graph;
+}
+
+TEST(distance_oracle, empty) {
+    graph::input_graph graph;
+    distance_oracle oracle(graph, 4);
+    ASSERT_EQ(oracle.num_nodes(), 0);
+    ASSERT_EQ(oracle.get_landmarks().size(), 0);
+}
+
+TEST(distance_oracle, distances_from) {
+    distance_oracle oracle(grid_and_edge(), 1);
+    std::vector<distance_oracle::distance_t> d;
+    oracle.distances_from(0, d);
+    std::vector<distance_oracle::distance_t> expected{0, 1, 2, 1, 2, 3, 2, 3, 4, distance_oracle::unreachable,
+                                                      distance_oracle::unreachable};
+    ASSERT_EQ(d, expected);
+}
+
+TEST(distance_oracle, landmarks_cover_components) {
+    distance_oracle oracle(grid_and_edge(), 2);
+    auto &landmarks = oracle.get_landmarks();
+    ASSERT_EQ(landmarks.size(), 2);
+    ASSERT_EQ(landmarks[0], 0);
+    ASSERT_GE(landmarks[1], 9);
+    ASSERT_EQ(oracle.lower_bound(4, 10), distance_oracle::unreachable);
+}
+
+TEST(distance_oracle, bounds) {
+    auto graph = grid_and_edge();
+    distance_oracle oracle(graph, 8);
+    std::vector<distance_oracle::distance_t> d;
+    for (int u = 0; u < 11; u++) {
+        oracle.distances_from(u, d);
+        for (int v = 0; v < 11; v++) {
+            if (d[v] == distance_oracle::unreachable) continue;
+            ASSERT_LE(oracle.lower_bound(u, v), d[v]);
+            ASSERT_GE(oracle.upper_bound(u, v), d[v]);
+        }
+    }
+    // the farthest corner of the grid is chosen as the second landmark, which pins this down
+    ASSERT_EQ(oracle.lower_bound(0, 8), 4);
+    ASSERT_EQ(oracle.upper_bound(0, 8), 4);
+}
+
+TEST(distance_oracle, stops_when_every_node_is_a_landmark) {
+    graph::input_graph graph;
+    graph.push_back(0, 1);
+    distance_oracle oracle(graph, 8);
+    ASSERT_EQ(oracle.get_landmarks().size(), 2);
+}
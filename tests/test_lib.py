@@ -657,6 +657,349 @@ class TestFindEmbedding(unittest.TestCase):
 
         return find_embedding(cliq, chim, chainlength_patience=0, threads=2)
 
+    @staticmethod
+    @success_perfect(10, 6, 16)
+    def test_clique_portfolio(n, k):
+        chim = Chimera(n)
+        cliq = Clique(k)
+
+        return find_embedding(cliq, chim, chainlength_patience=0, portfolio=3)
+
+    @staticmethod
+    @success_perfect(4, 8, 20)
+    def test_portfolio_miner(n, k):
+        import logging, pickle
+        from minorminer import miner
+        chim = Chimera(n)
+        cliq = Clique(k)
+        messages = []
+        handler = logging.Handler()
+        handler.emit = lambda record: messages.append(record.getMessage())
+        logger = logging.getLogger('minorminer._minorminer')
+        logger.addHandler(handler)
+        level = logger.level
+        logger.setLevel(logging.INFO)
+        try:
+            mm = miner(cliq, chim, portfolio=4, verbose=1)
+            mm.quickpass()
+            emb = mm.find_embedding()
+        finally:
+            logger.removeHandler(handler)
+            logger.setLevel(level)
+        # searches stopped because another one won are not reported as timed out
+        if any('timed out' in m for m in messages):
+            return False
+        # every search of the portfolio carries on from the embedding found
+        emb = {v: sorted(chain) for v, chain in emb.items()}
+        for m in (mm, pickle.loads(pickle.dumps(mm))):
+            kept = m.quickpass(varorder=[], clear_first=False)
+            if {v: sorted(chain) for v, chain in kept.items()} != emb:
+                return False
+        return True
+
+    @staticmethod
+    @success_perfect(10, 4, 5)
+    def test_clique_target(n, k):
+        from minorminer import Target
+        chim = Chimera(n)
+        cliq = Clique(k)
+        emb = find_embedding_orig(cliq, Target(chim), tries=1, chainlength_patience=0)
+        return check_embedding(cliq, chim, emb)
+
+    @staticmethod
+    @success_perfect(3, 4, 6)
+    def test_target_components(n, k):
+        # a Target's precomputed components must give the same results as parsing the graph
+        from minorminer import Target, miner
+        chim = Chimera(n)
+        chim.add_edge((n, 0, 0, 0), (n, 0, 0, 1))  # a second component
+        cliq = Clique(k)
+        T = Target(chim)
+        for params in ({}, {'fixed_chains': {0: [(0, 0, 0, 0)]}}):
+            emb = find_embedding_orig(cliq, chim, random_seed=7, **params)
+            if find_embedding_orig(cliq, T, random_seed=7, **params) != emb:
+                return False
+        emb = miner(cliq, chim, random_seed=7).find_embedding()
+        return miner(cliq, T, random_seed=7).find_embedding() == emb
+
+    @staticmethod
+    @success_perfect(3, 4, 6)
+    def test_pickle(n, k):
+        import pickle
+        from minorminer import Target, miner
+        chim = Chimera(n)
+        cliq = Clique(k)
+        T = pickle.loads(pickle.dumps(Target(chim)))
+        if set(T) != set(chim):
+            return False
+        for target in (chim, T):
+            mm = miner(cliq, target, random_seed=5, suspend_chains={0: [[(0, 0, 0, 0)]]})
+            emb = mm.quickpass()
+            data = pickle.dumps(mm)
+            a, b = pickle.loads(data), pickle.loads(data)
+            # restored copies resume from the same best chains and rng state
+            if a.quickpass(clear_first=False) != b.quickpass(clear_first=False):
+                return False
+            emb = a.find_embedding()
+            if emb != b.find_embedding() or not check_embedding(cliq, chim, emb):
+                return False
+            if (0, 0, 0, 0) not in emb[0]:
+                return False
+        # the progress callback is left out
+        reports = []
+        mm = miner(cliq, chim, random_seed=5, progress=lambda p: reports.append(p))
+        mm.find_embedding()
+        count = len(reports)
+        if not count or not check_embedding(cliq, chim, pickle.loads(pickle.dumps(mm)).find_embedding()):
+            return False
+        return len(reports) == count
+
+    @staticmethod
+    @success_perfect(3, 4, 6)
+    def test_parallel_miner(n, k):
+        from minorminer import miner
+        chim = Chimera(n)
+        cliq = Clique(k)
+        # the results depend on the seed, not on the number of workers
+        embs = miner(cliq, chim, random_seed=9).find_embeddings(6, workers=2)
+        if embs != miner(cliq, chim, random_seed=9).find_embeddings(6, workers=3):
+            return False
+        if len(embs) != 6 or not all(check_embedding(cliq, chim, emb) for emb in embs):
+            return False
+        mm = miner(cliq, chim)
+        streamed = dict(mm.find_embeddings(4, workers=2, as_completed=True))
+        if sorted(streamed) != list(range(4)):
+            return False
+        improved = mm.improve_embeddings(embs, workers=3)
+        if len(improved) != len(embs) or not all(check_embedding(cliq, chim, emb) for emb in improved):
+            return False
+        streamed = dict(mm.improve_embeddings(embs, workers=2, as_completed=True))
+        return sorted(streamed) == list(range(len(embs)))
+
+    @staticmethod
+    @success_perfect(3, 4, 8)
+    def test_score_embeddings(n, k):
+        from minorminer import miner
+        chim = Chimera(n)
+        cliq = Clique(k)
+        mm = miner(cliq, chim, return_overlap=True, tries=1, max_no_improvement=1)
+        embs = [mm.find_embedding()[0] for _ in range(5)]
+        embs += [{}, {0: [(0, 0, 0, 0), 'x'], 1: ['x']}]
+        for embedded in (False, True):
+            keys = [mm.quality_key(emb, embedded) for emb in embs]
+            if mm.quality_keys(embs, embedded) != keys:
+                return False
+            if mm.best_embedding_index(embs, embedded) != keys.index(min(keys)):
+                return False
+        scores = mm.score_embeddings(embs)
+        for emb, L, O, t, m in zip(embs, *scores):
+            qubits = [q for chain in emb.values() for q in chain]
+            if t != len(set(qubits)) or m != max(map(len, emb.values()), default=0):
+                return False
+            if L.sum() != len(emb) or O @ range(len(O)) != len(qubits):
+                return False
+        return True
+
+    @staticmethod
+    @success_perfect(3, 6, 4)
+    def test_search_window(n, k):
+        chim = Chimera(n)
+        grid = nx.grid_2d_graph(k, k)
+        emb = find_embedding_orig(grid, chim, search_window=1)
+        if not check_embedding(grid, chim, emb):
+            return False
+        # windows around placed chains; with max_fill=1, crowded windows must be widened
+        for max_fill in (None, 1):
+            emb = find_embedding_orig(grid, chim, initial_chains=emb, search_window=1, max_fill=max_fill)
+            if not check_embedding(grid, chim, emb):
+                return False
+        return True
+
+    @staticmethod
+    @success_perfect(1, 3)
+    def test_target_distances(n):
+        from minorminer import Target
+        chim = Chimera(n)
+        chim.add_edge((n, 0, 0, 0), (n, 0, 0, 1))  # a second component
+        T = Target(chim)
+        nodes = sorted(chim)
+        D = T.distance_matrix(nodes, disconnected_distance=-1)
+        for i, u in enumerate(nodes):
+            dist = nx.single_source_shortest_path_length(chim, u)
+            for j, v in enumerate(nodes):
+                d = dist.get(v, float('inf'))
+                if D[i, j] != dist.get(v, -1):
+                    return False
+                lower, upper = T.distance_bounds(u, v)
+                if not lower <= d <= upper:
+                    return False
+        return True
+
+    @staticmethod
+    @success_perfect(1, 3)
+    def test_find_embeddings_batch(n):
+        from minorminer import Target, find_embeddings_batch
+        chim = Chimera(n)
+        T = Target(chim)
+        sources = [Clique(k) for k in range(2, 7)]
+        for workers in (1, 3):
+            embs = find_embeddings_batch(sources, T, max_workers=workers, tries=1)
+            if len(embs) != len(sources):
+                return False
+            if not all(check_embedding(S, chim, emb) for S, emb in zip(sources, embs)):
+                return False
+        # suspend_chains adds target nodes; the shared Target must not see them
+        size = len(T)
+        emb = find_embedding_orig([(0, 1)], T, suspend_chains={0: [[(0, 0, 0, 0)]]})
+        return len(T) == size and (0, 0, 0, 0) in emb[0]
+
+    @staticmethod
+    @success_perfect(3, 4, 12)
+    def test_repair_embedding(n, k):
+        from minorminer import repair_embedding
+        chim = Chimera(n)
+        cliq = Clique(k)
+        emb = find_embedding_orig(cliq, chim)
+        if repair_embedding(cliq, chim, emb) != emb:
+            return False
+
+        # drop a qubit from one chain and a coupler inside another
+        damaged = Chimera(n)
+        damaged.remove_node(emb[0][0])
+        chain = [q for q in emb[1] if len(emb[1]) > 1]
+        if chain:
+            damaged.remove_edges_from(chim.subgraph(chain).edges())
+        for fix_intact in (True, False):
+            repaired = repair_embedding(cliq, damaged, emb, fix_intact=fix_intact)
+            if not check_embedding(cliq, damaged, repaired):
+                return False
+        repaired = repair_embedding(cliq, damaged, emb)
+        if not all(set(repaired[v]) == set(emb[v]) for v in range(2, k)):
+            return False
+
+        # parameters that would change what find_embedding returns are refused
+        for name in ('initial_chains', 'fixed_chains', 'return_overlap', 'return_arrays'):
+            try:
+                repair_embedding(cliq, damaged, emb, **{name: True})
+                return False
+            except ValueError:
+                pass
+        return True
+
+    @staticmethod
+    @success_perfect(3, 4, 12)
+    def test_progress(n, k):
+        chim = Chimera(n)
+        cliq = Clique(k)
+        reports = []
+        emb = find_embedding_orig(cliq, chim, progress=reports.append)
+        if not reports or reports[-1].embedding != emb:
+            return False
+        if not all(r.valid == (r.max_fill == 1) for r in reports):
+            return False
+
+        # reports can be pickled, e.g. to send them to another process
+        import pickle
+        if pickle.loads(pickle.dumps(reports[-1])) != reports[-1]:
+            return False
+
+        # returning a truthy value stops the search at the first valid embedding
+        reports = []
+        def stop(p):
+            reports.append(p)
+            return p.valid
+        emb = find_embedding_orig(cliq, chim, progress=stop)
+        if sum(r.valid for r in reports) != 1 or reports[-1].embedding != emb:
+            return False
+        return check_embedding(cliq, chim, emb)
+
+    @staticmethod
+    @success_perfect(3, 4)
+    def test_edge_arrays(n):
+        import numpy as np
+        from minorminer import Target
+        chim = nx.convert_node_labels_to_integers(dnx.chimera_graph(n))
+        cliq = nx.complete_graph(6)
+        S = np.array(list(cliq.edges()))
+        for dtype in (np.int32, np.uint32, np.int64, np.uint64):
+            T = Target(np.array(list(chim.edges()), dtype=dtype))
+            if len(T) != len(chim) or sorted(T) != list(range(len(chim))):
+                return False
+            emb = find_embedding_orig(S, T)
+            if not check_embedding(cliq, chim, emb):
+                return False
+
+        # labels which aren't 0..n-1 are relabeled, as for any other input
+        sparse = np.array(list(chim.edges())) * 2 + 1
+        emb = find_embedding_orig(S, sparse)
+        if not all(q % 2 for c in emb.values() for q in c):
+            return False
+        emb = {v: [(q - 1) // 2 for q in c] for v, c in emb.items()}
+        if not check_embedding(cliq, chim, emb):
+            return False
+
+        # chains given as a pair of offset and qubit arrays
+        keys = sorted(emb)
+        offsets = np.cumsum([0] + [len(emb[v]) for v in keys])
+        qubits = np.concatenate([emb[v] for v in keys])
+        emb2 = find_embedding_orig(S, Target(np.array(list(chim.edges()))), initial_chains=(offsets, qubits),
+                                   skip_initialization=True, chainlength_patience=0)
+        return {v: sorted(c) for v, c in emb2.items()} == {v: sorted(c) for v, c in emb.items()}
+
+    @staticmethod
+    @success_perfect(3, 4, 12)
+    def test_return_arrays(n, k):
+        from minorminer import EmbeddingArrays, miner
+        chim = Chimera(n)
+        cliq = Clique(k)
+        emb = find_embedding_orig(cliq, chim, random_seed=5)
+        arr = find_embedding_orig(cliq, chim, random_seed=5, return_arrays=True)
+        if not isinstance(arr, EmbeddingArrays) or len(arr.offsets) != k + 1:
+            return False
+        for i, v in enumerate(arr.source_labels[:k]):
+            chain = arr.qubits[arr.offsets[i]:arr.offsets[i + 1]]
+            if [arr.target_labels[q] for q in chain] != emb[v]:
+                return False
+        if dict(arr) != emb:
+            return False
+        emb = miner(cliq, chim, random_seed=5).find_embedding()
+        return miner(cliq, chim, random_seed=5, return_arrays=True).find_embedding() == emb
+
+    @staticmethod
+    @success_perfect(3, 4, 12)
+    def test_quality_targets(n, k):
+        chim = Chimera(n)
+        cliq = Clique(k)
+        lengths = []
+        def record(p):
+            if p.valid:
+                lengths.append((p.max_chain_length, sum(len(c) for c in p.embedding.values())))
+        emb = find_embedding_orig(cliq, chim, chainlength_target=k, total_chainlength_target=k * k,
+                                  progress=record)
+        if not check_embedding(cliq, chim, emb):
+            return False
+        # the search stops at the first embedding which meets both targets
+        met = [L <= k and Q <= k * k for L, Q in lengths]
+        if met.index(True) != len(met) - 1:
+            return False
+        emb = find_embedding_orig(cliq, chim, chainlength_timeout=0)
+        return check_embedding(cliq, chim, emb)
+
+    @staticmethod
+    @success_perfect(3, 8)
+    def test_pruned_search_matches_parallel(n):
+        # the serial pathfinder stops its searches early, the parallel one doesn't;
+        # the root selection and chains they produce should be identical
+        from random import randint
+        chim = Chimera(n)
+        seed = randint(0, 2**32 - 1)
+        for S in (Grid(n), Clique(n + 2)):
+            emb0 = find_embedding(S, chim, random_seed=seed, chainlength_patience=1)
+            emb1 = find_embedding(S, chim, random_seed=seed, chainlength_patience=1, threads=2)
+            if emb0 != emb1:
+                return False
+        return True
+
     @staticmethod
     @success_count(30, 3, 13)
     def test_clique_term(n, k):
@@ -719,6 +1062,31 @@ class TestFindEmbedding(unittest.TestCase):
 
         return not find_embedding(Kn, Cn, tries=1e6, max_no_improvement=1e6, inner_rounds=1e6, timeout=t, threads=4)
 
+    @staticmethod
+    @success_perfect(1, 16, .5)
+    def test_gil_released(n, t):
+        # the heuristic releases the GIL, so a Python thread keeps ticking
+        # while a search is in progress (otherwise it stalls for ~t seconds)
+        import threading
+        Kn = Clique(4 * n + 1)
+        Cn = Chimera(n)
+        ticks = []
+        done = threading.Event()
+
+        def tick():
+            while not done.is_set():
+                ticks.append(time.perf_counter())
+                time.sleep(.001)
+
+        ticker = threading.Thread(target=tick)
+        ticker.start()
+        try:
+            find_embedding(Kn, Cn, tries=1e6, max_no_improvement=1e6, inner_rounds=1e6, timeout=t)
+        finally:
+            done.set()
+            ticker.join()
+        return max(b - a for a, b in zip(ticks, ticks[1:])) < t / 2
+
     @staticmethod
     @success_count(30)
     def test_chainlength_fast():
@@ -0,0 +1,63 @@
+// Copyright 2020 D-Wave Systems Inc.
+//
+//    Licensed under the Apache License, Version 2.0 (the "License");
+//    you may not use this file except in compliance with the License.
+//    You may obtain a copy of the License at
+//
+//        http://www.apache.org/licenses/LICENSE-2.0
+//
+//    Unless required by applicable law or agreed to in writing, software
+//    distributed under the License is distributed on an "AS IS" BASIS,
+//    WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+//    See the License for the specific language governing permissions and
+//    limitations under the License.
+
+#include <atomic>
+#include <stdexcept>
+#include "gtest/gtest.h"
+#include "find_embedding/util.hpp"
+
+using namespace find_embedding;
+
+// Every index is run exactly once per call, and the pool can be reused
+TEST(thread_pool, runs_every_index) {
+    thread_pool pool(4);
+    EXPECT_EQ(pool.size(), 4);
+    for (int round = 0; round < 50; round++) {
+        std::vector<int> counts(4, 0);
+        pool.run([&counts](int i) { counts[i]++; });
+        for (auto &c : counts) EXPECT_EQ(c, 1);
+    }
+}
+
+// A single-threaded pool runs the job on the calling thread
+TEST(thread_pool, single_thread) {
+    thread_pool pool(1);
+    auto caller = std::this_thread::get_id();
+    std::thread::id ran;
+    pool.run([&ran](int) { ran = std::this_thread::get_id(); });
+    EXPECT_EQ(ran, caller);
+}
+
+// Work pulled from a shared counter is all done, once
+TEST(thread_pool, shared_counter) {
+    thread_pool pool(3);
+    std::atomic<int> next(0);
+    std::vector<int> done(1000, 0);
+    pool.run([&next, &done](int) {
+        for (int j; (j = next++) < 1000;) done[j]++;
+    });
+    for (auto &d : done) EXPECT_EQ(d, 1);
+}
+
+// Exceptions thrown by workers are rethrown by run, and the pool survives them
+TEST(thread_pool, rethrows) {
+    thread_pool pool(3);
+    EXPECT_THROW(pool.run([](int i) {
+                     if (i == 2) throw std::runtime_error("worker");
+                 }),
+                 std::runtime_error);
+    std::atomic<int> total(0);
+    pool.run([&total](int i) { total += i; });
+    EXPECT_EQ(total, 3);
+}